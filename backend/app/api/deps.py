@@ -2,9 +2,11 @@
 API Dependencies - Session management without authentication
 """
 
+import asyncio
+import threading
 import time
 import uuid
-from typing import Dict
+from typing import Dict, Optional
 from uuid import UUID
 from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,6 +15,8 @@ from app.core.bot import LaosEKYCBot
 from app.config import settings
 from app.database.connection import get_db
 from app.services.chat_persistence import ChatPersistenceService
+from app.services.face_service import open_realtime_connections
+from app.utils.metrics import metrics
 
 # Store bot instances per session ID (with cleanup)
 bot_sessions: Dict[str, LaosEKYCBot] = {}
@@ -30,7 +34,27 @@ def get_session_id(x_session_id: str = Header(default=None)) -> str:
     return str(uuid.uuid4())
 
 
-def cleanup_old_sessions():
+def get_idempotency_key(idempotency_key: Optional[str] = Header(default=None)) -> Optional[str]:
+    """Get the optional Idempotency-Key header used to deduplicate client retries"""
+    return idempotency_key or None
+
+
+async def _evict_session(session_id: str, reason: str) -> bool:
+    """Drop a session's bot and close its realtime face-server connection"""
+    bot = bot_sessions.pop(session_id, None)
+    session_timestamps.pop(session_id, None)
+    if bot is None:
+        return False
+    metrics.increment("bot_sessions_evicted_total", reason=reason)
+    metrics.set_gauge("bot_sessions", len(bot_sessions))
+    try:
+        await bot.stop_realtime_verification()
+    except Exception as e:
+        print(f"Error stopping realtime verification for {session_id}: {type(e).__name__}: {e}")
+    return True
+
+
+async def cleanup_old_sessions():
     """Remove sessions older than timeout"""
     current_time = time.time()
     expired_sessions = [
@@ -38,9 +62,7 @@ def cleanup_old_sessions():
         if current_time - timestamp > settings.SESSION_TIMEOUT
     ]
     for sid in expired_sessions:
-        if sid in bot_sessions:
-            del bot_sessions[sid]
-            del session_timestamps[sid]
+        if await _evict_session(sid, "expired"):
             print(f"Cleaned up expired session: {sid}")
 
 
@@ -53,7 +75,7 @@ async def get_bot(
     Restores state from database if creating new instance.
     """
     # Cleanup old sessions periodically
-    cleanup_old_sessions()
+    await cleanup_old_sessions()
 
     # Get or create bot for this session
     if session_id not in bot_sessions:
@@ -63,13 +85,23 @@ async def get_bot(
         # Try to restore state from DB
         try:
             persistence = ChatPersistenceService(db)
-            state = await persistence.get_chat_history(UUID(session_id))
-            await bot.restore_conversation(state)
+            window = settings.CONVERSATION_RESTORE_WINDOW
+            with metrics.timer("conversation_restore_seconds"):
+                snapshot = await persistence.get_snapshot(UUID(session_id), window)
+                if snapshot:
+                    bot.restore_from_snapshot(snapshot, window)
+                else:
+                    state = await persistence.get_recent_history(UUID(session_id), window)
+                    await bot.restore_conversation(state)
+            metrics.increment("conversation_restores_total", source="snapshot" if snapshot else "jsonb")
+            metrics.observe("conversation_restore_messages", len(bot.conversation.messages))
+            metrics.increment("conversation_restore_messages_skipped", bot.conversation.history_offset)
         except Exception as e:
             print(f"Failed to restore bot state: {e}")
             # Continue with empty bot if restore fails
 
         bot_sessions[session_id] = bot
+        metrics.set_gauge("bot_sessions", len(bot_sessions))
     else:
         print(f"Using cached bot for session: {session_id}")
 
@@ -79,15 +111,91 @@ async def get_bot(
     return bot_sessions[session_id]
 
 
-def delete_bot_session(session_id: str) -> bool:
+def find_bot(session_id: str) -> Optional[LaosEKYCBot]:
+    """Get the live bot for a session without creating or restoring one"""
+    bot = bot_sessions.get(session_id)
+    if bot is not None:
+        session_timestamps[session_id] = time.time()
+    return bot
+
+
+async def delete_bot_session(session_id: str) -> bool:
     """
-    Delete a bot session completely.
+    Delete a bot session completely, closing its realtime connection.
     Use this after successful verification to ensure next session starts fresh.
     """
-    if session_id in bot_sessions:
-        del bot_sessions[session_id]
-        if session_id in session_timestamps:
-            del session_timestamps[session_id]
+    if await _evict_session(session_id, "deleted"):
         print(f"Deleted bot session: {session_id}")
         return True
     return False
+
+
+class SessionReaper:
+    """
+    Background sweep over live sessions (application lifetime)
+
+    Every ``interval`` seconds: evicts expired sessions (get_bot only cleans
+    up when a request arrives), closes realtime connections that have not
+    sent a frame for ``idle_timeout`` seconds, and refreshes the session,
+    realtime connection and thread gauges.
+    """
+
+    def __init__(self, interval: Optional[float] = None, idle_timeout: Optional[float] = None):
+        self.interval = interval or settings.SESSION_REAPER_INTERVAL
+        self.idle_timeout = settings.FACE_WS_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the sweep task (application startup)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="session-reaper")
+
+    async def stop(self) -> None:
+        """Stop sweeping and close every session's realtime connection (application shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for bot in list(bot_sessions.values()):
+            try:
+                await bot.stop_realtime_verification()
+            except Exception:
+                pass
+
+    async def close_idle_connections(self) -> int:
+        """Stop realtime verification for sessions idle longer than idle_timeout"""
+        closed = 0
+        if self.idle_timeout <= 0:
+            return closed
+        for session_id, bot in list(bot_sessions.items()):
+            client = bot.face_verification_service.realtime_client
+            if client is not None and client.idle_seconds() > self.idle_timeout:
+                print(f"Closing idle realtime connection for session: {session_id}")
+                await bot.stop_realtime_verification()
+                metrics.increment("face_ws_idle_closed_total")
+                closed += 1
+        return closed
+
+    def report(self) -> None:
+        metrics.set_gauge("bot_sessions", len(bot_sessions))
+        metrics.set_gauge("realtime_sessions", sum(
+            1 for bot in bot_sessions.values() if bot.face_verification_service.realtime_client is not None
+        ))
+        metrics.set_gauge("face_ws_open_connections", open_realtime_connections())
+        metrics.set_gauge("process_threads", threading.active_count())
+
+    async def sweep(self) -> None:
+        await cleanup_old_sessions()
+        await self.close_idle_connections()
+        self.report()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Session sweep failed: {type(e).__name__}: {e}")
+
+
+session_reaper = SessionReaper()
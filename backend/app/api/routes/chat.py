@@ -2,10 +2,9 @@
 Chat API routes
 """
 
-import json
 from uuid import UUID
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,6 +13,7 @@ from pydantic import BaseModel
 from app.api.deps import get_session_id, get_bot
 from app.database import get_db
 from app.services.chat_persistence import ChatPersistenceService
+from app.utils.serialization import json_dumps
 from app.core.bot import LaosEKYCBot
 from app.models.requests import (
     ChatRequest,
@@ -62,7 +62,7 @@ async def chat_stream(
 
     if not request.message:
         async def error_generator():
-            yield {"event": "message", "data": json.dumps({"type": "error", "error": "Message cannot be empty"})}
+            yield {"event": "message", "data": json_dumps({"type": "error", "error": "Message cannot be empty"})}
         return EventSourceResponse(error_generator())
 
     # Save user message to DB
@@ -87,7 +87,7 @@ async def chat_stream(
                         if isinstance(tc, list):
                             full_tool_calls.extend(tc)
 
-                yield {"event": "message", "data": json.dumps(chunk, ensure_ascii=False)}
+                yield {"event": "message", "data": json_dumps(chunk)}
 
             yield {"event": "message", "data": "[DONE]"}
 
@@ -102,7 +102,7 @@ async def chat_stream(
 
         except Exception as e:
             error_data = {"type": "error", "error": f"Error processing message: {str(e)}"}
-            yield {"event": "message", "data": json.dumps(error_data, ensure_ascii=False)}
+            yield {"event": "message", "data": json_dumps(error_data)}
 
     return EventSourceResponse(generate())
 
@@ -138,6 +138,7 @@ async def get_conversation_state(
             context=bot.conversation.context,
             progress=bot.conversation.progress,
             messages_count=len(bot.conversation.messages),
+            history_offset=bot.conversation.history_offset,
             messages=[
                 {
                     "role": msg.role,
@@ -164,6 +165,8 @@ class ChatHistoryResponse(BaseModel):
     messages: List[dict] = []
     context: Optional[dict] = {}
     progress: Optional[str] = "idle"
+    start: Optional[int] = None  # Index of the first returned message (paged requests)
+    total: Optional[int] = None
     error: Optional[str] = None
 
 
@@ -174,12 +177,29 @@ class SaveMessageRequest(BaseModel):
 
 @router.get("/chat/history", response_model=ChatHistoryResponse)
 async def get_chat_history(
+    before: Optional[int] = Query(default=None, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
     session_id: str = Depends(get_session_id),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get chat history for session"""
+    """
+    Get chat history for session.
+    Pass ``limit`` (and ``before`` for older pages) to page through long histories.
+    """
     try:
         service = ChatPersistenceService(db)
+
+        if limit is not None or before is not None:
+            page = await service.get_messages_page(UUID(session_id), before, limit or 20)
+            return ChatHistoryResponse(
+                success=True,
+                messages=page["messages"],
+                context=None,
+                progress=None,
+                start=page["start"],
+                total=page["total"],
+            )
+
         data = await service.get_chat_history(UUID(session_id))
 
         return ChatHistoryResponse(
@@ -2,22 +2,33 @@
 Upload API routes
 """
 
-import os
+import asyncio
+import hashlib
+import tempfile
 import uuid
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
 from fastapi.encoders import jsonable_encoder
+from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_session_id, get_bot
-from app.database import get_db
+from app.api.deps import get_session_id, get_bot, get_idempotency_key
+from app.database import AsyncSessionLocal
 from app.services.chat_persistence import ChatPersistenceService
+from app.services.image_processing import copy_content
+from app.services.ocr_jobs import OCRJob, QueueFullError, ocr_job_manager
 from app.config import settings
 from app.core.bot import LaosEKYCBot
 from app.models.requests import UploadResponse
 from app.utils.formatters import format_scan_result
+from app.utils.file_types import SNIFF_BYTES, sniff_image_type
+from app.utils.idempotency import idempotency_store
+from app.utils.serialization import json_dumps
 
 
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
@@ -27,14 +38,173 @@ def allowed_file(filename: str) -> bool:
     )
 
 
+async def validate_upload(file: UploadFile) -> str:
+    """
+    Check the magic bytes and size of the spooled upload and hash it
+
+    Returns:
+        SHA-256 hex digest of the content
+
+    Raises:
+        ValueError: With the client-facing error message
+    """
+    # Validate the real image type from magic bytes, not just the extension
+    head = await file.read(SNIFF_BYTES)
+    if not sniff_image_type(head):
+        print(f"File content is not a supported image: {file.filename}")
+        raise ValueError("File format not supported")
+
+    # Walk the spooled file in chunks: enforce the size limit and hash for
+    # dedup without ever holding the whole image in memory
+    digest = hashlib.sha256(head)
+    size = len(head)
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > settings.MAX_CONTENT_LENGTH:
+            print(f"File too large: more than {settings.MAX_CONTENT_LENGTH} bytes")
+            raise ValueError("File too large")
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest()
+
+
+async def finalize_upload(
+    bot: "LaosEKYCBot",
+    session_id: str,
+    filename: str,
+    result: Dict[str, Any],
+    db: AsyncSession,
+) -> UploadResponse:
+    """Format the OCR result, save it to chat history and build the response"""
+    if not result.get("success"):
+        print(f"OCR failed: {result.get('error')}")
+        return UploadResponse(
+            success=False,
+            error=result.get("error", "ບໍ່ສາມາດປະມວນຜົນຮູບພາບໄດ້"),
+            duplicate_of=result.get("duplicate_of"),
+        )
+
+    scan_data = result.get("scan_result")
+    formatted_html = format_scan_result(scan_data) if scan_data else "ບໍ່ມີຂໍ້ມູນການສະແກນ"
+
+    # Save to chat history
+    try:
+        chat_service = ChatPersistenceService(db)
+        session_uuid = uuid.UUID(session_id)
+
+        # Save User Action
+        await chat_service.save_message(
+            session_id=session_uuid,
+            role="user",
+            content=f"ອັບໂຫລດບັດປະຈຳຕົວ: {filename}",
+            context=jsonable_encoder(bot.conversation.context),
+            progress=bot.conversation.progress
+        )
+
+        # Save Assistant Response
+        await chat_service.save_message(
+            session_id=session_uuid,
+            role="assistant",
+            content=formatted_html,
+            context=jsonable_encoder(bot.conversation.context),
+            progress=bot.conversation.progress
+        )
+    except Exception as e:
+        print(f"Error saving chat history: {e}")
+
+    return UploadResponse(
+        success=True,
+        image_url=result.get("image_url"),
+        scan_result=scan_data,
+        formatted_html=formatted_html,
+        message="ອັບໂຫລດ ແລະ ສະແກນສຳເລັດ!",
+        id_card_url=result.get("image_url"),
+        duplicate_of=result.get("duplicate_of"),
+        tool_call={
+            "function": {
+                "name": "open_face_verification",
+                "arguments": "{\"message\": \"ກະລຸນາຖ່າຍຮູບໃບໜ້າຂອງທ່ານເພື່ອຢັ້ງຢືນຕົວຕົນ\"}"
+            },
+            "auto_execute": True
+        }
+    )
+
+
+async def _copy_upload(file: UploadFile) -> tempfile.SpooledTemporaryFile:
+    """Copy the upload into a file owned by the job (the UploadFile closes with the request)"""
+    return await asyncio.to_thread(copy_content, file.file, UPLOAD_CHUNK_SIZE)
+
+
+async def _own_upload(file: UploadFile) -> UploadFile:
+    """Copy of the upload that stays open after the request closes the original"""
+    return UploadFile(await _copy_upload(file), filename=file.filename, headers=file.headers)
+
+
+def _submit_upload_job(
+    bot: "LaosEKYCBot",
+    session_id: str,
+    filename: str,
+    content: tempfile.SpooledTemporaryFile,
+    content_hash: str,
+) -> OCRJob:
+    """Queue OCR + persistence for a background worker (the job owns and closes ``content``)"""
+
+    async def handler(job: OCRJob) -> Dict[str, Any]:
+        try:
+            result = await bot.process_image_upload(
+                content, filename, content_hash, job.set_stage, session_id
+            )
+        finally:
+            content.close()
+
+        job.set_stage("formatting")
+        async with AsyncSessionLocal() as db:
+            response = await finalize_upload(bot, session_id, filename, result, db)
+        job.set_stage("saved")
+        return response.model_dump(mode="json")
+
+    return ocr_job_manager.submit(session_id, handler, cleanup=content.close)
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
+    job: bool = Query(False, description="Queue OCR in the background and return a job id"),
     session_id: str = Depends(get_session_id),
     bot: "LaosEKYCBot" = Depends(get_bot),
-    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
 ):
-    """Handle file upload and OCR scan"""
+    """Handle file upload and OCR scan (a repeated Idempotency-Key replays the first response)"""
+    # With a key the work may outlive this request, so it reads its own copy
+    # of the upload and uses its own DB session. A replay or a join never
+    # reads the upload, so it is not copied.
+    owns_copy = idempotency_key and not idempotency_store.has("upload", session_id, idempotency_key)
+    upload = await _own_upload(file) if owns_copy else file
+    started = False
+
+    async def run() -> UploadResponse:
+        nonlocal started
+        started = True
+        try:
+            async with AsyncSessionLocal() as db:
+                return await _upload_file(upload, job, session_id, bot, db)
+        finally:
+            if upload is not file:
+                await upload.close()
+
+    response = await idempotency_store.run("upload", session_id, idempotency_key, run)
+    if not started and upload is not file:  # Joined an execution that started while copying
+        await upload.close()
+    return response
+
+
+async def _upload_file(
+    file: UploadFile,
+    job: bool,
+    session_id: str,
+    bot: "LaosEKYCBot",
+    db: AsyncSession,
+) -> UploadResponse:
     print("=" * 80)
     print("UPLOAD REQUEST RECEIVED")
 
@@ -51,64 +221,57 @@ async def upload_file(
     print(f"File received: {file.filename}")
 
     try:
-        # Read file content
-        file_content = await file.read()
+        try:
+            content_hash = await validate_upload(file)
+        except ValueError as e:
+            return UploadResponse(success=False, error=str(e))
 
-        # Process image
+        if job:
+            content = await _copy_upload(file)
+            try:
+                ocr_job = _submit_upload_job(bot, session_id, file.filename, content, content_hash)
+            except QueueFullError as e:
+                print(f"Upload job rejected: {e}")
+                return UploadResponse(success=False, error="ລະບົບກຳລັງຫຍຸ້ງ, ກະລຸນາລອງໃໝ່ອີກຄັ້ງ")
+            print(f"Upload queued as job {ocr_job.id}")
+            return UploadResponse(success=True, job_id=ocr_job.id, message="ກຳລັງປະມວນຜົນຮູບພາບ...")
+
+        # Process image - the spooled file is streamed to the OCR server
         print("Calling bot.process_image_upload...")
-        result = await bot.process_image_upload(file_content, file.filename)
+        result = await bot.process_image_upload(
+            file.file, file.filename, content_hash, session_id=session_id
+        )
         print(f"OCR Result: {result}")
 
-        if result.get("success"):
-            scan_data = result.get("scan_result")
-            formatted_html = format_scan_result(scan_data) if scan_data else "ບໍ່ມີຂໍ້ມູນການສະແກນ"
-
-            # Save to chat history
-            try:
-                chat_service = ChatPersistenceService(db)
-                session_uuid = uuid.UUID(session_id)
-
-                # Save User Action
-                await chat_service.save_message(
-                    session_id=session_uuid,
-                    role="user",
-                    content=f"ອັບໂຫລດບັດປະຈຳຕົວ: {file.filename}",
-                    context=jsonable_encoder(bot.conversation.context),
-                    progress=bot.conversation.progress
-                )
-
-                # Save Assistant Response
-                await chat_service.save_message(
-                    session_id=session_uuid,
-                    role="assistant",
-                    content=formatted_html,
-                    context=jsonable_encoder(bot.conversation.context),
-                    progress=bot.conversation.progress
-                )
-            except Exception as e:
-                print(f"Error saving chat history: {e}")
-
-            return UploadResponse(
-                success=True,
-                image_url=result.get("image_url"),
-                scan_result=scan_data,
-                formatted_html=formatted_html,
-                message="ອັບໂຫລດ ແລະ ສະແກນສຳເລັດ!",
-                id_card_url=result.get("image_url"),
-                tool_call={
-                    "function": {
-                        "name": "open_face_verification",
-                        "arguments": "{\"message\": \"ກະລຸນາຖ່າຍຮູບໃບໜ້າຂອງທ່ານເພື່ອຢັ້ງຢືນຕົວຕົນ\"}"
-                    },
-                    "auto_execute": True
-                }
-            )
-        else:
-            print(f"OCR failed: {result.get('error')}")
-            return UploadResponse(success=False, error=result.get("error", "ບໍ່ສາມາດປະມວນຜົນຮູບພາບໄດ້"))
+        return await finalize_upload(bot, session_id, file.filename, result, db)
 
     except Exception as e:
         print(f"Exception during processing: {str(e)}")
         import traceback
         traceback.print_exc()
         return UploadResponse(success=False, error=f"ເກີດຂໍ້ຜິດພາດໃນການປະມວນຜົນຮູບພາບ: {str(e)}")
+
+
+def _get_session_job(job_id: str, session_id: str) -> OCRJob:
+    job = ocr_job_manager.get(job_id)
+    if job is None or job.session_id != session_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/upload/jobs/{job_id}")
+async def get_upload_job(job_id: str, session_id: str = Depends(get_session_id)):
+    """Get the status (and result, once finished) of an upload job"""
+    return _get_session_job(job_id, session_id).to_dict()
+
+
+@router.get("/upload/jobs/{job_id}/events")
+async def stream_upload_job(job_id: str, session_id: str = Depends(get_session_id)):
+    """Stream upload job progress as server-sent events until it finishes"""
+    job = _get_session_job(job_id, session_id)
+
+    async def generate():
+        async for event in job.events():
+            yield {"event": "message", "data": json_dumps(event)}
+
+    return EventSourceResponse(generate())
@@ -3,16 +3,29 @@ Face Verification API routes
 """
 
 import asyncio
+import base64
 import json
+import os
+import time
 import uuid
 import websockets
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Query, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_session_id, get_bot, delete_bot_session
-from app.database import get_db
+from app.api.deps import get_session_id, get_bot, get_idempotency_key, delete_bot_session, find_bot
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.database.models import EKYCRecord
+from app.services.image_hash import register_phash, to_signed64
 from app.services.chat_persistence import ChatPersistenceService
+from app.services.frame_decision import FrameDecision
 from app.core.bot import LaosEKYCBot
+from app.utils.idempotency import idempotency_store
+from app.utils.metrics import metrics
+from app.utils.serialization import model_response
 from app.models.requests import (
     VerifyFaceRequest,
     VerifyFaceResponse,
@@ -30,9 +43,24 @@ async def verify_face(
     request: VerifyFaceRequest,
     session_id: str = Depends(get_session_id),
     bot: LaosEKYCBot = Depends(get_bot),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
 ):
-    """Handle batch face verification"""
+    """Handle batch face verification (a repeated Idempotency-Key replays the first response)"""
 
+    async def run() -> VerifyFaceResponse:
+        # Own session: the work may outlive this request
+        async with AsyncSessionLocal() as db:
+            return await _verify_face(request, session_id, bot, db)
+
+    return await idempotency_store.run("verify-face", session_id, idempotency_key, run)
+
+
+async def _verify_face(
+    request: VerifyFaceRequest,
+    session_id: str,
+    bot: LaosEKYCBot,
+    db: AsyncSession,
+) -> VerifyFaceResponse:
     try:
         # Update progress
         bot.conversation.set_progress("face_verifying")
@@ -58,6 +86,7 @@ async def verify_face(
                 preserved_context = {
                     "scan_result": current_context.get("scan_result"),
                     "id_card_url": current_context.get("id_card_url"),
+                    "duplicate_of": current_context.get("duplicate_of"),
                 }
                 await chat_service.save_message(
                     session_id=session_uuid,
@@ -69,7 +98,7 @@ async def verify_face(
                 # --- Persistence Logic END ---
 
                 # Delete bot session completely - next request will create fresh instance
-                delete_bot_session(session_id)
+                await delete_bot_session(session_id)
                 print(f"Verification successful, bot session deleted for: {session_id}")
             else:
                 bot.conversation.set_progress("id_scanned")
@@ -108,13 +137,13 @@ async def start_websocket_verification(
     print(f"[SERVICE] Face verification service: {bot.face_verification_service}")
 
     try:
+        # Fetch the ID card through the shared, coalesced image fetch
+        id_card_base64 = await bot.face_verification_service.load_id_card_image(request.id_card_image_url)
+
         print("[WAIT] Starting realtime verification...")
-        # Run sync method in thread executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        websocket_client = await loop.run_in_executor(
-            None,
-            bot.start_realtime_verification,
-            request.id_card_image_url
+        websocket_client = await bot.start_realtime_verification(
+            request.id_card_image_url,
+            id_card_base64
         )
         print(f"[WS] WebSocket client returned: {websocket_client}")
 
@@ -154,14 +183,112 @@ async def start_websocket_verification(
         return VerifyFaceResponse(success=False, error=f"Error starting WebSocket: {str(e)}")
 
 
+def _decode_frame(frame_base64: str) -> bytes:
+    """Decode a camera frame sent as base64 or a data URL"""
+    if "," in frame_base64:
+        frame_base64 = frame_base64.split(",")[1]
+    return base64.b64decode(frame_base64)
+
+
+async def save_verified_selfie(
+    bot: LaosEKYCBot,
+    session_id: str,
+    selfie: bytes,
+    similarity: Optional[float],
+    db: AsyncSession,
+) -> None:
+    """
+    Persist a successful realtime verification: selfie file, EKYC record and chat message
+
+    Raises only while the EKYC record is not yet committed (callers may then
+    retract the decision); a failed chat history save is logged, not raised.
+    """
+    # 1. Save Selfie Image
+    filename = f"selfie_{session_id}_{int(datetime.utcnow().timestamp())}.jpg"
+    upload_dir = "static/uploads"
+    os.makedirs(upload_dir, exist_ok=True)
+    selfie_path = os.path.join(upload_dir, filename)
+    with open(selfie_path, "wb") as f:
+        f.write(selfie)
+    selfie_url = f"/static/uploads/{filename}"
+
+    # 2. Create EKYC Record with session_id
+    context = bot.conversation.context or {}
+    session_uuid = UUID(session_id)
+
+    id_card_phash = int(context["id_card_phash"], 16) if context.get("id_card_phash") else None
+    new_record = EKYCRecord(
+        session_id=session_uuid,
+        id_card_image_url=context.get("id_card_url"),
+        id_card_phash=to_signed64(id_card_phash) if id_card_phash is not None else None,
+        selfie_image_url=selfie_url,
+        ocr_data=jsonable_encoder(context.get("scan_result")),
+        duplicate_of=context.get("duplicate_of"),
+        face_match_score=similarity,
+        is_verified=True,
+        verified_at=datetime.utcnow()
+    )
+    db.add(new_record)
+    try:
+        await db.commit()
+    except Exception:
+        os.remove(selfie_path)
+        raise
+    print(f"[DB] EKYC Record saved for session: {session_id}")
+    # Same set load_phash_index rebuilds at startup: committed records only
+    if id_card_phash is not None:
+        register_phash(id_card_phash, session_id)
+
+    # 3. Save to Chat History (the verification stands even if this fails)
+    try:
+        chat_service = ChatPersistenceService(db)
+        msg_content = "ການຢັ້ງຢືນໃບໜ້າສຳເລັດ! ຕົວຕົນຂອງທ່ານໄດ້ຖືກຢືນຢັນແລ້ວ."
+        preserved_context = jsonable_encoder({
+            "scan_result": context.get("scan_result"),
+            "id_card_url": context.get("id_card_url"),
+            "duplicate_of": context.get("duplicate_of"),
+        })
+        await chat_service.save_message(
+            session_id=session_uuid,
+            role="assistant",
+            content=msg_content,
+            context=preserved_context,
+            progress="idle"
+        )
+    except Exception as e:
+        print(f"Error saving chat history: {e}")
+
+
+async def end_rejected_verification(bot: LaosEKYCBot, session_id: str, decision: FrameDecision) -> None:
+    """Close realtime verification after a reject decision so the user can retry"""
+    print(f"[STOP] Verification rejected after {decision.frames} frames ({decision.reason}): {session_id}")
+    bot.conversation.set_progress("id_scanned")
+    await bot.stop_realtime_verification()
+
+
 @router.post("/send-frame", response_model=FrameResponse)
 async def send_frame(
     request: FrameRequest,
     session_id: str = Depends(get_session_id),
     bot: LaosEKYCBot = Depends(get_bot),
-    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
 ):
-    """Send frame for real-time verification"""
+    """Send frame for real-time verification (a repeated Idempotency-Key replays the first response)"""
+
+    async def run() -> Response:
+        # Own session: the work may outlive this request
+        async with AsyncSessionLocal() as db:
+            return await _send_frame(request, session_id, bot, db)
+
+    return await idempotency_store.run("send-frame", session_id, idempotency_key, run)
+
+
+async def _send_frame(
+    request: FrameRequest,
+    session_id: str,
+    bot: LaosEKYCBot,
+    db: AsyncSession,
+) -> Response:
     print("\n" + "="*80)
     print("[FRAME] SEND FRAME REQUEST RECEIVED")
     print("="*80)
@@ -170,7 +297,7 @@ async def send_frame(
 
     if not realtime_client:
         print("[ERROR] WebSocket client not initialized")
-        return FrameResponse(success=False, error="WebSocket client not initialized")
+        return model_response(FrameResponse(success=False, error="WebSocket client not initialized"))
 
     # Log current status
     status = realtime_client.get_status()
@@ -181,116 +308,81 @@ async def send_frame(
     if not realtime_client.is_healthy():
         error_msg = f"WebSocket connection not healthy: connected={realtime_client.is_connected}, ws_exists={realtime_client.ws is not None}"
         print(f"[WARN]  {error_msg}")
-        return FrameResponse(success=False, error="WebSocket connection is not healthy. Please restart verification.")
+        return model_response(FrameResponse(success=False, error="WebSocket connection is not healthy. Please restart verification."))
 
     try:
-        # Send frame via WebSocket (SYNC method)
         print("[SEND] Attempting to send frame...")
-        success = realtime_client.send_frame(request.frame_base64)
+        # Waits (up to FRAME_RESULT_TIMEOUT) for the result of this frame,
+        # unless a newer frame from this session replaces it first
+        frame = _decode_frame(request.frame_base64)
+        outcome = await realtime_client.frames.submit(frame)
+        success, result = outcome.sent, outcome.result
+
+        if outcome.dropped:
+            print("[SKIP]  Frame dropped: a newer frame replaced it")
+            return model_response(FrameResponse(
+                success=True,
+                dropped=True,
+                message="Frame dropped: a newer frame replaced it",
+                capture_interval_ms=outcome.capture_interval_ms,
+            ))
+
+        if outcome.rejected:
+            print(f"[SKIP]  Frame rejected by pre-filter: {outcome.rejected}")
+            return model_response(FrameResponse(
+                success=True,
+                rejected=outcome.rejected,
+                message=outcome.hint,
+            ))
 
         if success:
-            print("[OK] Frame sent successfully, waiting for result...")
-            await asyncio.sleep(0.05)
-
-            # Try to get result
-            result = realtime_client.get_last_result()
+            print("[OK] Frame sent successfully")
+            # Accept/reject over a window of frames, not on any single one
+            decision = realtime_client.decisions.add(result)
 
             if result and "bbox" in result:
                 print("="*80)
                 print("[OK] RESPONSE FROM WEBSOCKET (Valid):")
                 print(json.dumps(result, indent=2, ensure_ascii=False))
                 print("="*80 + "\n")
-
-                # Check if verification succeeded
-                if result.get("same_person") is True:
-                    print(f"[RESET] Verification successful! Saving record and deleting bot session: {session_id}")
-
-                    # --- Persistence Logic START ---
-                    # --- Persistence Logic START ---
-                    # 1. Save Selfie Image
-                    import base64
-                    import os
-                    from app.database.models import EKYCRecord
-                    from uuid import UUID
-                    from datetime import datetime
-
-                    # Create filename
-                    file_ext = "jpg"
-                    filename = f"selfie_{session_id}_{int(datetime.utcnow().timestamp())}.{file_ext}"
-                    upload_dir = "static/uploads"
-                    os.makedirs(upload_dir, exist_ok=True)
-                    file_path = os.path.join(upload_dir, filename)
-
-                    # Decode and save selfie image
-                    base64_data = request.frame_base64
-                    if "," in base64_data:
-                        base64_data = base64_data.split(",")[1]
-
-                    with open(file_path, "wb") as f:
-                        f.write(base64.b64decode(base64_data))
-
-                    selfie_url = f"/static/uploads/{filename}"
-
-                    # Create EKYC Record with session_id
-                    context = bot.conversation.context or {}
-                    session_uuid = UUID(session_id)
-
-                    new_record = EKYCRecord(
-                        session_id=session_uuid,
-                        id_card_image_url=context.get("id_card_url"),
-                        selfie_image_url=selfie_url,
-                        ocr_data=jsonable_encoder(context.get("scan_result")),
-                        face_match_score=result.get("similarity"),
-                        is_verified=True,
-                        verified_at=datetime.utcnow()
-                    )
-                    db.add(new_record)
-                    await db.commit()
-                    print(f"[DB] EKYC Record saved for session: {session_id}")
-
-                    # Save to Chat History
-                    chat_service = ChatPersistenceService(db)
-                    msg_content = "ການຢັ້ງຢືນໃບໜ້າສຳເລັດ! ຕົວຕົນຂອງທ່ານໄດ້ຖືກຢືນຢັນແລ້ວ."
-                    preserved_context = jsonable_encoder({
-                        "scan_result": context.get("scan_result"),
-                        "id_card_url": context.get("id_card_url"),
-                    })
-                    await chat_service.save_message(
-                        session_id=session_uuid,
-                        role="assistant",
-                        content=msg_content,
-                        context=preserved_context,
-                        progress="idle"
-                    )
-                    # --- Persistence Logic END ---
-
-                    delete_bot_session(session_id)
-
-                return FrameResponse(
-                    success=True,
-                    message="Frame sent successfully",
-                    result=result
-                )
             else:
                 # No bbox in result yet
                 print(f"[WARN]  No bbox in result: {result}")
                 print("="*80 + "\n")
-                return FrameResponse(
-                    success=True,
-                    message="Frame sent successfully",
-                    result=result
-                )
+
+            # Check if verification concluded
+            if decision and decision.outcome == "accepted":
+                print(f"[RESET] Verification successful after {decision.frames} frames! Saving record and deleting bot session: {session_id}")
+
+                try:
+                    await save_verified_selfie(bot, session_id, frame, decision.similarity, db)
+                except Exception:
+                    # No EKYC record was committed: let the next frames decide again
+                    realtime_client.decisions.retract()
+                    raise
+
+                await delete_bot_session(session_id)
+            elif decision:
+                await end_rejected_verification(bot, session_id, decision)
+
+            return model_response(FrameResponse(
+                success=True,
+                message="Frame sent successfully",
+                result=result,
+                decision=decision.outcome if decision else None,
+                capture_interval_ms=outcome.capture_interval_ms,
+            ))
         else:
             print(f"[ERROR] Frame send failed")
             print("="*80 + "\n")
-            return FrameResponse(success=False, error="Could not send frame to WebSocket server")
+            return model_response(FrameResponse(success=False, error="Could not send frame to WebSocket server"))
 
     except Exception as e:
         print(f"[ERROR] Exception in send_frame: {type(e).__name__}: {str(e)}")
         import traceback
         traceback.print_exc()
         print("="*80 + "\n")
-        return FrameResponse(success=False, error=f"Error sending frame: {str(e)}")
+        return model_response(FrameResponse(success=False, error=f"Error sending frame: {str(e)}"))
 
 
 @router.get("/ws-status")
@@ -322,9 +414,7 @@ async def stop_websocket_verification(
     """Stop WebSocket verification"""
 
     try:
-        # Run sync method in thread executor
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, bot.stop_realtime_verification)
+        await bot.stop_realtime_verification()
         return VerifyFaceResponse(
             success=True,
             result={"message": "WebSocket verification stopped"}
@@ -333,3 +423,137 @@ async def stop_websocket_verification(
     except Exception as e:
         print(f"Exception in stop_websocket_verification: {str(e)}")
         return VerifyFaceResponse(success=False, error=f"Error stopping WebSocket: {str(e)}")
+
+
+@router.websocket("/ws/verify")
+async def verify_frames_websocket(
+    websocket: WebSocket,
+    session_id: str = Query(...),
+):
+    """
+    Stream camera frames for realtime verification over one WebSocket
+
+    Browsers cannot set headers on a WebSocket, so the session comes from the
+    ``session_id`` query parameter; realtime verification must already be
+    started with /start-ws-verification. Each binary message is one JPEG
+    frame; the reply to each is a FrameResponse (JSON text) carrying the
+    frame's sequence number - frames the face server could not keep up with
+    are answered as dropped. The socket is closed once the session is accepted or rejected.
+    """
+    await websocket.accept()
+
+    bot = find_bot(session_id)
+    realtime_client = bot.face_verification_service.realtime_client if bot else None
+    if realtime_client is None or not realtime_client.is_healthy():
+        await websocket.send_text(FrameResponse(
+            success=False,
+            error="Realtime verification is not started. Please restart verification.",
+        ).model_dump_json())
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    metrics.increment("verify_ws_connections_total")
+    started = time.perf_counter()
+    frames = 0
+    concluded = asyncio.Event()
+    send_lock = asyncio.Lock()
+    tasks = set()
+
+    async def reply(response: FrameResponse) -> None:
+        async with send_lock:
+            await websocket.send_text(response.model_dump_json())
+
+    async def verify(seq: int, frame: bytes) -> None:
+        # Raw JPEG all the way: base64 only on the way to the face server
+        outcome = await realtime_client.frames.submit(frame)
+        if concluded.is_set():
+            return
+        if outcome.dropped:
+            await reply(FrameResponse(
+                success=True, frame=seq, dropped=True, message="Frame dropped",
+                capture_interval_ms=outcome.capture_interval_ms,
+            ))
+            return
+        if outcome.rejected:
+            await reply(FrameResponse(success=True, frame=seq, rejected=outcome.rejected, message=outcome.hint))
+            return
+        if not outcome.sent:
+            await reply(FrameResponse(success=False, frame=seq, error="Could not send frame to WebSocket server"))
+            return
+
+        result = outcome.result
+        decision = realtime_client.decisions.add(result)
+        if decision:
+            concluded.set()
+            if decision.outcome == "accepted":
+                print(f"[RESET] Verification successful after {decision.frames} frames! Saving record and deleting bot session: {session_id}")
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await save_verified_selfie(bot, session_id, frame, decision.similarity, db)
+                except Exception:
+                    # No EKYC record was committed: a reconnecting client can decide again
+                    realtime_client.decisions.retract()
+                    raise
+                await delete_bot_session(session_id)
+            else:
+                await end_rejected_verification(bot, session_id, decision)
+
+        await reply(FrameResponse(
+            success=True, frame=seq, message="Frame verified", result=result,
+            decision=decision.outcome if decision else None,
+            capture_interval_ms=outcome.capture_interval_ms,
+        ))
+        if decision:
+            await websocket.close()
+
+    async def process(seq: int, frame: bytes) -> None:
+        """Verify one frame as a background task: a failure ends the socket, never silently"""
+        try:
+            await verify(seq, frame)
+        except Exception as e:
+            print(f"[ERROR] Exception verifying frame {seq}: {type(e).__name__}: {e}")
+            import traceback
+            traceback.print_exc()
+            try:
+                await reply(FrameResponse(success=False, frame=seq, error=f"Error verifying frame: {str(e)}"))
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            except (RuntimeError, WebSocketDisconnect):
+                pass  # Already closed
+
+    try:
+        while not concluded.is_set():
+            frame = await websocket.receive_bytes()
+            frames += 1
+            metrics.increment("verify_ws_frames_total")
+            metrics.observe("verify_ws_frame_bytes", len(frame))
+
+            if len(frame) > settings.VERIFY_WS_MAX_FRAME_BYTES:
+                await reply(FrameResponse(success=False, frame=frames, error="Frame too large"))
+                continue
+            if not realtime_client.is_healthy():
+                await reply(FrameResponse(success=False, frame=frames, error="WebSocket connection is not healthy. Please restart verification."))
+                break
+
+            # Keep reading while earlier frames are verified, so a newer
+            # frame can replace one still waiting for the face server
+            task = asyncio.create_task(process(frames, frame))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"[ERROR] Exception in verify websocket: {type(e).__name__}: {e}")
+        try:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        except RuntimeError:
+            pass  # Already closed
+    finally:
+        if concluded.is_set():
+            # Let the deciding frame finish persisting and replying
+            await asyncio.gather(*tasks, return_exceptions=True)
+        else:
+            for task in tasks:
+                task.cancel()
+        elapsed = time.perf_counter() - started
+        if frames and elapsed > 0:
+            metrics.observe("verify_ws_frames_per_second", frames / elapsed)
@@ -3,11 +3,13 @@ Main bot class that orchestrates all services
 """
 
 import json
-from typing import Dict, Any, Optional, AsyncGenerator
+from typing import Dict, Any, Callable, Optional, AsyncGenerator
 from app.services.ai_service import AIService
 from app.services.ocr_service import OCRService
 from app.services.face_service import FaceVerificationService
+from app.services.image_processing import ImageContent
 from app.models.conversation import Conversation
+from app.services.conversation_snapshot import ConversationSnapshot
 
 
 class LaosEKYCBot:
@@ -88,23 +90,38 @@ class LaosEKYCBot:
                 "message": f"Error: {str(e)}"
             }
 
-    async def process_image_upload(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    async def process_image_upload(
+        self,
+        file_content: ImageContent,
+        filename: str,
+        content_hash: Optional[str] = None,
+        on_stage: Optional[Callable[[str], None]] = None,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Complete image processing: upload and scan
 
         Args:
-            file_content: Image file bytes
+            file_content: Image file bytes or seekable file
             filename: Original filename
+            content_hash: SHA-256 hex digest of the content if already computed
+            on_stage: Optional progress callback ("uploading", "scanning")
+            session_id: Uploading session, for the near-duplicate image check
 
         Returns:
             Processing result with scan data
         """
-        result = await self.ocr_service.process_image(file_content, filename)
+        result = await self.ocr_service.process_image(
+            file_content, filename, content_hash, on_stage, session_id
+        )
 
         if result.get("success"):
             # Save ID card URL and scan result to context
             self.conversation.set_context("id_card_url", result.get("image_url"))
             self.conversation.set_context("scan_result", result.get("scan_result"))
+            self.conversation.set_context("id_card_phash", result.get("phash"))
+            # Near-duplicates in "flag" mode, kept with the session for review
+            self.conversation.set_context("duplicate_of", result.get("duplicate_of"))
             self.conversation.set_progress("id_scanned")
             print(f"Progress updated: {self.conversation.progress}")
 
@@ -148,21 +165,22 @@ class LaosEKYCBot:
 
         return result
 
-    def start_realtime_verification(self, id_card_image_url: str):
+    async def start_realtime_verification(self, id_card_image_url: str, id_card_base64: Optional[str] = None):
         """
         Start real-time face verification
 
         Args:
             id_card_image_url: URL of ID card image
+            id_card_base64: Prefetched ID card image, skips the blocking download
 
         Returns:
             RealtimeFaceVerificationClient instance
         """
-        return self.face_verification_service.start_realtime_verification(id_card_image_url)
+        return await self.face_verification_service.start_realtime_verification(id_card_image_url, id_card_base64)
 
-    def stop_realtime_verification(self):
+    async def stop_realtime_verification(self):
         """Stop real-time face verification"""
-        self.face_verification_service.stop_realtime_verification()
+        await self.face_verification_service.stop_realtime_verification()
 
     def reset_conversation(self):
         """Reset conversation to initial state"""
@@ -173,9 +191,20 @@ class LaosEKYCBot:
         messages = state.get("messages", [])
         context = state.get("context", {})
         progress = state.get("progress", "idle")
+        history_offset = state.get("history_offset", 0)
+
+        self.conversation.load_from_state(messages, context, progress, history_offset)
+        print(f"Restored conversation: {len(messages)} messages ({history_offset} older not loaded), progress={progress}")
 
-        self.conversation.load_from_state(messages, context, progress)
-        print(f"Restored conversation: {len(messages)} messages, progress={progress}")
+    def restore_from_snapshot(self, snapshot: ConversationSnapshot, window: Optional[int] = None):
+        """Restore conversation state from a binary snapshot, keeping the last ``window`` messages"""
+        self.conversation.load_from_snapshot(
+            snapshot.rows, snapshot.context, snapshot.progress, window, snapshot.history_offset
+        )
+        print(
+            f"Restored conversation from snapshot: {len(self.conversation.messages)} messages "
+            f"({self.conversation.history_offset} older not loaded), progress={snapshot.progress}"
+        )
 
     def get_conversation_history(self) -> list:
         """Get conversation history"""
@@ -5,6 +5,8 @@ Database connection module
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
+from app.database.migrations import add_missing_columns, copy_legacy_rows, rename_legacy_tables
+from app.database.partitions import ensure_partitions
 
 
 class Base(DeclarativeBase):
@@ -37,6 +39,10 @@ async def get_db() -> AsyncSession:
 
 
 async def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and monthly partitions, upgrading older schemas in place"""
     async with engine.begin() as conn:
+        legacy = await rename_legacy_tables(conn)
         await conn.run_sync(Base.metadata.create_all)
+        await add_missing_columns(conn)
+        await ensure_partitions(conn)
+        await copy_legacy_rows(conn, legacy)
@@ -0,0 +1,122 @@
+"""
+In-place schema upgrades for databases created before the current models
+
+``Base.metadata.create_all`` only creates missing tables; it never changes
+existing ones. init_db runs these steps around it so a deployed database
+catches up on startup. They can also be run on their own:
+
+Usage:
+    python -m app.database.migrations
+"""
+
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.database.partitions import (
+    PARTITIONED_TABLES,
+    add_months,
+    create_monthly_partition,
+    month_start,
+)
+
+# Nullable columns added to existing tables after they were first deployed
+ADDED_COLUMNS = (
+    ("ekyc_records", "id_card_phash", "BIGINT"),
+    ("ekyc_records", "duplicate_of", "JSONB"),
+    ("chat_logs", "snapshot", "BYTEA"),
+)
+
+LEGACY_SUFFIX = "_legacy"
+
+
+async def _relkind(conn: AsyncConnection, table: str) -> Optional[str]:
+    """pg_class.relkind of a table: 'r' plain, 'p' partitioned, None if missing"""
+    return (await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :table AND relnamespace = 'public'::regnamespace"),
+        {"table": table},
+    )).scalar()
+
+
+async def _columns(conn: AsyncConnection, table: str) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = :table ORDER BY ordinal_position"
+        ),
+        {"table": table},
+    )
+    return [name for (name,) in result]
+
+
+async def rename_legacy_tables(conn: AsyncConnection) -> List[str]:
+    """
+    Move plain (unpartitioned) tables that must now be partitioned out of the
+    way, indexes included, so create_all can create the partitioned ones
+
+    Returns:
+        Names of the tables renamed to ``<table>_legacy``
+    """
+    renamed = []
+    for table in PARTITIONED_TABLES:
+        if await _relkind(conn, table) != "r":
+            continue
+        legacy = table + LEGACY_SUFFIX
+        indexes = await conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE schemaname = 'public' AND tablename = :table"),
+            {"table": table},
+        )
+        # Index (and primary/unique constraint) names are schema-wide
+        for (index,) in indexes.all():
+            await conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}{LEGACY_SUFFIX}"'))
+        await conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+        print(f"[MIGRATE] {table} is not partitioned: renamed to {legacy}")
+        renamed.append(table)
+    return renamed
+
+
+async def add_missing_columns(conn: AsyncConnection) -> None:
+    """Add columns introduced after a table was created (propagates to its partitions)"""
+    for table, column, column_type in ADDED_COLUMNS:
+        await conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS "{column}" {column_type}'))
+
+
+async def copy_legacy_rows(conn: AsyncConnection, tables: List[str], now: Optional[datetime] = None) -> None:
+    """
+    Copy the rows of renamed legacy tables into their partitioned
+    replacements, creating the monthly partitions they fall in, then drop them
+    """
+    current = month_start(now or datetime.utcnow())
+    for table in tables:
+        legacy = table + LEGACY_SUFFIX
+        oldest = (await conn.execute(text(f'SELECT min(created_at) FROM "{legacy}"'))).scalar()
+        if oldest is not None:
+            start = month_start(oldest)
+            while start < current:
+                await create_monthly_partition(conn, table, start)
+                start = add_months(start, 1)
+
+        new_columns = set(await _columns(conn, table))
+        shared = ", ".join(f'"{c}"' for c in await _columns(conn, legacy) if c in new_columns)
+        result = await conn.execute(text(f'INSERT INTO "{table}" ({shared}) SELECT {shared} FROM "{legacy}"'))
+        await conn.execute(text(f'DROP TABLE "{legacy}"'))
+        print(f"[MIGRATE] Copied {result.rowcount} row(s) from {legacy} into partitioned {table}")
+
+
+def main() -> None:
+    from app.database.connection import engine, init_db
+
+    async def run():
+        try:
+            await init_db()
+        finally:
+            await engine.dispose()
+        print("[MIGRATE] Schema is up to date")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
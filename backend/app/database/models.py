@@ -5,15 +5,16 @@ Database models for the eKYC system
 import uuid
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Boolean, Float, Text, DateTime
+from sqlalchemy import BigInteger, String, Boolean, Float, Text, DateTime, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.database.connection import Base
 
 
 class EKYCRecord(Base):
-    """eKYC verification record"""
+    """eKYC verification record (range-partitioned by month on created_at)"""
     __tablename__ = "ekyc_records"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -28,33 +29,53 @@ class EKYCRecord(Base):
     )
     id_card_image_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     selfie_image_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # 64-bit dHash of the ID card image (stored signed) for near-duplicate detection
+    id_card_phash: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    # [{"session_id", "distance"}] near-duplicates flagged at upload, for review
+    duplicate_of: Mapped[Optional[list]] = mapped_column(JSONB, nullable=True)
     ocr_data: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     face_match_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     is_verified: Mapped[bool] = mapped_column(Boolean, default=False)
     verified_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Partition key - must be part of the primary key on a partitioned table
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        primary_key=True,
+        default=datetime.utcnow
+    )
 
 
 class ChatLog(Base):
-    """Chat history log"""
+    """Chat history log (range-partitioned by month on created_at)"""
     __tablename__ = "chat_logs"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4
     )
-    # Changed: session_id instead of user_id with foreign key
+    # One chat log per session. ChatPersistenceService.save_message enforces it
+    # with a per-session advisory lock: a unique constraint on a partitioned
+    # table would have to include created_at. The row is partitioned by when
+    # the session started but keeps being appended to (updated_at), so the
+    # archive job skips partitions that still hold recently updated sessions.
     session_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
-        unique=True,  # One chat log per session
         nullable=False,
         index=True
     )
     messages: Mapped[Optional[list]] = mapped_column(JSONB, default=list)
     context: Mapped[Optional[dict]] = mapped_column(JSONB, default=dict)
     progress: Mapped[str] = mapped_column(String(50), default="idle")
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Compressed binary copy of messages/context/progress used for fast restore
+    snapshot: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    # Partition key - must be part of the primary key on a partitioned table
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        primary_key=True,
+        default=datetime.utcnow
+    )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -0,0 +1,102 @@
+"""
+Monthly range partition management for ekyc_records and chat_logs
+"""
+
+import re
+from datetime import datetime
+from typing import List, Optional, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+
+# Tables declared with postgresql_partition_by="RANGE (created_at)"
+PARTITIONED_TABLES = ("ekyc_records", "chat_logs")
+
+_PARTITION_NAME_RE = re.compile(r"^(?P<table>[a-z_]+)_y(?P<year>\d{4})m(?P<month>\d{2})$")
+
+
+class MonthlyPartition(NamedTuple):
+    """A monthly partition and its [start, end) range"""
+    table: str
+    name: str
+    start: datetime
+    end: datetime
+
+
+def month_start(value: datetime) -> datetime:
+    """Truncate a datetime to the first instant of its month"""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift a month-start datetime by a number of months"""
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    """Name of the partition holding the month starting at ``start``"""
+    return f"{table}_y{start.year:04d}m{start.month:02d}"
+
+
+async def create_monthly_partition(conn: AsyncConnection, table: str, start: datetime) -> str:
+    """Create (if missing) the partition of ``table`` for the month starting at ``start``"""
+    end = add_months(start, 1)
+    name = partition_name(table, start)
+    await conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    return name
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    months_ahead: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Create the current month's partition, the next few months and a DEFAULT
+    partition for every partitioned table. Safe to run repeatedly.
+
+    Returns:
+        Names of the partitions that were checked/created
+    """
+    months_ahead = settings.PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+    current = month_start(now or datetime.utcnow())
+    names = []
+
+    for table in PARTITIONED_TABLES:
+        for offset in range(months_ahead + 1):
+            names.append(await create_monthly_partition(conn, table, add_months(current, offset)))
+
+        # Catches rows outside the pre-created range instead of failing the insert
+        await conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT'
+        ))
+
+    return names
+
+
+async def list_monthly_partitions(conn: AsyncConnection, table: str) -> List[MonthlyPartition]:
+    """List the attached monthly partitions of a table, oldest first"""
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    )
+
+    partitions = []
+    for (name,) in result:
+        match = _PARTITION_NAME_RE.match(name)
+        if not match or match.group("table") != table:
+            continue  # DEFAULT partition or foreign naming
+        start = datetime(int(match.group("year")), int(match.group("month")), 1)
+        partitions.append(MonthlyPartition(table, name, start, add_months(start, 1)))
+
+    return sorted(partitions, key=lambda p: p.start)
@@ -0,0 +1 @@
+"""Background and command-line jobs package"""
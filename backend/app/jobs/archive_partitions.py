@@ -0,0 +1,200 @@
+"""
+Archive old monthly partitions to compressed NDJSON and detach them
+
+Usage:
+    python -m app.jobs.archive_partitions [--retention-months 6] [--output-dir archive]
+                                          [--drop] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import gzip
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from sqlalchemy import text
+
+from app.config import settings
+from app.database.connection import engine
+from app.database.partitions import (
+    PARTITIONED_TABLES,
+    MonthlyPartition,
+    add_months,
+    ensure_partitions,
+    list_monthly_partitions,
+    month_start,
+)
+from app.utils.metrics import metrics
+
+# Tables whose rows keep changing after insert, with the column tracking that.
+# A partition is only archived once none of its rows changed after the cutoff.
+ACTIVITY_COLUMNS = {"chat_logs": "updated_at"}
+
+
+async def _has_activity(conn, partition: MonthlyPartition, since: datetime) -> bool:
+    """Whether any row of the partition changed at or after ``since`` (tables in ACTIVITY_COLUMNS only)"""
+    activity_column = ACTIVITY_COLUMNS.get(partition.table)
+    if not activity_column:
+        return False
+    return bool((await conn.execute(
+        text(f'SELECT EXISTS (SELECT 1 FROM "{partition.name}" WHERE "{activity_column}" >= :since)'),
+        {"since": since},
+    )).scalar())
+
+
+async def archive_partition(
+    partition: MonthlyPartition,
+    output_dir: str,
+    batch_size: int,
+    drop: bool = False,
+    active_since: Optional[datetime] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Stream one partition to ``<output_dir>/<table>/<partition>.ndjson.gz`` through a
+    server-side cursor, then detach (and optionally drop) it.
+
+    Everything runs in one transaction holding a SHARE lock on the partition,
+    so no row can change between the activity check, the export and the
+    detach. The archive file only appears once that transaction commits.
+
+    Returns:
+        Throughput statistics for the partition, or None if it had rows
+        changed at or after ``active_since`` and was left attached
+    """
+    table_dir = os.path.join(output_dir, partition.table)
+    os.makedirs(table_dir, exist_ok=True)
+    final_path = os.path.join(table_dir, f"{partition.name}.ndjson.gz")
+    tmp_path = final_path + ".part"
+
+    start = time.perf_counter()
+    rows = 0
+
+    try:
+        async with engine.begin() as conn:
+            # Blocks writers (readers still pass) until the detach commits
+            await conn.execute(text(f'LOCK TABLE "{partition.name}" IN SHARE MODE'))
+            if active_since is not None and await _has_activity(conn, partition, active_since):
+                return None
+
+            # row_to_json lets Postgres do the encoding; rows arrive batch_size at a time
+            result = await conn.stream(
+                text(f'SELECT row_to_json(t)::text FROM "{partition.name}" AS t'),
+                execution_options={"yield_per": batch_size},
+            )
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+                async for (line,) in result:
+                    fh.write(line)
+                    fh.write("\n")
+                    rows += 1
+
+            await conn.execute(text(f'ALTER TABLE "{partition.table}" DETACH PARTITION "{partition.name}"'))
+            if drop:
+                await conn.execute(text(f'DROP TABLE "{partition.name}"'))
+    except BaseException:
+        # Rolled back: the partition is still attached, so no archive file either
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, final_path)
+
+    elapsed = time.perf_counter() - start
+    compressed_bytes = os.path.getsize(final_path)
+
+    metrics.increment("archive_rows_total", rows, table=partition.table)
+    metrics.increment("archive_bytes_total", compressed_bytes, table=partition.table)
+    metrics.observe("archive_partition_seconds", elapsed, table=partition.table)
+
+    return {
+        "table": partition.table,
+        "partition": partition.name,
+        "path": final_path,
+        "rows": rows,
+        "bytes": compressed_bytes,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+        "dropped": drop,
+    }
+
+
+async def archive_old_partitions(
+    retention_months: Optional[int] = None,
+    output_dir: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    drop: bool = False,
+    dry_run: bool = False,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """Archive every monthly partition that ends before the retention cutoff"""
+    retention_months = settings.ARCHIVE_RETENTION_MONTHS if retention_months is None else retention_months
+    output_dir = output_dir or settings.ARCHIVE_DIR
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention_months)
+
+    # Keep future partitions topped up while we are here
+    async with engine.begin() as conn:
+        await ensure_partitions(conn)
+
+    candidates = []
+    async with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            for partition in await list_monthly_partitions(conn, table):
+                if partition.end <= cutoff:
+                    candidates.append(partition)
+
+    print(f"[ARCHIVE] Cutoff {cutoff.date()}: {len(candidates)} partition(s) to archive")
+
+    stats = []
+    for partition in candidates:
+        if dry_run:
+            async with engine.connect() as conn:
+                active = await _has_activity(conn, partition, cutoff)
+            print(f"[ARCHIVE] Would {'skip (still active)' if active else 'archive'} {partition.name}")
+            continue
+        result = await archive_partition(partition, output_dir, batch_size, drop=drop, active_since=cutoff)
+        if result is None:
+            print(f"[ARCHIVE] Skipping {partition.name}: it still holds sessions updated since {cutoff.date()}")
+            metrics.increment("archive_partitions_skipped_total", table=partition.table)
+            continue
+        print(
+            f"[ARCHIVE] {result['partition']}: {result['rows']} rows, "
+            f"{result['bytes']} bytes in {result['seconds']}s ({result['rows_per_sec']} rows/s)"
+        )
+        stats.append(result)
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Archive and detach old monthly partitions")
+    parser.add_argument("--retention-months", type=int, default=None)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--drop", action="store_true", help="Drop partitions after detaching")
+    parser.add_argument("--dry-run", action="store_true", help="Only list partitions to archive")
+    args = parser.parse_args(argv)
+
+    async def run():
+        try:
+            stats = await archive_old_partitions(
+                retention_months=args.retention_months,
+                output_dir=args.output_dir,
+                batch_size=args.batch_size,
+                drop=args.drop,
+                dry_run=args.dry_run,
+            )
+        finally:
+            await engine.dispose()
+
+        total_rows = sum(s["rows"] for s in stats)
+        total_seconds = sum(s["seconds"] for s in stats)
+        if stats:
+            rate = round(total_rows / total_seconds, 1) if total_seconds > 0 else None
+            print(f"[ARCHIVE] Done: {total_rows} rows in {round(total_seconds, 3)}s ({rate} rows/s)")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
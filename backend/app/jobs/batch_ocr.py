@@ -0,0 +1,253 @@
+"""
+Re-process archived ID images offline: OCR scan and optional face match
+
+Usage:
+    python -m app.jobs.batch_ocr (--input-dir DIR | --manifest FILE) --output results.ndjson
+                                 [--concurrency 4] [--rate 5] [--retry-failed]
+
+A manifest is NDJSON with one item per line:
+    {"id": "A-001", "id_card": "cards/a001.jpg", "selfie": "selfies/a001.jpg"}
+("id" defaults to the ID card path and "selfie" is optional; relative paths are
+resolved against the manifest's directory). A plain path per line is accepted too.
+
+Results are appended to the output file as each item finishes, so it doubles as
+the checkpoint: re-running with the same output skips items already recorded.
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from app.config import settings
+from app.services.face_service import FaceVerificationClient
+from app.services.http_client import close_upstream_clients
+from app.services.image_store import image_store
+from app.services.ocr_service import OCRService
+from app.utils.metrics import metrics
+from app.utils.serialization import JSONDecodeError, json_dumps, json_loads
+from app.utils.workers import shutdown_process_pool
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart across all workers"""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def iter_directory(input_dir: str) -> Iterator[Dict[str, Any]]:
+    """Yield every image with an allowed extension under ``input_dir``, in a stable order"""
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if "." not in name or name.rsplit(".", 1)[1].lower() not in settings.ALLOWED_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            yield {"id": os.path.relpath(path, input_dir), "id_card": path, "selfie": None}
+
+
+def iter_manifest(manifest: str) -> Iterator[Dict[str, Any]]:
+    """Yield items from an NDJSON (or one path per line) manifest"""
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, "r", encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    entry = json_loads(line)
+                except JSONDecodeError as e:
+                    print(f"[BATCH] Skipping manifest line {line_no}: {e}")
+                    continue
+            else:
+                entry = {"id_card": line}
+
+            id_card = entry.get("id_card")
+            if not id_card:
+                print(f"[BATCH] Skipping manifest line {line_no}: missing id_card")
+                continue
+            selfie = entry.get("selfie")
+            yield {
+                "id": str(entry.get("id") or id_card),
+                "id_card": os.path.join(base_dir, id_card),
+                "selfie": os.path.join(base_dir, selfie) if selfie else None,
+            }
+
+
+def load_checkpoint(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """Get ids already recorded in the output file (the last record per id wins)"""
+    statuses: Dict[str, str] = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json_loads(line)
+            except JSONDecodeError:
+                # A torn last line from an interrupted run; the item is redone
+                continue
+            statuses[record["id"]] = record.get("status")
+    return {
+        item_id for item_id, status in statuses.items()
+        if not (retry_failed and status != "ok")
+    }
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+async def process_item(
+    item: Dict[str, Any],
+    ocr_service: OCRService,
+    face_client: FaceVerificationClient,
+) -> Dict[str, Any]:
+    """OCR one ID card and, if a selfie is given, face-match it against the card"""
+    start = time.perf_counter()
+    record: Dict[str, Any] = {"id": item["id"], "id_card": item["id_card"], "selfie": item["selfie"]}
+    try:
+        id_card_bytes = await asyncio.to_thread(_read_file, item["id_card"])
+        ocr_result = await ocr_service.process_image(id_card_bytes, os.path.basename(item["id_card"]))
+        record["ocr"] = ocr_result
+        ok = bool(ocr_result.get("success"))
+        if not ok:
+            record["error"] = ocr_result.get("error")
+
+        if ok and item["selfie"]:
+            selfie_bytes = await asyncio.to_thread(_read_file, item["selfie"])
+            face_result = await face_client.verify_face_base64(
+                base64.b64encode(id_card_bytes).decode("utf-8"),
+                base64.b64encode(selfie_bytes).decode("utf-8"),
+            )
+            record["face"] = face_result
+            ok = bool(face_result.get("success"))
+            if not ok:
+                record["error"] = face_result.get("error")
+
+        record["status"] = "ok" if ok else "failed"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    metrics.increment("batch_ocr_items_total", status=record["status"])
+    metrics.observe("batch_ocr_item_seconds", record["seconds"])
+    return record
+
+
+async def run_batch(
+    items: Iterator[Dict[str, Any]],
+    output_path: str,
+    concurrency: int = 4,
+    rate: Optional[float] = None,
+    retry_failed: bool = False,
+    progress_every: int = 50,
+) -> Dict[str, Any]:
+    """
+    Process items with ``concurrency`` workers, at most ``rate`` items/sec,
+    appending one NDJSON record per finished item to ``output_path``
+
+    Returns:
+        Run statistics
+    """
+    done = load_checkpoint(output_path, retry_failed)
+    if done:
+        print(f"[BATCH] Resuming: {len(done)} item(s) already in {output_path}")
+
+    pending = (item for item in items if item["id"] not in done)
+    limiter = RateLimiter(rate)
+    ocr_service = OCRService()
+    face_client = FaceVerificationClient()
+    counts = {"ok": 0, "failed": 0}
+    start = time.perf_counter()
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def worker() -> None:
+            # Workers share one generator, so at most ``concurrency`` items are in memory
+            for item in pending:
+                await limiter.wait()
+                record = await process_item(item, ocr_service, face_client)
+                out.write(json_dumps(record))
+                out.write("\n")
+                out.flush()
+
+                counts[record["status"]] += 1
+                processed = counts["ok"] + counts["failed"]
+                if progress_every and processed % progress_every == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"[BATCH] {processed} item(s), {processed / elapsed:.2f} items/s")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    elapsed = time.perf_counter() - start
+    processed = counts["ok"] + counts["failed"]
+    return {
+        "processed": processed,
+        "ok": counts["ok"],
+        "failed": counts["failed"],
+        "skipped": len(done),
+        "seconds": round(elapsed, 3),
+        "items_per_sec": round(processed / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Batch OCR and face-match archived ID images")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input-dir", help="Directory of ID card images")
+    source.add_argument("--manifest", help="NDJSON manifest of id_card/selfie paths")
+    parser.add_argument("--output", required=True, help="NDJSON results file (also the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=None, help="Max items started per second")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-process items recorded as failed")
+    parser.add_argument("--progress-every", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    items = iter_directory(args.input_dir) if args.input_dir else iter_manifest(args.manifest)
+
+    async def run():
+        try:
+            stats = await run_batch(
+                items,
+                args.output,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                retry_failed=args.retry_failed,
+                progress_every=args.progress_every,
+            )
+        finally:
+            await close_upstream_clients()
+            shutdown_process_pool()
+            image_store.close()  # Removes this run's disk tier (image_store/<pid>/)
+
+        print(
+            f"[BATCH] Done: {stats['processed']} item(s) ({stats['ok']} ok, {stats['failed']} failed, "
+            f"{stats['skipped']} skipped) in {stats['seconds']}s ({stats['items_per_sec']} items/s)"
+        )
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,17 @@ from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
 from app.api.routes import chat, upload, verification, ekyc_profile
+from app.api.deps import session_reaper
+from app.api.middleware import MaxBodySizeMiddleware
 from app.database import init_db
+from app.services.face_pool import face_pool
+from app.services.http_client import close_upstream_clients
+from app.services.image_hash import load_phash_index, phash_available
+from app.services.image_store import image_store
+from app.services.ocr_jobs import ocr_job_manager
+from app.utils.metrics import metrics
+from app.utils.workers import shutdown_process_pool
+from app.utils.serialization import FastJSONResponse
 
 
 @asynccontextmanager
@@ -25,10 +35,23 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("Database initialized!")
 
+    if phash_available():
+        await load_phash_index()
+
+    ocr_job_manager.start()
+    face_pool.start()
+    session_reaper.start()
+
     yield
 
     # Shutdown
     print("Shutting down...")
+    await ocr_job_manager.stop()
+    await session_reaper.stop()
+    await face_pool.stop()
+    await close_upstream_clients()
+    shutdown_process_pool()
+    image_store.close()
 
 
 def create_app() -> FastAPI:
@@ -39,8 +62,13 @@ def create_app() -> FastAPI:
         version=settings.APP_VERSION,
         description="AI-Powered eKYC System for Lao Citizens",
         lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
 
+    # Reject oversized request bodies while they stream in (64 KB allowance for
+    # multipart framing). Added before CORS so 413 responses still get CORS headers.
+    app.add_middleware(MaxBodySizeMiddleware, max_body_size=settings.MAX_CONTENT_LENGTH + 64 * 1024)
+
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -62,6 +90,11 @@ def create_app() -> FastAPI:
     async def health_check():
         return {"status": "ok", "version": settings.APP_VERSION}
 
+    # In-process metrics endpoint
+    @app.get("/api/metrics")
+    async def get_metrics():
+        return metrics.snapshot()
+
     return app
 
 
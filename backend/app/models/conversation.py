@@ -4,17 +4,41 @@ Conversation and message models
 
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Literal
-from pydantic import BaseModel, Field
-
-
-class Message(BaseModel):
-    """Represents a chat message"""
-    role: Literal["user", "assistant", "system", "tool"]
-    content: str
-    timestamp: datetime = Field(default_factory=datetime.now)
-    tool_calls: Optional[List[Dict[str, Any]]] = None
-    tool_call_id: Optional[str] = None
-    name: Optional[str] = None
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+
+MESSAGE_ROLES = ("user", "assistant", "system", "tool")
+
+
+class Message:
+    """
+    Represents a chat message.
+    A plain slotted class: messages are created on every turn and restore, so
+    pydantic validation is kept to the request/response schemas.
+    """
+
+    __slots__ = ("role", "content", "timestamp", "tool_calls", "tool_call_id", "name")
+
+    def __init__(
+        self,
+        role: str,
+        content: Optional[str],
+        timestamp: Optional[datetime] = None,
+        tool_calls: Optional[List[Dict[str, Any]]] = None,
+        tool_call_id: Optional[str] = None,
+        name: Optional[str] = None,
+    ):
+        if role not in MESSAGE_ROLES:
+            raise ValueError(f"Invalid message role. Must be one of: {', '.join(MESSAGE_ROLES)}")
+        self.role = role
+        self.content = content if content is not None else ""
+        self.timestamp = timestamp or datetime.now()
+        self.tool_calls = tool_calls
+        self.tool_call_id = tool_call_id
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content[:40]!r})"
 
     def to_api_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for API calls"""
@@ -33,12 +57,19 @@ class Message(BaseModel):
 
 class Conversation(BaseModel):
     """Represents a conversation session"""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     messages: List[Message] = Field(default_factory=list)
     session_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     context: Dict[str, Any] = Field(default_factory=dict)
     progress: Literal["idle", "id_uploading", "id_scanned", "face_verifying"] = "idle"
+    # Number of older stored messages not loaded by a windowed restore
+    history_offset: int = 0
+
+    # Append-only cache of rendered API dicts, parallel to ``messages``
+    _api_cache: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
 
     def add_message(self, message: Message) -> None:
         """Add a message to the conversation"""
@@ -46,14 +77,25 @@ class Conversation(BaseModel):
         self.updated_at = datetime.now()
 
     def get_messages_for_api(self) -> List[Dict[str, Any]]:
-        """Get messages formatted for API calls"""
-        return [msg.to_api_dict() for msg in self.messages]
+        """
+        Get messages formatted for API calls.
+        Only messages appended since the last call are rendered; the returned
+        list is a fresh copy but the dicts are shared and must not be mutated.
+        """
+        cache = self._api_cache
+        if len(cache) > len(self.messages):
+            cache.clear()
+        for msg in self.messages[len(cache):]:
+            cache.append(msg.to_api_dict())
+        return list(cache)
 
     def clear(self) -> None:
         """Clear all messages and reset state"""
         self.messages.clear()
+        self._api_cache.clear()
         self.context.clear()
         self.progress = "idle"
+        self.history_offset = 0
         self.updated_at = datetime.now()
 
     def get_last_message(self) -> Optional[Message]:
@@ -94,12 +136,14 @@ class Conversation(BaseModel):
         """
         # Clear all messages (will be re-initialized with system message by AIService)
         self.messages.clear()
+        self._api_cache.clear()
 
         # Clear all context
         self.context.clear()
 
         # Reset progress to idle
         self.progress = "idle"
+        self.history_offset = 0
         self.updated_at = datetime.now()
 
     def get_progress_summary(self) -> Dict[str, Any]:
@@ -112,9 +156,10 @@ class Conversation(BaseModel):
             "verification_completed": self.context.get("verification_success", False)
         }
 
-    def load_from_state(self, messages: list, context: dict, progress: str) -> None:
-        """Load conversation state from stored data"""
+    def load_from_state(self, messages: list, context: dict, progress: str, history_offset: int = 0) -> None:
+        """Load conversation state from stored data (optionally only its most recent window)"""
         self.messages = []
+        self._api_cache.clear()
         for msg_data in messages:
             # Handle potential None values safely
             tool_calls = msg_data.get("tool_calls")
@@ -132,12 +177,48 @@ class Conversation(BaseModel):
                     pass
             self.messages.append(msg)
 
+        self.history_offset = history_offset
         self.context = context or {}
         # Simple validation for progress
         valid_progress = ["idle", "id_uploading", "id_scanned", "face_verifying"]
         self.progress = progress if progress in valid_progress else "idle"
         self.updated_at = datetime.now()
 
+    def load_from_snapshot(
+        self,
+        rows: list,
+        context: dict,
+        progress: str,
+        window: Optional[int] = None,
+        history_offset: int = 0,
+    ) -> None:
+        """
+        Load conversation state from a decoded binary snapshot, keeping only the
+        last ``window`` messages when given. ``history_offset`` counts rows the
+        decoder already skipped.
+        """
+        skipped = max(0, len(rows) - window) if window is not None else 0
+        if skipped:
+            rows = rows[skipped:]
+        history_offset += skipped
+
+        self._api_cache.clear()
+        self.messages = [
+            Message(
+                role=role,
+                content=content,
+                timestamp=timestamp,
+                tool_calls=tool_calls if tool_calls else None
+            )
+            for role, content, timestamp, tool_calls in rows
+        ]
+
+        self.history_offset = history_offset
+        self.context = context or {}
+        valid_progress = ["idle", "id_uploading", "id_scanned", "face_verifying"]
+        self.progress = progress if progress in valid_progress else "idle"
+        self.updated_at = datetime.now()
+
     def get_state(self) -> Dict[str, Any]:
         """Get full state for persistence"""
         return {
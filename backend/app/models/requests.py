@@ -41,6 +41,8 @@ class UploadResponse(BaseModel):
     message: Optional[str] = None
     id_card_url: Optional[str] = None
     tool_call: Optional[Dict[str, Any]] = None  # Tool call for frontend to execute
+    job_id: Optional[str] = None  # Set when the upload was queued as a background job
+    duplicate_of: Optional[List[Dict[str, Any]]] = None  # Near-duplicate uploads from other sessions
     error: Optional[str] = None
 
 
@@ -71,9 +73,14 @@ class FrameRequest(BaseModel):
 class FrameResponse(BaseModel):
     """Send frame response body"""
     success: bool = True
+    frame: Optional[int] = None  # Sequence number on /ws/verify
     message: Optional[str] = None
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    dropped: bool = False  # A newer frame replaced this one before it was verified
+    rejected: Optional[str] = None  # Pre-filter reason (message holds the user hint)
+    decision: Optional[str] = None  # "accepted" or "rejected" once the session concludes
+    capture_interval_ms: Optional[int] = None  # Capture no faster than this when set
 
 
 # Reset schemas
@@ -93,5 +100,6 @@ class ConversationStateResponse(BaseModel):
     context: Dict[str, Any] = {}
     progress: str = "idle"
     messages_count: int = 0
+    history_offset: int = 0  # Older stored messages not loaded into memory
     messages: Optional[List[Dict[str, Any]]] = None
     error: Optional[str] = None
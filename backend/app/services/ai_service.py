@@ -2,11 +2,11 @@
 AI Service for chatbot functionality with async support
 """
 
-import json
 import httpx
 from typing import Dict, Any, List, Optional, AsyncGenerator
 from app.config import settings
 from app.models.conversation import Conversation, Message
+from app.utils.serialization import json_loads, JSONDecodeError
 
 
 class AIService:
@@ -139,7 +139,7 @@ Act as a professional eKYC consultant."""
         self.conversation.add_message(user_message)
 
         # Prepare messages with context
-        messages = self.conversation.get_messages_for_api().copy()
+        messages = self.conversation.get_messages_for_api()
         messages.append(self._get_context_message())
 
         headers = {
@@ -193,7 +193,7 @@ Act as a professional eKYC consultant."""
         self.conversation.add_message(user_message)
 
         # Prepare messages with context
-        messages = self.conversation.get_messages_for_api().copy()
+        messages = self.conversation.get_messages_for_api()
         messages.append(self._get_context_message())
 
         headers = {
@@ -229,7 +229,7 @@ Act as a professional eKYC consultant."""
                             break
 
                         try:
-                            chunk_data = json.loads(data_content)
+                            chunk_data = json_loads(data_content)
 
                             if "choices" in chunk_data and len(chunk_data["choices"]) > 0:
                                 choice = chunk_data["choices"][0]
@@ -311,7 +311,7 @@ Act as a professional eKYC consultant."""
                                     }
                                     break
 
-                        except json.JSONDecodeError:
+                        except JSONDecodeError:
                             continue
 
         except httpx.RequestError as e:
@@ -6,9 +6,39 @@ from datetime import datetime
 from uuid import UUID
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, text, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import defer
 
+from app.config import settings
 from app.database.models import ChatLog
+from app.services.conversation_snapshot import (
+    ConversationSnapshot,
+    decode_snapshot,
+    encode_snapshot,
+    snapshots_enabled,
+)
+
+# Slice the JSONB messages array server-side so only the requested window is
+# transferred and decoded. Message indexes are 0-based: [start, end).
+_WINDOW_QUERY = text(
+    "SELECT c.context, c.progress, jsonb_array_length(c.messages) AS total, "
+    "COALESCE(("
+    "  SELECT jsonb_agg(e.elem ORDER BY e.idx) "
+    "  FROM jsonb_array_elements(c.messages) WITH ORDINALITY AS e(elem, idx) "
+    "  WHERE e.idx > :start AND e.idx <= :end"
+    "), '[]'::jsonb) AS messages "
+    "FROM chat_logs c WHERE c.session_id = :session_id"
+).columns(context=JSONB, progress=String, total=Integer, messages=JSONB)
+
+# Serialize writers of one session's chat log until their transaction ends.
+# A unique constraint on the partitioned table would have to include
+# created_at, so it could not stop two "first" inserts for a session.
+_SESSION_LOCK = text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))")
+
+_TOTAL_QUERY = text(
+    "SELECT jsonb_array_length(messages) FROM chat_logs WHERE session_id = :session_id"
+)
 
 
 class ChatPersistenceService:
@@ -20,7 +50,9 @@ class ChatPersistenceService:
     async def get_chat_history(self, session_id: UUID) -> Dict[str, Any]:
         """Load chat history and state for a session"""
         result = await self.db.execute(
-            select(ChatLog).where(ChatLog.session_id == session_id)
+            select(ChatLog)
+            .options(defer(ChatLog.snapshot))
+            .where(ChatLog.session_id == session_id)
         )
         chat_log = result.scalar_one_or_none()
 
@@ -32,6 +64,65 @@ class ChatPersistenceService:
             }
         return {"messages": [], "context": {}, "progress": "idle"}
 
+    async def get_recent_history(self, session_id: UUID, limit: int) -> Dict[str, Any]:
+        """
+        Load context, progress and only the last ``limit`` messages
+
+        Returns:
+            Chat state with ``history_offset`` - the number of older messages
+            that were not loaded
+        """
+        total = (await self.db.execute(_TOTAL_QUERY, {"session_id": session_id})).scalar_one_or_none()
+        if total is None:
+            return {"messages": [], "context": {}, "progress": "idle", "history_offset": 0}
+
+        start = max(0, total - limit)
+        row = (await self.db.execute(
+            _WINDOW_QUERY, {"session_id": session_id, "start": start, "end": total}
+        )).one()
+
+        return {
+            "messages": row.messages or [],
+            "context": row.context or {},
+            "progress": row.progress or "idle",
+            "history_offset": start,
+        }
+
+    async def get_messages_page(
+        self,
+        session_id: UUID,
+        before: Optional[int] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Load a page of stored messages ending just before index ``before``
+        (the newest page when omitted)
+
+        Returns:
+            Dictionary with messages, their start index and the total count
+        """
+        total = (await self.db.execute(_TOTAL_QUERY, {"session_id": session_id})).scalar_one_or_none()
+        if total is None:
+            return {"messages": [], "start": 0, "total": 0}
+
+        end = total if before is None else max(0, min(before, total))
+        start = max(0, end - limit)
+        row = (await self.db.execute(
+            _WINDOW_QUERY, {"session_id": session_id, "start": start, "end": end}
+        )).one()
+
+        return {"messages": row.messages or [], "start": start, "total": total}
+
+    async def get_snapshot(self, session_id: UUID, window: Optional[int] = None) -> Optional[ConversationSnapshot]:
+        """Load the binary conversation snapshot (last ``window`` messages), skipping the JSONB columns"""
+        if not snapshots_enabled():
+            return None
+
+        result = await self.db.execute(
+            select(ChatLog.snapshot).where(ChatLog.session_id == session_id)
+        )
+        return decode_snapshot(result.scalar_one_or_none(), window)
+
     async def save_message(
         self,
         session_id: UUID,
@@ -42,6 +133,9 @@ class ChatPersistenceService:
         progress: str = "idle"
     ) -> None:
         """Save a single message to chat history with state"""
+        # Held until the commit below, so a concurrent first save waits and
+        # then appends to the row this one creates instead of inserting another
+        await self.db.execute(_SESSION_LOCK, {"key": f"chat_logs:{session_id}"})
         result = await self.db.execute(
             select(ChatLog).where(ChatLog.session_id == session_id)
         )
@@ -62,6 +156,7 @@ class ChatPersistenceService:
             chat_log.messages = messages
             chat_log.context = context or {}
             chat_log.progress = progress
+            chat_log.snapshot = self._build_snapshot(messages, chat_log.context, progress)
             chat_log.updated_at = datetime.utcnow()
         else:
             # Create new chat log
@@ -69,7 +164,8 @@ class ChatPersistenceService:
                 session_id=session_id,
                 messages=[message],
                 context=context or {},
-                progress=progress
+                progress=progress,
+                snapshot=self._build_snapshot([message], context or {}, progress)
             )
             self.db.add(chat_log)
 
@@ -86,5 +182,22 @@ class ChatPersistenceService:
             chat_log.messages = []
             chat_log.context = {}
             chat_log.progress = "idle"
+            chat_log.snapshot = None
             chat_log.updated_at = datetime.utcnow()
             await self.db.commit()
+
+    @staticmethod
+    def _build_snapshot(messages: List[Dict], context: Dict, progress: str) -> Optional[bytes]:
+        """
+        Encode a snapshot of the newest SNAPSHOT_MAX_MESSAGES messages alongside
+        the JSONB history (None if unavailable), so each save costs the same
+        however long the session grows
+        """
+        if not snapshots_enabled():
+            return None
+        offset = max(0, len(messages) - settings.SNAPSHOT_MAX_MESSAGES)
+        try:
+            return encode_snapshot(messages[offset:], context, progress, offset)
+        except Exception as e:
+            print(f"Failed to encode conversation snapshot: {e}")
+            return None
@@ -0,0 +1,135 @@
+"""
+Compact binary conversation snapshots (msgpack + zstd, versioned)
+
+Layout: ``b"LKS" | version byte | zstd(msgpack([rows, context, progress, offset]))``
+where each row is ``[role, content, epoch_seconds, tool_calls]``. A snapshot
+holds only the newest messages; ``offset`` counts the older ones left to the
+JSONB history (version 1 blobs have no offset and hold every message).
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, NamedTuple
+from app.config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+SNAPSHOT_MAGIC = b"LKS"
+SNAPSHOT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class ConversationSnapshot(NamedTuple):
+    """Decoded snapshot; rows are (role, content, timestamp, tool_calls)"""
+    rows: List[tuple]
+    context: Dict[str, Any]
+    progress: str
+    history_offset: int = 0  # Older rows skipped while decoding
+
+
+def snapshots_enabled() -> bool:
+    """Check if snapshots are enabled and the optional codecs are installed"""
+    return settings.CONVERSATION_SNAPSHOTS_ENABLED and msgpack is not None and zstandard is not None
+
+
+def _to_epoch(timestamp: Any) -> Optional[float]:
+    """Convert a stored ISO timestamp (naive UTC) to epoch seconds"""
+    if not timestamp:
+        return None
+    try:
+        return (datetime.fromisoformat(timestamp) - _EPOCH).total_seconds()
+    except (ValueError, TypeError):
+        return None
+
+
+def encode_snapshot(
+    messages: List[Dict[str, Any]],
+    context: Dict[str, Any],
+    progress: str,
+    offset: int = 0,
+) -> bytes:
+    """
+    Encode stored chat history into a snapshot blob
+
+    Args:
+        messages: Messages in the ChatLog JSONB format (the newest ones)
+        context: Conversation context (JSON-compatible)
+        progress: eKYC progress
+        offset: Number of older messages not included
+
+    Returns:
+        Snapshot bytes
+    """
+    rows = [
+        [
+            msg.get("role"),
+            msg.get("content") or "",
+            _to_epoch(msg.get("timestamp")),
+            msg.get("tool_calls") or None,
+        ]
+        for msg in messages
+    ]
+    payload = msgpack.packb([rows, context or {}, progress, offset], use_bin_type=True)
+    compressed = zstandard.ZstdCompressor(level=settings.SNAPSHOT_ZSTD_LEVEL).compress(payload)
+    return SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]) + compressed
+
+
+def decode_snapshot(blob: Optional[bytes], window: Optional[int] = None) -> Optional[ConversationSnapshot]:
+    """
+    Decode a snapshot blob, keeping only the last ``window`` rows when given
+
+    Older rows are skipped inside the msgpack stream without being built
+    into Python objects, so a windowed restore costs little more than the
+    decompression of a long history.
+
+    Returns:
+        ConversationSnapshot, or None if the blob is missing, from an unknown
+        version, does not hold enough messages for ``window``, or the codecs
+        are unavailable (caller falls back to JSONB)
+    """
+    if not blob or not snapshots_enabled():
+        return None
+    if blob[:3] != SNAPSHOT_MAGIC or blob[3] not in _READABLE_VERSIONS:
+        return None
+
+    try:
+        payload = zstandard.ZstdDecompressor().decompress(blob[4:])
+        unpacker = msgpack.Unpacker(raw=False, max_buffer_size=len(payload))
+        unpacker.feed(payload)
+        fields = unpacker.read_array_header()  # [rows, context, progress(, offset)]
+        total = unpacker.read_array_header()
+        skipped = max(0, total - window) if window is not None else 0
+        for _ in range(skipped):
+            unpacker.skip()
+        rows = [unpacker.unpack() for _ in range(total - skipped)]
+        context = unpacker.unpack()
+        progress = unpacker.unpack()
+        offset = unpacker.unpack() if fields > 3 else 0
+    except Exception as e:
+        print(f"Failed to decode conversation snapshot: {e}")
+        return None
+
+    if offset and (window is None or window > total):
+        return None  # Needs messages only the JSONB history has
+    history_offset = offset + skipped
+
+    decoded = [
+        (
+            role,
+            content,
+            _EPOCH + timedelta(seconds=ts) if ts is not None else datetime.now(),
+            tool_calls,
+        )
+        for role, content, ts, tool_calls in rows
+    ]
+    return ConversationSnapshot(decoded, context, progress, history_offset)
@@ -0,0 +1,161 @@
+"""
+Pool of pre-opened face-server WebSocket connections for realtime verification
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Optional
+import websockets
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+def dial_face_server(url: Optional[str] = None):
+    """Open a face-server WebSocket (awaitable) with the app's connection settings"""
+    return websockets.connect(
+        url or settings.OCR_WEBSOCKET_URL,
+        open_timeout=settings.FACE_WS_CONNECT_TIMEOUT,
+        ping_interval=30,
+        ping_timeout=10,
+        max_size=None,
+    )
+
+
+def is_open(ws: Any) -> bool:
+    return ws.state.name == "OPEN"
+
+
+class FaceConnectionPool:
+    """
+    Lease pool of warm face-server connections
+
+    The face server binds one ID card to each connection (the first message),
+    so connections cannot be shared between sessions or reused after one.
+    Instead the pool keeps ``size`` handshaken, idle connections ready: a new
+    session leases one and sends its ID card immediately, the connection is
+    closed when the session ends, and a background task dials a replacement.
+    Idle connections are pinged every ``health_interval`` seconds and replaced
+    if they stop answering.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        url: Optional[str] = None,
+        health_interval: Optional[float] = None,
+    ):
+        self.size = settings.FACE_POOL_SIZE if size is None else size
+        self.url = url or settings.OCR_WEBSOCKET_URL
+        self.health_interval = health_interval or settings.FACE_POOL_HEALTH_INTERVAL
+        self._idle: Deque[Any] = deque()
+        self._maintainer: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def start(self) -> None:
+        """Start filling the pool in the background (application startup)"""
+        if not self.enabled or self._maintainer is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._maintainer = asyncio.create_task(self._maintain())
+        print(f"Face connection pool started (size {self.size})")
+
+    async def stop(self) -> None:
+        """Stop the maintainer and close idle connections (application shutdown)"""
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            await asyncio.gather(self._maintainer, return_exceptions=True)
+            self._maintainer = None
+        while self._idle:
+            await self._discard(self._idle.popleft(), "shutdown")
+        self._report()
+
+    def lease(self) -> Optional[Any]:
+        """
+        Take a warm connection for one session, or None if none is ready
+        (the caller then dials its own). The connection is the caller's to close.
+        """
+        while self._idle:
+            ws = self._idle.popleft()
+            if is_open(ws):
+                metrics.increment("face_pool_leases_total", outcome="hit")
+                self._report()
+                self._wake()
+                return ws
+            metrics.increment("face_pool_discarded_total", reason="closed")
+        if self.enabled:
+            metrics.increment("face_pool_leases_total", outcome="miss")
+            self._wake()
+        self._report()
+        return None
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _report(self) -> None:
+        metrics.set_gauge("face_pool_idle_connections", len(self._idle))
+
+    async def _discard(self, ws: Any, reason: str) -> None:
+        metrics.increment("face_pool_discarded_total", reason=reason)
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def _fill(self) -> None:
+        """Dial until the pool is full; raises on the first failed dial"""
+        while len(self._idle) < self.size:
+            start = time.perf_counter()
+            ws = await dial_face_server(self.url)
+            metrics.observe("face_pool_dial_seconds", time.perf_counter() - start)
+            self._idle.append(ws)
+            self._report()
+
+    async def _check_health(self) -> None:
+        """Ping every idle connection; drop the ones that do not answer"""
+        for ws in list(self._idle):
+            try:
+                pong = await ws.ping()
+                await asyncio.wait_for(pong, timeout=settings.FACE_WS_CONNECT_TIMEOUT)
+            except Exception:
+                if ws in self._idle:
+                    self._idle.remove(ws)
+                    await self._discard(ws, "unhealthy")
+        self._report()
+
+    async def _maintain(self) -> None:
+        failures = 0
+        while True:
+            try:
+                await self._fill()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                delay = min(
+                    settings.FACE_WS_RECONNECT_MAX_DELAY,
+                    settings.FACE_WS_RECONNECT_BASE_DELAY * 2 ** (failures - 1),
+                ) * (0.5 + random.random() / 2)
+                print(f"[POOL] Could not open face-server connection: {type(e).__name__}: {e} (retry in {delay:.2f}s)")
+                await asyncio.sleep(delay)
+                continue
+
+            # Sleep until a lease needs a replacement or the next health check
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.health_interval)
+            except asyncio.TimeoutError:
+                await self._check_health()
+
+
+face_pool = FaceConnectionPool()
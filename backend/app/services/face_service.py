@@ -1,19 +1,40 @@
 """
-Face Verification Service - Using websocket-client (threading-based)
+Face Verification Service - batch and real-time verification over websockets (asyncio)
 """
 
 import asyncio
 import base64
 import json
-import httpx
-import websockets
-import websocket
-import threading
+import random
 import time
-import requests
-from typing import Dict, Any, Optional, Callable
+import weakref
+import websockets
+from collections import deque
+from typing import Dict, Any, Deque, Optional, Callable, Tuple
 from app.config import settings
 from app.models.verification import VerificationResult
+from app.services.face_pool import dial_face_server, face_pool
+from app.services.frame_decision import FrameDecisionAggregator
+from app.services.frame_filter import frame_filter_available, prefilter_frame
+from app.services.frame_scheduler import FrameOutcome, LatestFrameScheduler
+from app.services.frame_transform import transform_frame
+from app.services.http_client import get_upstream_client
+from app.services.image_store import image_store
+from app.utils.metrics import metrics
+from app.utils.singleflight import SingleFlight
+
+
+# Coalesces concurrent downloads of the same image URL (e.g. the ID card fetched
+# for batch and realtime verification at once)
+_image_fetches = SingleFlight("image_fetch")
+
+# Realtime clients with an open face-server connection (for the gauge)
+_open_connections: "weakref.WeakSet[RealtimeFaceVerificationClient]" = weakref.WeakSet()
+
+
+def open_realtime_connections() -> int:
+    """Number of realtime clients currently holding a face-server connection"""
+    return len(_open_connections)
 
 
 class FaceVerificationClient:
@@ -21,33 +42,50 @@ class FaceVerificationClient:
 
     def __init__(self, websocket_url: Optional[str] = None):
         self.websocket_url = websocket_url or settings.OCR_WEBSOCKET_URL
+        self.http_client = get_upstream_client("face")
 
     async def image_to_base64(self, image_url: str) -> Optional[str]:
-        """Convert image from URL to base64"""
+        """Convert image from URL to base64 (concurrent fetches of one URL share a download)"""
+        return await _image_fetches.do(image_url, lambda: self._download_base64(image_url))
+
+    async def _download_base64(self, image_url: str) -> Optional[str]:
+        # Images we uploaded ourselves (the ID card) are served from the local store
+        stored = await image_store.get(image_url)
+        if stored is not None:
+            return base64.b64encode(stored).decode("utf-8")
+
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(image_url)
-                response.raise_for_status()
-                image_data = response.content
-                base64_data = base64.b64encode(image_data).decode("utf-8")
-                return base64_data
+            response = await self.http_client.request(
+                "GET",
+                image_url,
+                endpoint="image",
+                timeout=settings.OCR_UPLOAD_TIMEOUT,
+            )
+            response.raise_for_status()
+            image_data = response.content
+            base64_data = base64.b64encode(image_data).decode("utf-8")
+            return base64_data
         except Exception as e:
             print(f"Error converting image to base64: {e}")
             return None
 
     async def verify_face(self, id_card_image_url: str, selfie_image_url: str) -> Dict[str, Any]:
         """Asynchronous face verification"""
-        try:
-            # Convert images to base64
-            id_card_base64 = await self.image_to_base64(id_card_image_url)
-            selfie_base64 = await self.image_to_base64(selfie_image_url)
+        # Convert images to base64
+        id_card_base64 = await self.image_to_base64(id_card_image_url)
+        selfie_base64 = await self.image_to_base64(selfie_image_url)
 
-            if not id_card_base64 or not selfie_base64:
-                return {
-                    "success": False,
-                    "error": "Could not convert images to base64"
-                }
+        if not id_card_base64 or not selfie_base64:
+            return {
+                "success": False,
+                "error": "Could not convert images to base64"
+            }
 
+        return await self.verify_face_base64(id_card_base64, selfie_base64)
+
+    async def verify_face_base64(self, id_card_base64: str, selfie_base64: str) -> Dict[str, Any]:
+        """Face verification for images already encoded as base64 (e.g. local files)"""
+        try:
             # Connect to WebSocket
             async with websockets.connect(self.websocket_url) as ws:
                 # Prepare data
@@ -81,7 +119,18 @@ class FaceVerificationClient:
 
 
 class RealtimeFaceVerificationClient:
-    """Client for real-time face verification using websocket-client (threading-based)"""
+    """
+    Client for real-time face verification, running on the event loop (websockets)
+
+    A single reader task per session owns the connection and reconnects with
+    jittered exponential backoff; the ID card is re-sent on every (re)connect
+    because the face server keeps it per connection.
+
+    The server answers every message in order, so each message sent is tagged
+    with a sequence number and queued; each reply resolves the oldest entry.
+    verify_frame awaits the reply to its own frame rather than whatever
+    arrived last.
+    """
 
     def __init__(self, websocket_url: Optional[str] = None):
         self.websocket_url = websocket_url or settings.OCR_WEBSOCKET_URL
@@ -90,155 +139,252 @@ class RealtimeFaceVerificationClient:
         self.result_callback: Optional[Callable] = None
         self.id_card_base64: Optional[str] = None
         self.last_result: Optional[Dict[str, Any]] = None
-        self.ignore_next_response = False
-
-    def set_id_card_image(self, id_card_image_url: str) -> bool:
-        """Set ID card image for verification (SYNC)"""
-        try:
+        self.reconnects = 0
+        self.last_activity = time.monotonic()  # Last frame sent; the idle watchdog reads it
+        self._closing = False
+        self._runner: Optional[asyncio.Task] = None
+        # Set once the connection is open and the ID card has been sent
+        self._connected = asyncio.Event()
+        self._seq = 0
+        # (sequence, future for the reply or None for the ID card, send time)
+        self._pending: Deque[Tuple[int, Optional[asyncio.Future], float]] = deque()
+        # Camera frames go through here: latest frame wins when the server lags
+        self.frames = LatestFrameScheduler(self._verify_camera_frame)
+        self.decisions = FrameDecisionAggregator()
+
+    async def set_id_card_image(self, id_card_image_url: str, id_card_base64: Optional[str] = None) -> bool:
+        """Set ID card image for verification; downloads it unless already fetched"""
+        if not id_card_base64:
             print(f"[DOWNLOAD] Downloading ID card image from: {id_card_image_url}")
-            response = requests.get(id_card_image_url, timeout=30)
-            response.raise_for_status()
-            image_data = response.content
-            self.id_card_base64 = base64.b64encode(image_data).decode('utf-8')
-            print(f"[OK] ID card image downloaded and encoded (size: {len(self.id_card_base64)} bytes)")
-            return True
-        except Exception as e:
-            print(f"[ERROR] Error loading ID card image: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            id_card_base64 = await FaceVerificationClient().image_to_base64(id_card_image_url)
+            if not id_card_base64:
+                print("[ERROR] Error loading ID card image")
+                return False
+
+        self.id_card_base64 = id_card_base64
+        print(f"[OK] ID card image loaded (size: {len(id_card_base64)} bytes)")
+        return True
 
-    def on_message(self, ws, message):
-        """Handle WebSocket messages"""
-        print(f"[DEBUG] on_message callback triggered")
+    def on_message(self, message):
+        """Handle WebSocket messages: resolve the oldest pending frame"""
         try:
-            print(f"[MSG] Received message from server (length: {len(message)} bytes)")
             data = json.loads(message)
-            print(f"[DATA] Parsed data keys: {list(data.keys())}")
-            
-            if self.ignore_next_response:
-                print(f"[SKIP]  Ignoring ID card self-comparison: same_person={data.get('same_person')}, similarity={data.get('similarity', 0):.4f}")
-                self.ignore_next_response = False
+        except json.JSONDecodeError as e:
+            print(f"[ERROR] JSON decode error: {e}")
+            print(f"Raw message: {message[:500]}")
+            data = None
+
+        future = None
+        if self._pending:
+            seq, future, sent_at = self._pending.popleft()
+            if future is None:
+                print(f"[SKIP]  Ignoring ID card self-comparison (#{seq})")
                 return
-            
+            metrics.observe("face_frame_rtt_seconds", time.perf_counter() - sent_at)
+
+        if data is not None:
             if 'bbox' in data:
                 self.last_result = data
                 print(f"[OK] Valid verification result: same_person={data.get('same_person')}, similarity={data.get('similarity', 0):.4f}")
             else:
                 print(f"[INFO]  Received non-verification response (no bbox): {data.get('msg', 'No message')}")
-            
-            if self.result_callback:
-                self.result_callback(data)
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON decode error: {e}")
-            print(f"Raw message: {message[:500]}")
-        except Exception as e:
-            print(f"[ERROR] Error processing message: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
 
-    def on_error(self, ws, error):
-        """Handle WebSocket errors"""
-        print(f"[DEBUG] on_error callback triggered")
-        print(f"[ERROR] WebSocket error: {type(error).__name__}: {error}")
-        self.is_connected = False
-
-    def on_close(self, ws, close_status_code, close_msg):
-        """Handle WebSocket close"""
-        print(f"[DEBUG] on_close callback triggered")
-        print(f"[CLOSED] WebSocket closed - status: {close_status_code}, message: {close_msg}")
-        self.is_connected = False
-
-    def on_open(self, ws):
-        """Handle WebSocket open"""
-        print(f"[DEBUG] on_open callback triggered")
-        print("[OK] WebSocket connected (on_open callback)")
+            if self.result_callback:
+                try:
+                    self.result_callback(data)
+                except Exception as e:
+                    print(f"[ERROR] Error in result callback: {type(e).__name__}: {e}")
+
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def _fail_pending(self) -> None:
+        """Replies never arrive once the connection is gone"""
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if future is not None and not future.done():
+                future.set_exception(ConnectionError("WebSocket connection closed"))
+
+    async def _send(self, payload: str, future: Optional[asyncio.Future]) -> None:
+        self._seq += 1
+        entry = (self._seq, future, time.perf_counter())
+        # Queue before sending so the reply can never arrive first
+        self._pending.append(entry)
+        try:
+            await self.ws.send(payload)
+        except Exception:
+            try:
+                self._pending.remove(entry)
+            except ValueError:
+                pass
+            raise
+
+    async def on_open(self, ws):
+        """Send the ID card image first on every new connection"""
+        self.ws = ws
         self.is_connected = True
-
-        # Send ID card image first
         if self.id_card_base64:
+            self.last_result = None
+            print(f"[SEND] Sending ID card image to server (size: {len(self.id_card_base64)} bytes)...")
+            await self._send(self.id_card_base64, None)
+            print("[OK] ID card image sent (will ignore self-comparison response)")
+        self._connected.set()
+
+    async def _run(self):
+        """Own the connection: read messages, reconnect with backoff until disconnected"""
+        attempt = 0
+        first_connect = True
+        while not self._closing:
+            ws = None
             try:
-                self.last_result = None
-                self.ignore_next_response = True
-                
-                print(f"[SEND] Sending ID card image to server (size: {len(self.id_card_base64)} bytes)...")
-                ws.send(self.id_card_base64)
-                print("[OK] ID card image sent (will ignore self-comparison response)")
+                # A warm pooled connection skips the handshake on the first
+                # connect; it is never returned because the face server has
+                # bound our ID card to it. Reconnects always dial.
+                if first_connect and self.websocket_url == face_pool.url:
+                    ws = face_pool.lease()
+                first_connect = False
+                if ws is None:
+                    ws = await dial_face_server(self.websocket_url)
+                metrics.increment("face_ws_connections_opened_total")
+                _open_connections.add(self)
+                metrics.set_gauge("face_ws_open_connections", len(_open_connections))
+                await self.on_open(ws)
+                attempt = 0
+                async for message in ws:
+                    self.on_message(message)
+                print("[CLOSED] WebSocket closed by server")
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"[ERROR] Error sending ID card image: {type(e).__name__}: {e}")
-                import traceback
-                traceback.print_exc()
+                print(f"[ERROR] WebSocket error: {type(e).__name__}: {e}")
+            finally:
+                if ws is not None:
+                    try:
+                        await ws.close()
+                    except Exception:
+                        pass
+                self.ws = None
+                self.is_connected = False
+                self._connected.clear()
+                self._fail_pending()
+                _open_connections.discard(self)
+                metrics.set_gauge("face_ws_open_connections", len(_open_connections))
+
+            if self._closing:
+                break
+            attempt += 1
+            if attempt > settings.FACE_WS_MAX_RECONNECTS:
+                print(f"[ERROR] Giving up after {attempt - 1} reconnect attempt(s)")
+                break
+
+            delay = min(
+                settings.FACE_WS_RECONNECT_MAX_DELAY,
+                settings.FACE_WS_RECONNECT_BASE_DELAY * 2 ** (attempt - 1),
+            ) * (0.5 + random.random() / 2)
+            print(f"[RECONNECT] Attempt {attempt} in {delay:.2f}s")
+            self.reconnects += 1
+            metrics.increment("face_ws_reconnects_total")
+            await asyncio.sleep(delay)
+
+    async def connect(self, result_callback: Optional[Callable] = None) -> bool:
+        """Start the connection task and wait until the ID card has been sent"""
+        print(f"[CONNECT] Connecting to WebSocket server: {self.websocket_url}")
+        self.result_callback = result_callback
+        self._closing = False
+        start = time.perf_counter()
+        self._runner = asyncio.create_task(self._run())
+
+        # Done when the ID card is sent, or early if the task gives up reconnecting
+        connected = asyncio.create_task(self._connected.wait())
+        await asyncio.wait(
+            {connected, self._runner},
+            timeout=settings.FACE_WS_CONNECT_TIMEOUT,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if not connected.done():
+            connected.cancel()
+            print("[WARN]  Connection not established within timeout")
+            return False
 
-    def connect(self, result_callback: Optional[Callable] = None) -> bool:
-        """Connect to WebSocket (SYNC)"""
-        try:
-            print(f"[CONNECT] Connecting to WebSocket server: {self.websocket_url}")
-            self.result_callback = result_callback
-
-            websocket.enableTrace(False)
-            self.ws = websocket.WebSocketApp(
-                self.websocket_url,
-                on_open=self.on_open,
-                on_message=self.on_message,
-                on_error=self.on_error,
-                on_close=self.on_close,
-            )
+        metrics.observe("face_ws_connect_seconds", time.perf_counter() - start)
+        print("[OK] Connection established successfully")
+        return True
 
-            # Run WebSocket in separate thread
-            def run_websocket():
-                try:
-                    print("[START] Starting WebSocket run_forever in thread...")
-                    self.ws.run_forever(ping_interval=30, ping_timeout=10)
-                    print("[END] WebSocket run_forever ended")
-                except Exception as e:
-                    print(f"[ERROR] WebSocket run_forever exception: {type(e).__name__}: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    self.is_connected = False
-
-            thread = threading.Thread(target=run_websocket, daemon=True)
-            thread.start()
-            print("[THREAD] WebSocket thread started")
-
-            # Wait for connection to establish
-            print("[WAIT] Waiting for connection to establish...")
-            time.sleep(1.0)
-            
-            if self.is_connected:
-                print(f"[OK] Connection established successfully")
-            else:
-                print(f"[WARN]  Connection may not be established yet")
+    @staticmethod
+    def _strip_data_url(frame_base64: str) -> str:
+        # Strip data URL prefix if present (e.g., "data:image/jpeg;base64,")
+        if frame_base64.startswith('data:'):
+            return frame_base64.split(',', 1)[1]
+        return frame_base64
 
-            return self.is_connected
+    async def send_frame(self, frame_base64: str) -> bool:
+        """Send frame from camera without waiting for its result"""
+        self.last_activity = time.monotonic()
+        if not self.is_connected or not self.ws:
+            print(f"[ERROR] Cannot send frame: connected={self.is_connected}, ws={self.ws is not None}")
+            return False
 
+        try:
+            await self._send(self._strip_data_url(frame_base64), None)
+            return True
         except Exception as e:
-            print(f"[ERROR] WebSocket connection failed: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            self.is_connected = False
+            print(f"[ERROR] Error sending frame: {type(e).__name__}: {e}")
             return False
 
-    def send_frame(self, frame_base64: str) -> bool:
-        """Send frame from camera (SYNC)"""
+    async def verify_frame(
+        self,
+        frame_base64: str,
+        timeout: Optional[float] = None
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Send a frame and wait for the server's reply to that frame
+
+        Args:
+            frame_base64: Camera frame (base64, optionally a data URL)
+            timeout: Seconds to wait for the reply (default FRAME_RESULT_TIMEOUT)
+
+        Returns:
+            (sent, result) - result is None if no reply arrived in time or the
+            connection dropped; a late reply is matched to this frame and dropped
+        """
+        self.last_activity = time.monotonic()
         if not self.is_connected or not self.ws:
             print(f"[ERROR] Cannot send frame: connected={self.is_connected}, ws={self.ws is not None}")
-            return False
+            return False, None
 
+        future = asyncio.get_running_loop().create_future()
         try:
-            # Strip data URL prefix if present (e.g., "data:image/jpeg;base64,")
-            if frame_base64.startswith('data:'):
-                frame_base64 = frame_base64.split(',', 1)[1]
-                print(f"[INFO]  Stripped data URL prefix")
-            
-            print(f"[SEND] Sending frame to server (size: {len(frame_base64)} bytes)")
-            self.ws.send(frame_base64)
-            print(f"[OK] Frame sent successfully")
-            return True
+            await self._send(self._strip_data_url(frame_base64), future)
         except Exception as e:
             print(f"[ERROR] Error sending frame: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            return False, None
+
+        try:
+            result = await asyncio.wait_for(future, timeout or settings.FRAME_RESULT_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics.increment("face_frame_results_total", outcome="timeout")
+            print("[WARN]  No result for frame before the deadline")
+            return True, None
+        except ConnectionError:
+            metrics.increment("face_frame_results_total", outcome="disconnected")
+            return True, None
+
+        metrics.increment("face_frame_results_total", outcome="received")
+        return True, result
+
+    async def _verify_camera_frame(self, frame: bytes) -> FrameOutcome:
+        """Pre-filter and shrink a JPEG camera frame, then verify it (the scheduler's send step)"""
+        face_box = None
+        if frame_filter_available():
+            check = await prefilter_frame(frame)
+            if check.reason is not None:
+                return FrameOutcome(sent=False, rejected=check.reason, hint=check.hint)
+            face_box = check.face_box
+
+        frame = await transform_frame(frame, face_box)
+        metrics.observe("face_frame_forwarded_bytes", len(frame))
+        sent, result = await self.verify_frame(base64.b64encode(frame).decode("ascii"))
+        return FrameOutcome(sent=sent, result=result)
 
     def get_last_result(self) -> Optional[Dict[str, Any]]:
         """Get last verification result"""
@@ -251,6 +397,7 @@ class RealtimeFaceVerificationClient:
             "ws_exists": self.ws is not None,
             "has_id_card": self.id_card_base64 is not None,
             "last_result": self.last_result is not None,
+            "reconnects": self.reconnects,
         }
         return status
 
@@ -258,20 +405,36 @@ class RealtimeFaceVerificationClient:
         """Check if WebSocket connection is healthy"""
         return self.is_connected and self.ws is not None
 
-    def disconnect(self):
-        """Disconnect WebSocket (SYNC)"""
+    def idle_seconds(self) -> float:
+        """
+        Seconds since the last frame was submitted or sent (or since the
+        client was created); frames the pre-filter or scheduler keep from the
+        face server still count as activity
+        """
+        return time.monotonic() - max(self.last_activity, self.frames.last_submitted or 0.0)
+
+    async def disconnect(self):
+        """Close the connection and stop the connection task"""
         print("[CONNECT] Disconnecting WebSocket...")
+        self._closing = True
         self.is_connected = False
-        
+        self.frames.close()
+
         if self.ws:
             try:
-                self.ws.close()
+                await self.ws.close()
             except Exception as e:
                 print(f"[ERROR] Error closing WebSocket: {e}")
-            self.ws = None
 
+        if self._runner:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+        self.ws = None
         self.last_result = None
-        self.ignore_next_response = False
+        self.id_card_base64 = None
+        self._fail_pending()
         print("[OK] WebSocket disconnected")
 
 
@@ -307,40 +470,43 @@ class FaceVerificationService:
                 "error": result.get("error", "Unknown error")
             }
 
-    def start_realtime_verification(self, id_card_image_url: str) -> Optional[RealtimeFaceVerificationClient]:
+    async def load_id_card_image(self, id_card_image_url: str) -> Optional[str]:
+        """Fetch the ID card as base64 on the event loop (shared with concurrent fetches)"""
+        return await self.batch_client.image_to_base64(id_card_image_url)
+
+    async def start_realtime_verification(
+        self,
+        id_card_image_url: str,
+        id_card_base64: Optional[str] = None
+    ) -> Optional[RealtimeFaceVerificationClient]:
         """
-        Start real-time face verification (SYNC method wrapped for async)
+        Start real-time face verification
 
         Args:
             id_card_image_url: URL of ID card image
+            id_card_base64: ID card already fetched with load_id_card_image, if any
 
         Returns:
             RealtimeFaceVerificationClient instance or None if failed
         """
+        # Replace (not leak) a previous connection for this session
+        await self.stop_realtime_verification()
+
         try:
-            print(f"[SERVICE] Creating new RealtimeFaceVerificationClient...")
-            self.realtime_client = RealtimeFaceVerificationClient()
-            print(f"[OK] Client created: {self.realtime_client}")
+            client = RealtimeFaceVerificationClient()
 
-            # Set ID card image (SYNC)
-            print(f"[DOWNLOAD] Loading ID card image from URL...")
-            if not self.realtime_client.set_id_card_image(id_card_image_url):
+            if not await client.set_id_card_image(id_card_image_url, id_card_base64):
                 print("[ERROR] Failed to load ID card image")
                 return None
-            print(f"[OK] ID card image loaded successfully")
 
-            # Connect (SYNC)
-            print(f"[CONNECT] Attempting to connect to WebSocket...")
-            if not self.realtime_client.connect():
+            if not await client.connect():
                 print("[ERROR] Failed to connect to WebSocket")
+                await client.disconnect()
                 return None
-            
-            print(f"[OK] Successfully connected to WebSocket")
-            print(f"[DATA] Client status after connection:")
-            status = self.realtime_client.get_status()
-            print(json.dumps(status, indent=2))
 
-            return self.realtime_client
+            self.realtime_client = client
+            print(f"[OK] Successfully connected to WebSocket: {client.get_status()}")
+            return client
 
         except Exception as e:
             print(f"[ERROR] Error starting realtime verification: {type(e).__name__}: {e}")
@@ -348,8 +514,8 @@ class FaceVerificationService:
             traceback.print_exc()
             return None
 
-    def stop_realtime_verification(self):
-        """Stop real-time face verification (SYNC)"""
+    async def stop_realtime_verification(self):
+        """Stop real-time face verification"""
         if self.realtime_client:
-            self.realtime_client.disconnect()
-            self.realtime_client = None
+            client, self.realtime_client = self.realtime_client, None
+            await client.disconnect()
@@ -0,0 +1,102 @@
+"""
+Multi-frame accept/reject decision for realtime face verification
+"""
+
+import statistics
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional, Tuple
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+class FrameDecision(NamedTuple):
+    """Verdict reached over a window of frame results"""
+    outcome: str  # "accepted" or "rejected"
+    reason: str  # "consistent_match", "consistent_mismatch" or "max_frames"
+    frames: int  # Frame results seen before deciding
+    similarity: Optional[float]  # Mean similarity over the deciding frames
+
+
+class FrameDecisionAggregator:
+    """
+    Sliding window over one session's frame results
+
+    A single matching frame no longer decides on its own. The session is
+    accepted once ``accept_consecutive`` frames in a row match with a
+    similarity spread no wider than ``accept_max_stddev``, and rejected early
+    once a full window of ``window`` faces all mismatch with mean similarity at
+    or below ``reject_max_mean``, or after ``max_frames`` results without a
+    verdict. Results without a face (no bbox) only count towards ``max_frames``.
+
+    A decision stands once made, unless acting on it fails and the caller
+    ``retract``s it so later frames can decide again.
+    """
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        accept_consecutive: Optional[int] = None,
+        accept_max_stddev: Optional[float] = None,
+        reject_max_mean: Optional[float] = None,
+        max_frames: Optional[int] = None,
+    ):
+        self.window = window or settings.FRAME_DECISION_WINDOW
+        self.accept_consecutive = accept_consecutive or settings.FRAME_ACCEPT_CONSECUTIVE
+        self.accept_max_stddev = settings.FRAME_ACCEPT_MAX_STDDEV if accept_max_stddev is None else accept_max_stddev
+        self.reject_max_mean = settings.FRAME_REJECT_MAX_MEAN if reject_max_mean is None else reject_max_mean
+        self.max_frames = max_frames or settings.FRAME_DECISION_MAX_FRAMES
+        # (same_person, similarity) for the most recent faces
+        self._faces: Deque[Tuple[bool, float]] = deque(maxlen=self.window)
+        self._consecutive = 0
+        self.frames = 0
+        self.decision: Optional[FrameDecision] = None
+
+    def _decide(self, outcome: str, reason: str, similarities) -> FrameDecision:
+        self.decision = FrameDecision(
+            outcome=outcome,
+            reason=reason,
+            frames=self.frames,
+            similarity=statistics.fmean(similarities) if similarities else None,
+        )
+        metrics.increment("face_decisions_total", outcome=outcome, reason=reason)
+        metrics.observe("face_frames_per_decision", self.frames, outcome=outcome)
+        return self.decision
+
+    def retract(self) -> None:
+        """Withdraw the decision (e.g. the verified record could not be saved)"""
+        if self.decision is not None:
+            metrics.increment("face_decisions_retracted_total", outcome=self.decision.outcome)
+            self.decision = None
+
+    def add(self, result: Optional[Dict[str, Any]]) -> Optional[FrameDecision]:
+        """
+        Record one frame result
+
+        Returns:
+            The decision when this result settles the session, else None
+            (also None for every result after the decision)
+        """
+        if self.decision is not None:
+            return None
+        self.frames += 1
+
+        if result and "bbox" in result:
+            same_person = result.get("same_person") is True
+            similarity = float(result.get("similarity") or 0.0)
+            self._faces.append((same_person, similarity))
+            self._consecutive = self._consecutive + 1 if same_person else 0
+
+            if self._consecutive >= self.accept_consecutive:
+                recent = [sim for _, sim in list(self._faces)[-self.accept_consecutive:]]
+                spread = statistics.pstdev(recent) if len(recent) > 1 else 0.0
+                if spread <= self.accept_max_stddev:
+                    return self._decide("accepted", "consistent_match", recent)
+
+            if len(self._faces) == self.window and not any(same for same, _ in self._faces):
+                similarities = [sim for _, sim in self._faces]
+                if statistics.fmean(similarities) <= self.reject_max_mean:
+                    return self._decide("rejected", "consistent_mismatch", similarities)
+
+        if self.frames >= self.max_frames:
+            return self._decide("rejected", "max_frames", [sim for _, sim in self._faces])
+        return None
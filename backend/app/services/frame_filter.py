@@ -0,0 +1,121 @@
+"""
+CPU-only camera frame pre-filter (face present, large enough, sharp enough)
+"""
+
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.workers import run_in_process
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    cv2 = None
+    np = None
+
+
+# Frames are analysed at this width so detection cost is independent of camera resolution
+ANALYSIS_WIDTH = 320
+
+# Lao guidance shown to the user while frames are being rejected
+FRAME_HINTS = {
+    "no_face": "ບໍ່ພົບໃບໜ້າ. ກະລຸນາຫັນໜ້າເຂົ້າຫາກ້ອງ.",
+    "face_too_small": "ໃບໜ້າຢູ່ໄກເກີນໄປ. ກະລຸນາເຂົ້າໃກ້ກ້ອງອີກໜ້ອຍໜຶ່ງ.",
+    "blurry": "ຮູບພາບມົວ. ກະລຸນາຖືກ້ອງໃຫ້ໝັ້ນຄົງ ແລະ ຢູ່ນິ່ງໆ.",
+}
+
+
+class FrameCheck(NamedTuple):
+    """Pre-filter verdict for one frame"""
+    reason: Optional[str] = None  # Why the frame should not be sent, None if it should
+    hint: Optional[str] = None  # Lao guidance for the user when rejected
+    face_box: Optional[List[int]] = None  # Largest face [x, y, w, h] in frame pixels
+
+
+# Per worker process: loading the cascade once, not per frame
+_detector = None
+
+
+def frame_filter_available() -> bool:
+    """Check if the frame pre-filter is enabled and OpenCV is installed"""
+    return settings.FRAME_PREFILTER_ENABLED and cv2 is not None
+
+
+def _get_detector():
+    global _detector
+    if _detector is None:
+        path = settings.FRAME_PREFILTER_CASCADE or cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        _detector = cv2.CascadeClassifier(path)
+        if _detector.empty():
+            _detector = None
+            raise RuntimeError(f"Could not load face cascade: {path}")
+    return _detector
+
+
+def analyze_frame(data: bytes) -> Dict[str, Any]:
+    """
+    Detect the largest face and measure its sharpness. Runs inside the process pool.
+
+    Returns:
+        face count, the largest face's box in original-frame pixels
+        ([x, y, w, h] or None), its width as a fraction of the frame width and
+        the Laplacian variance (blur) of the face region
+    """
+    gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Frame is not a decodable image")
+
+    height, width = gray.shape
+    scale = min(1.0, ANALYSIS_WIDTH / width)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    faces = _get_detector().detectMultiScale(small, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+    if len(faces) == 0:
+        return {"faces": 0, "face_box": None, "face_ratio": 0.0, "blur_variance": 0.0}
+
+    x, y, w, h = max(faces, key=lambda box: box[2] * box[3])
+    region = small[y:y + h, x:x + w]
+    return {
+        "faces": len(faces),
+        "face_box": [int(x / scale), int(y / scale), int(w / scale), int(h / scale)],
+        "face_ratio": float(w / small.shape[1]),
+        "blur_variance": float(cv2.Laplacian(region, cv2.CV_64F).var()),
+    }
+
+
+def evaluate_frame(measures: Dict[str, Any]) -> Optional[str]:
+    """Get the first failed frame rule, or None if the frame is worth verifying"""
+    if measures["faces"] == 0:
+        return "no_face"
+    if measures["face_ratio"] < settings.FRAME_MIN_FACE_RATIO:
+        return "face_too_small"
+    if measures["blur_variance"] < settings.FRAME_BLUR_THRESHOLD:
+        return "blurry"
+    return None
+
+
+async def prefilter_frame(frame: bytes) -> FrameCheck:
+    """
+    Run the pre-filter off the event loop
+
+    Returns:
+        FrameCheck with a reason and Lao hint if the frame should not reach
+        the face server. Analysis errors never block a frame.
+    """
+    start = time.perf_counter()
+    try:
+        measures = await run_in_process(analyze_frame, frame)
+    except Exception as e:
+        print(f"Frame pre-filter failed, forwarding frame: {type(e).__name__}: {e}")
+        metrics.increment("frame_prefilter_total", outcome="error")
+        return FrameCheck()
+    finally:
+        metrics.observe("frame_prefilter_seconds", time.perf_counter() - start)
+
+    reason = evaluate_frame(measures)
+    metrics.increment("frame_prefilter_total", outcome=reason or "forwarded")
+    if reason is None:
+        return FrameCheck(face_box=measures["face_box"])
+    return FrameCheck(reason, FRAME_HINTS[reason], measures["face_box"])
@@ -0,0 +1,116 @@
+"""
+Latest-frame-wins scheduling of camera frames for one realtime session
+"""
+
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+class FrameOutcome(NamedTuple):
+    """What became of one submitted frame"""
+    sent: bool
+    result: Optional[Dict[str, Any]] = None
+    dropped: bool = False  # Replaced by a newer frame before it was sent
+    rejected: Optional[str] = None  # Pre-filter reason the frame was not sent
+    hint: Optional[str] = None  # Guidance for the user when rejected
+    capture_interval_ms: Optional[int] = None  # Suggested capture interval when the client is too fast
+
+
+FrameSender = Callable[[bytes], Awaitable[FrameOutcome]]
+
+
+class LatestFrameScheduler:
+    """
+    Backpressure for one session's camera frames
+
+    At most one frame is in flight to the face server and one waits behind
+    it. A frame submitted while another is waiting replaces it - the older
+    one is answered as dropped without being sent - so the result a client
+    gets is always for the newest face it captured, however far the face
+    server falls behind. Frames that had to wait (or were dropped) carry a
+    capture interval hint matching the face server's recent service time.
+    """
+
+    def __init__(self, send: FrameSender):
+        self._send = send
+        self._waiting: Optional[Tuple[bytes, asyncio.Future]] = None
+        self._in_flight: Optional[asyncio.Future] = None
+        self._driver: Optional[asyncio.Task] = None
+        self._service_time: Optional[float] = None  # EWMA of seconds per frame
+        self.last_submitted: Optional[float] = None  # time.monotonic() of the last submit
+
+    @property
+    def busy(self) -> bool:
+        return self._driver is not None
+
+    def capture_interval_hint(self) -> Optional[int]:
+        """Capture interval (ms) the face server is currently keeping up with"""
+        if not settings.FRAME_THROTTLE_HINTS or self._service_time is None:
+            return None
+        return max(settings.FRAME_MIN_CAPTURE_INTERVAL_MS, math.ceil(self._service_time * 1000))
+
+    async def submit(self, frame: bytes) -> FrameOutcome:
+        """Queue a JPEG frame for verification and wait for what became of it"""
+        submitted_at = time.perf_counter()
+        self.last_submitted = time.monotonic()
+        metrics.increment("face_frames_submitted_total")
+        future = asyncio.get_running_loop().create_future()
+        waited = self.busy
+
+        if self._waiting is not None:
+            _, stale = self._waiting
+            if not stale.done():
+                metrics.increment("face_frames_dropped_total")
+                stale.set_result(FrameOutcome(sent=False, dropped=True, capture_interval_ms=self.capture_interval_hint()))
+        self._waiting = (frame, future)
+
+        if self._driver is None:
+            self._driver = asyncio.ensure_future(self._drive())
+
+        outcome = await future
+        if outcome.sent and outcome.result is not None:
+            metrics.observe("face_frame_result_age_seconds", time.perf_counter() - submitted_at)
+            if waited:
+                outcome = outcome._replace(capture_interval_ms=self.capture_interval_hint())
+        return outcome
+
+    async def _drive(self) -> None:
+        """Send waiting frames one at a time until none is left"""
+        try:
+            while self._waiting is not None:
+                frame, future = self._waiting
+                self._waiting = None
+                if future.done():  # Caller gave up (e.g. request cancelled)
+                    continue
+
+                self._in_flight = future
+                started = time.perf_counter()
+                try:
+                    outcome = await self._send(frame)
+                except Exception as e:
+                    print(f"[ERROR] Error verifying frame: {type(e).__name__}: {e}")
+                    outcome = FrameOutcome(sent=False)
+                if outcome.sent and outcome.result is not None:
+                    elapsed = time.perf_counter() - started
+                    self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+
+                self._in_flight = None
+                if not future.done():
+                    future.set_result(outcome)
+        finally:
+            # Only left with frames when cancelled: nothing will answer them now
+            self._driver = None
+            stranded = [self._in_flight, self._waiting[1] if self._waiting else None]
+            self._in_flight = self._waiting = None
+            for future in stranded:
+                if future is not None and not future.done():
+                    future.set_result(FrameOutcome(sent=False))
+
+    def close(self) -> None:
+        """Stop sending; the frame in flight and any waiting frame resolve as not sent"""
+        if self._driver is not None:
+            self._driver.cancel()
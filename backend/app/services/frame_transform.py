@@ -0,0 +1,95 @@
+"""
+Camera frame transform before the face server (crop to face, downscale, re-encode)
+"""
+
+import io
+import time
+from typing import List, Optional
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.workers import run_in_process
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+
+def frame_transform_available() -> bool:
+    """Check if the frame transform is enabled and Pillow is installed"""
+    return settings.FRAME_TRANSFORM_ENABLED and Image is not None
+
+
+def _expand_box(face_box: List[int], margin: float, width: int, height: int) -> tuple:
+    """Face box grown by ``margin`` (fraction of its size) on every side, clipped to the frame"""
+    x, y, w, h = face_box
+    dx, dy = int(w * margin), int(h * margin)
+    return max(0, x - dx), max(0, y - dy), min(width, x + w + dx), min(height, y + h + dy)
+
+
+def transform_frame_bytes(
+    data: bytes,
+    max_edge: int,
+    quality: int,
+    face_box: Optional[List[int]] = None,
+    margin: float = 0.5,
+) -> bytes:
+    """
+    Crop a JPEG frame to the face region (when known), downscale so the longest
+    edge is at most ``max_edge`` and re-encode. Runs inside the process pool.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        box = _expand_box(face_box, margin, *img.size) if face_box else None
+        target = (box[2] - box[0], box[3] - box[1]) if box else img.size
+        # JPEG DCT scaling: decode at the smallest power-of-two size that still
+        # covers the target, which is much cheaper than a full decode
+        scale = max(target) / max_edge
+        if scale >= 2 and box is None:
+            img.draft("RGB", (img.size[0] // int(scale), img.size[1] // int(scale)))
+        if box:
+            img = img.crop(box)
+        img.thumbnail((max_edge, max_edge), Image.BILINEAR)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality)
+        return out.getvalue()
+
+
+async def transform_frame(frame: bytes, face_box: Optional[List[int]] = None) -> bytes:
+    """
+    Shrink a camera frame off the event loop
+
+    Returns:
+        The transformed JPEG, or the original frame when the transform is
+        disabled, fails, or would not make it smaller
+    """
+    if not frame_transform_available():
+        return frame
+
+    crop = face_box if settings.FRAME_CROP_TO_FACE else None
+    start = time.perf_counter()
+    try:
+        transformed = await run_in_process(
+            transform_frame_bytes,
+            frame,
+            settings.FRAME_MAX_EDGE,
+            settings.FRAME_JPEG_QUALITY,
+            crop,
+            settings.FRAME_CROP_MARGIN,
+        )
+    except Exception as e:
+        print(f"Frame transform failed, forwarding original: {type(e).__name__}: {e}")
+        metrics.increment("frame_transform_total", outcome="error")
+        return frame
+    finally:
+        metrics.observe("frame_transform_seconds", time.perf_counter() - start)
+
+    if len(transformed) >= len(frame):
+        metrics.increment("frame_transform_total", outcome="kept_original")
+        return frame
+
+    metrics.increment("frame_transform_total", outcome="cropped" if crop else "scaled")
+    metrics.increment("frame_transform_bytes_saved_total", len(frame) - len(transformed))
+    return transformed
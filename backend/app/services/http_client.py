@@ -0,0 +1,222 @@
+"""
+Shared pooled HTTP clients for upstream servers with retries and circuit breaking
+"""
+
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+import httpx
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+# Errors raised before the request reached the server - always safe to retry
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Errors after the request may have been processed - retry idempotent calls only
+_TRANSIENT_ERRORS = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is rejected because the upstream circuit is open"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} circuit is open, retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half_open -> closed)"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("upstream_circuit_state", _STATE_VALUES[self.state], upstream=self.name)
+
+    def before_request(self) -> bool:
+        """
+        Raise CircuitOpenError if the call must fail fast
+
+        Returns:
+            True if this call is the half-open trial; the caller must then end
+            it with record_success(trial=True), record_failure(trial=True) or
+            release_trial
+        """
+        if self.state == "open":
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+            self.state = "half_open"
+            self._publish()
+
+        if self.state == "half_open":
+            # Only one trial request probes a recovering upstream
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """Give up the half-open trial without an outcome (cancelled or unexpected error)"""
+        self._trial_in_flight = False
+
+    def record_success(self, trial: bool = False) -> None:
+        if trial:
+            self._trial_in_flight = False
+        self.failures = 0
+        if self.state != "closed":
+            print(f"[CIRCUIT] {self.name} closed")
+            self.state = "closed"
+            self._publish()
+
+    def record_failure(self, trial: bool = False) -> None:
+        if trial:
+            self._trial_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"[CIRCUIT] {self.name} opened after {self.failures} failure(s)")
+                metrics.increment("upstream_circuit_opened_total", upstream=self.name)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._publish()
+
+
+class UpstreamClient:
+    """Pooled httpx.AsyncClient for one upstream with bounded retries and a circuit breaker"""
+
+    def __init__(
+        self,
+        name: str,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+    ):
+        self.name = name
+        self.max_retries = settings.UPSTREAM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = settings.UPSTREAM_RETRY_BACKOFF if backoff_base is None else backoff_base
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+        )
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.OCR_SCAN_TIMEOUT, connect=settings.OCR_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE,
+            ),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        idempotent: bool = True,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Send a request through the pool
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            endpoint: Short label used for metrics (e.g. "upload", "scan")
+            idempotent: Whether the call may be retried after it reached the server
+            timeout: Read timeout override in seconds
+
+        Returns:
+            httpx.Response (5xx responses are returned once retries are exhausted)
+
+        Raises:
+            CircuitOpenError: If the upstream circuit is open
+            httpx.RequestError: If the last attempt failed at transport level
+        """
+        labels = {"upstream": self.name, "endpoint": endpoint}
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=settings.OCR_CONNECT_TIMEOUT)
+
+        try:
+            holds_trial = self.breaker.before_request()
+        except CircuitOpenError:
+            metrics.increment("upstream_requests_total", outcome="circuit_open", **labels)
+            raise
+
+        # The breaker sees one outcome per logical request, not per attempt;
+        # anything else leaving this block (cancellation included) frees the
+        # trial if this request holds it
+        recorded = False
+        try:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.RequestError as e:
+                    metrics.observe("upstream_request_seconds", time.perf_counter() - start, **labels)
+                    retryable = isinstance(e, _CONNECT_ERRORS) or (idempotent and isinstance(e, _TRANSIENT_ERRORS))
+                    if retryable and attempt < self.max_retries:
+                        metrics.increment("upstream_retries_total", **labels)
+                        await asyncio.sleep(self._backoff(attempt))
+                        attempt += 1
+                        continue
+                    self.breaker.record_failure(trial=holds_trial)
+                    recorded = True
+                    metrics.increment("upstream_requests_total", outcome="error", **labels)
+                    raise
+
+                metrics.observe("upstream_request_seconds", time.perf_counter() - start, **labels)
+                if response.status_code >= 500:
+                    if idempotent and attempt < self.max_retries:
+                        metrics.increment("upstream_retries_total", **labels)
+                        await asyncio.sleep(self._backoff(attempt))
+                        attempt += 1
+                        continue
+                    self.breaker.record_failure(trial=holds_trial)
+                    metrics.increment("upstream_requests_total", outcome="server_error", **labels)
+                else:
+                    self.breaker.record_success(trial=holds_trial)
+                    metrics.increment("upstream_requests_total", outcome="ok", **labels)
+                recorded = True
+                return response
+        finally:
+            if holds_trial and not recorded:
+                self.breaker.release_trial()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_clients: Dict[str, UpstreamClient] = {}
+
+
+def get_upstream_client(name: str) -> UpstreamClient:
+    """Get the process-wide client for an upstream ("ocr", "face", ...)"""
+    client = _clients.get(name)
+    if client is None:
+        client = _clients[name] = UpstreamClient(name)
+    return client
+
+
+async def close_upstream_clients() -> None:
+    """Close every pooled client (application shutdown)"""
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
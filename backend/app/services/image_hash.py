@@ -0,0 +1,203 @@
+"""
+Perceptual hashing (dHash) and an in-memory Hamming index for near-duplicate ID images
+"""
+
+import io
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from app.config import settings
+from app.database.connection import engine
+from app.database.models import EKYCRecord
+from app.utils.metrics import metrics
+from app.utils.workers import run_in_process
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+
+HASH_BITS = 64
+_HASH_MASK = (1 << HASH_BITS) - 1
+
+# Lao message shown when a duplicate image is rejected
+DUPLICATE_MESSAGE = "ຮູບບັດປະຈຳຕົວນີ້ເຄີຍຖືກນຳໃຊ້ແລ້ວ. ກະລຸນາອັບໂຫລດຮູບບັດປະຈຳຕົວຂອງທ່ານເອງ."
+
+
+def phash_available() -> bool:
+    """Check if perceptual hashing is enabled and Pillow is installed"""
+    return settings.PHASH_ENABLED and Image is not None
+
+
+def dhash(data: bytes) -> int:
+    """
+    64-bit difference hash of an image. Runs inside the process pool.
+
+    The image is reduced to a 9x8 grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right-hand neighbour, so re-encoding,
+    resizing and small edits change only a few bits.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        # Let the JPEG decoder downscale while decoding - only 72 pixels are needed
+        img.draft("L", (64, 64))
+        img = ImageOps.exif_transpose(img)
+        small = img.convert("L").resize((9, 8), Image.BILINEAR)
+        pixels = list(small.getdata())
+
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+# int.bit_count is Python 3.10+; it is several times faster than counting "1"s
+_popcount = getattr(int, "bit_count", None) or (lambda value: bin(value).count("1"))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return _popcount(a ^ b)
+
+
+def to_signed64(value: int) -> int:
+    """Map an unsigned 64-bit hash into the BIGINT range for storage"""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def from_signed64(value: int) -> int:
+    return value & _HASH_MASK
+
+
+def format_hash(value: int) -> str:
+    return format(value, "016x")
+
+
+class HammingIndex:
+    """
+    Multi-index hashing over 64-bit hashes
+
+    Each hash is split into ``chunks`` 16-bit substrings, each with its own
+    exact-match table. Two hashes within distance r must agree to within
+    r // chunks bits on at least one substring (pigeonhole), so a query only
+    probes those few table entries and verifies the candidates it finds.
+    """
+
+    def __init__(self, chunks: int = 4):
+        self.chunks = chunks
+        self.chunk_bits = HASH_BITS // chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(chunks)]
+        self._owners: Dict[int, List[str]] = {}
+        self._mask_cache: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def _split(self, value: int) -> List[int]:
+        return [(value >> (i * self.chunk_bits)) & self._chunk_mask for i in range(self.chunks)]
+
+    def add(self, value: int, owner: str) -> None:
+        """Index a hash for ``owner`` (e.g. the session that uploaded it)"""
+        owners = self._owners.get(value)
+        if owners is not None:
+            if owner not in owners:
+                owners.append(owner)
+            return
+
+        self._owners[value] = [owner]
+        for table, key in zip(self._tables, self._split(value)):
+            table.setdefault(key, []).append(value)
+
+    def _flip_masks(self, radius: int) -> List[int]:
+        """Every chunk-sized mask with at most ``radius`` bits set (cached per radius)"""
+        masks = self._mask_cache.get(radius)
+        if masks is None:
+            masks = [0]
+            for flips in range(1, radius + 1):
+                for bits in itertools.combinations(range(self.chunk_bits), flips):
+                    masks.append(sum(1 << bit for bit in bits))
+            self._mask_cache[radius] = masks
+        return masks
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int, List[str]]]:
+        """
+        Find indexed hashes within ``max_distance`` bits
+
+        Returns:
+            (hash, distance, owners) tuples, closest first
+        """
+        masks = self._flip_masks(max_distance // self.chunks)
+        candidates = set()
+        for table, key in zip(self._tables, self._split(value)):
+            get = table.get
+            for mask in masks:
+                bucket = get(key ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+
+        matches = []
+        for candidate in candidates:
+            distance = _popcount(value ^ candidate)
+            if distance <= max_distance:
+                matches.append((candidate, distance, self._owners[candidate]))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+
+# Process-wide index of ID card hashes, loaded from ekyc_records at startup and
+# extended as new ID cards are uploaded
+phash_index = HammingIndex()
+
+
+async def compute_phash(data: bytes) -> Optional[int]:
+    """Hash image bytes off the event loop; errors return None and never block the upload"""
+    try:
+        return await run_in_process(dhash, data)
+    except Exception as e:
+        print(f"Perceptual hash failed, skipping duplicate check: {type(e).__name__}: {e}")
+        return None
+
+
+def find_duplicates(value: int, owner: Optional[str] = None) -> List[Dict[str, object]]:
+    """
+    Look up near-duplicates of ``value`` uploaded by anyone other than ``owner``
+
+    Returns:
+        [{"session_id", "distance"}] closest first
+    """
+    start = time.perf_counter()
+    matches = phash_index.search(value, settings.PHASH_MAX_DISTANCE)
+    metrics.observe("phash_lookup_seconds", time.perf_counter() - start)
+
+    duplicates = []
+    for _, distance, owners in matches:
+        for other in owners:
+            if other != owner:
+                duplicates.append({"session_id": other, "distance": distance})
+    return duplicates
+
+
+def register_phash(value: int, owner: str) -> None:
+    phash_index.add(value, owner)
+    metrics.set_gauge("phash_index_size", len(phash_index))
+
+
+async def load_phash_index(batch_size: int = 10000) -> int:
+    """Load every stored ID card hash into the index (application startup)"""
+    start = time.perf_counter()
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            select(EKYCRecord.id_card_phash, EKYCRecord.session_id)
+            .where(EKYCRecord.id_card_phash.is_not(None)),
+            execution_options={"yield_per": batch_size},
+        )
+        async for value, session_id in result:
+            phash_index.add(from_signed64(value), str(session_id))
+
+    metrics.set_gauge("phash_index_size", len(phash_index))
+    print(f"Perceptual hash index loaded: {len(phash_index)} hash(es) in {time.perf_counter() - start:.2f}s")
+    return len(phash_index)
@@ -0,0 +1,123 @@
+"""
+Image normalization before OCR upload (EXIF orientation, downscale, re-encode)
+"""
+
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO, Optional, Tuple, Union
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.workers import run_in_process
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+
+_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+# Uploaded image content: in-memory bytes or a seekable file (spooled upload)
+ImageContent = Union[bytes, BinaryIO]
+
+
+def content_size(content: ImageContent) -> int:
+    """Size in bytes of image bytes or a seekable file"""
+    if isinstance(content, (bytes, bytearray)):
+        return len(content)
+    position = content.tell()
+    content.seek(0, os.SEEK_END)
+    size = content.tell()
+    content.seek(position)
+    return size
+
+
+def read_content(content: ImageContent) -> bytes:
+    """Get the full bytes of image content (reads a file from the start)"""
+    if isinstance(content, (bytes, bytearray)):
+        return bytes(content)
+    content.seek(0)
+    return content.read()
+
+
+def copy_content(content: BinaryIO, chunk_size: int = 64 * 1024) -> tempfile.SpooledTemporaryFile:
+    """Copy a file (from the start) into a spooled file owned by the caller; blocking"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    content.seek(0)
+    shutil.copyfileobj(content, spooled, chunk_size)
+    spooled.seek(0)
+    return spooled
+
+
+def normalization_available() -> bool:
+    """Check if normalization is enabled and Pillow is installed"""
+    return settings.IMAGE_NORMALIZE_ENABLED and Image is not None
+
+
+def normalize_image_bytes(data: bytes, max_edge: int, output_format: str, quality: int) -> bytes:
+    """
+    Apply EXIF orientation, downscale so the longest edge is at most ``max_edge``
+    and re-encode. Runs inside the process pool.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        out = io.BytesIO()
+        img.save(out, format=output_format, quality=quality, optimize=True)
+        return out.getvalue()
+
+
+async def normalize_upload(file_content: ImageContent, filename: str) -> Tuple[ImageContent, str]:
+    """
+    Normalize an uploaded ID card image off the event loop
+
+    Args:
+        file_content: Original image bytes or seekable file
+        filename: Original filename
+
+    Returns:
+        (content, filename) to upload - the original pair when normalization is
+        disabled, fails, or would not make the image smaller
+    """
+    if not normalization_available():
+        metrics.increment("image_normalize_total", outcome="bypassed")
+        return file_content, filename
+
+    if not isinstance(file_content, (bytes, bytearray)):
+        # Decoding needs the whole image; files are only read when normalizing
+        file_content = await asyncio.to_thread(read_content, file_content)
+
+    output_format = settings.IMAGE_OUTPUT_FORMAT.upper()
+    start = time.perf_counter()
+    try:
+        normalized: Optional[bytes] = await run_in_process(
+            normalize_image_bytes,
+            file_content,
+            settings.IMAGE_MAX_EDGE,
+            output_format,
+            settings.IMAGE_QUALITY,
+        )
+    except Exception as e:
+        print(f"Image normalization failed, uploading original: {type(e).__name__}: {e}")
+        metrics.increment("image_normalize_total", outcome="error")
+        return file_content, filename
+    finally:
+        metrics.observe("image_normalize_seconds", time.perf_counter() - start)
+
+    if not normalized or len(normalized) >= len(file_content):
+        metrics.increment("image_normalize_total", outcome="kept_original")
+        return file_content, filename
+
+    metrics.increment("image_normalize_total", outcome="normalized")
+    print(f"Normalized image: {len(file_content)} -> {len(normalized)} bytes")
+
+    stem = os.path.splitext(filename)[0] or "image"
+    return normalized, f"{stem}.{_EXTENSIONS.get(output_format, output_format.lower())}"
@@ -0,0 +1,110 @@
+"""
+CPU-only ID photo quality gate (resolution, blur, exposure, glare)
+"""
+
+import io
+import time
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.workers import run_in_process
+
+try:
+    import numpy as np
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+    Image = None
+    ImageOps = None
+
+
+# Images are analysed at this longest edge so the cost is independent of upload size
+ANALYSIS_EDGE = 1000
+
+# Lao guidance shown to the user for each rejection reason
+QUALITY_MESSAGES = {
+    "low_resolution": "ຮູບພາບມີຄວາມລະອຽດຕໍ່າເກີນໄປ. ກະລຸນາຖ່າຍຮູບບັດປະຈຳຕົວໃຫ້ໃກ້ຂຶ້ນ ແລະ ໃຫ້ບັດເຕັມກອບຮູບ.",
+    "blurry": "ຮູບພາບມົວເກີນໄປ. ກະລຸນາຖືກ້ອງໃຫ້ໝັ້ນຄົງ ແລະ ຖ່າຍຮູບບັດປະຈຳຕົວໃໝ່ໃຫ້ຊັດເຈນ.",
+    "too_dark": "ຮູບພາບມືດເກີນໄປ. ກະລຸນາຖ່າຍຮູບໃນບ່ອນທີ່ມີແສງສະຫວ່າງພຽງພໍ.",
+    "too_bright": "ຮູບພາບສະຫວ່າງເກີນໄປ. ກະລຸນາຫຼຸດແສງ ຫຼື ຍ້າຍໄປບ່ອນທີ່ມີແສງພໍດີ.",
+    "glare": "ມີແສງສະທ້ອນເທິງບັດຫຼາຍເກີນໄປ. ກະລຸນາຫຼີກລ່ຽງແສງໄຟ ຫຼື ແສງແດດສ່ອງໃສ່ບັດໂດຍກົງ.",
+}
+
+
+def quality_check_available() -> bool:
+    """Check if the quality gate is enabled and numpy/Pillow are installed"""
+    return settings.IMAGE_QUALITY_CHECK_ENABLED and np is not None and Image is not None
+
+
+def analyze_image_quality(data: bytes) -> Dict[str, float]:
+    """
+    Measure image quality indicators. Runs inside the process pool.
+
+    Returns:
+        width/height of the original image, Laplacian variance (blur), mean
+        brightness (0-255) and the fraction of near-saturated pixels (glare)
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        gray = img.convert("L")
+        gray.thumbnail((ANALYSIS_EDGE, ANALYSIS_EDGE))
+        pixels = np.asarray(gray, dtype=np.float32)
+
+    # 4-neighbour Laplacian; low variance means few sharp edges
+    laplacian = (
+        pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+        - 4.0 * pixels[1:-1, 1:-1]
+    )
+
+    return {
+        "width": float(width),
+        "height": float(height),
+        "blur_variance": float(laplacian.var()),
+        "brightness": float(pixels.mean()),
+        "glare_ratio": float((pixels >= 250).mean()),
+    }
+
+
+def evaluate_quality(measures: Dict[str, float]) -> Optional[str]:
+    """Get the first failed quality rule, or None if the photo is acceptable"""
+    long_edge = max(measures["width"], measures["height"])
+    short_edge = min(measures["width"], measures["height"])
+    if long_edge < settings.QUALITY_MIN_LONG_EDGE or short_edge < settings.QUALITY_MIN_SHORT_EDGE:
+        return "low_resolution"
+    if measures["brightness"] < settings.QUALITY_MIN_BRIGHTNESS:
+        return "too_dark"
+    if measures["brightness"] > settings.QUALITY_MAX_BRIGHTNESS:
+        return "too_bright"
+    if measures["glare_ratio"] > settings.QUALITY_MAX_GLARE_RATIO:
+        return "glare"
+    if measures["blur_variance"] < settings.QUALITY_BLUR_THRESHOLD:
+        return "blurry"
+    return None
+
+
+async def check_image_quality(file_content: bytes) -> Optional[Tuple[str, str]]:
+    """
+    Run the quality gate off the event loop
+
+    Returns:
+        (reason, Lao guidance message) if the photo should be retaken, else None.
+        Analysis errors never block the upload.
+    """
+    start = time.perf_counter()
+    try:
+        measures = await run_in_process(analyze_image_quality, file_content)
+    except Exception as e:
+        print(f"Image quality check failed, skipping: {type(e).__name__}: {e}")
+        metrics.increment("image_quality_checks_total", outcome="error")
+        return None
+    finally:
+        metrics.observe("image_quality_check_seconds", time.perf_counter() - start)
+
+    reason = evaluate_quality(measures)
+    metrics.increment("image_quality_checks_total", outcome=reason or "passed")
+    if reason is None:
+        return None
+
+    print(f"Image rejected by quality gate ({reason}): {measures}")
+    return reason, QUALITY_MESSAGES[reason]
@@ -0,0 +1,163 @@
+"""
+Local content-addressed store of uploaded images, keyed by the URL the OCR server returned
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+from typing import Optional
+from app.config import settings
+from app.services.image_processing import ImageContent, read_content
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+
+
+class ImageStore:
+    """
+    Two-tier store of image bytes so face verification does not download
+    back what we uploaded ourselves
+
+    URLs map to the SHA-256 of the content (expiring after ``ttl``); the bytes
+    live in a memory tier bounded by ``memory_bytes`` (LRU) and, when
+    ``disk_bytes`` > 0, a disk tier bounded the same way. The disk tier is a
+    per-process directory removed on shutdown - the URL index does not
+    survive a restart, so neither does the data.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: Optional[int] = None,
+        disk_bytes: Optional[int] = None,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.memory_limit = settings.IMAGE_STORE_MEMORY_BYTES if memory_bytes is None else memory_bytes
+        self.disk_limit = settings.IMAGE_STORE_DISK_BYTES if disk_bytes is None else disk_bytes
+        self.base_directory = directory or settings.IMAGE_STORE_DIR
+        self._urls = TTLCache(
+            max_entries=settings.IMAGE_STORE_MAX_ENTRIES,
+            ttl=settings.IMAGE_STORE_TTL if ttl is None else ttl,
+            name="image_store_urls",
+        )
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory_limit > 0 or self.disk_limit > 0
+
+    @property
+    def directory(self) -> str:
+        # Resolved on use so forked workers each get their own directory
+        return os.path.join(self.base_directory, str(os.getpid()))
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _write_file(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_file(self, digest: str) -> bytes:
+        with open(self._path(digest), "rb") as fh:
+            return fh.read()
+
+    def _remove_file(self, digest: str) -> None:
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _put_memory(self, digest: str, data: bytes) -> None:
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        if len(data) > self.memory_limit:
+            return
+        self._memory[digest] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+        metrics.set_gauge("image_store_bytes", self._memory_bytes, tier="memory")
+
+    async def _put_disk(self, digest: str, data: bytes) -> None:
+        if digest in self._disk:
+            self._disk.move_to_end(digest)
+            return
+        if len(data) > self.disk_limit:
+            return
+        # Account before the write so a concurrent put of the same content skips it
+        self._disk[digest] = len(data)
+        self._disk_bytes += len(data)
+        try:
+            await asyncio.to_thread(self._write_file, digest, data)
+        except OSError:
+            if self._disk.pop(digest, None) is not None:
+                self._disk_bytes -= len(data)
+            raise
+        while self._disk_bytes > self.disk_limit:
+            evicted, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            await asyncio.to_thread(self._remove_file, evicted)
+        metrics.set_gauge("image_store_bytes", self._disk_bytes, tier="disk")
+
+    async def put(self, url: str, content: ImageContent) -> None:
+        """Remember the bytes served at ``url``; storage errors are logged, never raised"""
+        if not self.enabled:
+            return
+        try:
+            data = content if isinstance(content, (bytes, bytearray)) else await asyncio.to_thread(read_content, content)
+            data = bytes(data)
+            digest = hashlib.sha256(data).hexdigest()
+            self._urls.set(url, digest)
+            self._put_memory(digest, data)
+            if self.disk_limit > 0:
+                await self._put_disk(digest, data)
+        except Exception as e:
+            print(f"Image store write failed for {url}: {type(e).__name__}: {e}")
+
+    async def get(self, url: str) -> Optional[bytes]:
+        """Get the stored bytes for ``url``, or None if it has to be downloaded"""
+        if not self.enabled:
+            return None
+
+        digest = self._urls.get(url)
+        data = None
+        tier = "miss"
+        if digest is not None:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                tier = "memory"
+            elif digest in self._disk:
+                try:
+                    data = await asyncio.to_thread(self._read_file, digest)
+                    self._put_memory(digest, data)
+                    tier = "disk"
+                except OSError as e:
+                    print(f"Image store read failed for {url}: {e}")
+
+        metrics.increment("image_store_requests_total", tier=tier)
+        if data is not None:
+            metrics.increment("image_store_bytes_saved_total", len(data))
+        return data
+
+    def close(self) -> None:
+        """Drop everything, including this process's disk tier (application shutdown)"""
+        self._urls.clear()
+        self._memory.clear()
+        self._disk.clear()
+        self._memory_bytes = self._disk_bytes = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+image_store = ImageStore()
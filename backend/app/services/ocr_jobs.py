@@ -0,0 +1,205 @@
+"""
+Background OCR job pipeline: bounded queue, worker pool, progress events, TTL results
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+
+
+# Stages reported while a job runs, in order
+JOB_STAGES = ("queued", "uploading", "scanning", "formatting", "saved")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class OCRJob:
+    """State of one background OCR job"""
+
+    def __init__(
+        self,
+        session_id: str,
+        handler: Callable[["OCRJob"], Awaitable[Dict[str, Any]]],
+        cleanup: Optional[Callable[[], None]] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.handler = handler
+        # Releases what the job owns (e.g. its upload copy) if it never runs
+        self.cleanup = cleanup
+        self.status = "queued"  # queued, running, completed, failed
+        self.stage = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    def publish(self) -> None:
+        """Push the current state to every subscriber"""
+        self.updated_at = time.time()
+        event = self.to_dict()
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def discard(self, error: str) -> None:
+        """Fail a job that will never run and release what it owns"""
+        self.status = "failed"
+        self.error = error
+        self.publish()
+        if self.cleanup is not None:
+            self.cleanup()
+
+    def set_stage(self, stage: str) -> None:
+        """Report progress (called by the job handler)"""
+        self.stage = stage
+        self.publish()
+
+    async def events(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """Yield the current state, then every update until the job finishes"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            event = self.to_dict()
+            while True:
+                yield event
+                if event["status"] in ("completed", "failed"):
+                    return
+                event = await queue.get()
+        finally:
+            self._subscribers.remove(queue)
+
+
+class OCRJobManager:
+    """Runs OCR jobs on a fixed number of workers fed by a bounded queue"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        result_ttl: Optional[float] = None,
+    ):
+        self.worker_count = workers or settings.OCR_JOB_WORKERS
+        self.queue_size = queue_size or settings.OCR_JOB_QUEUE_SIZE
+        # Created in start() so it belongs to the running event loop
+        self.queue: Optional[asyncio.Queue] = None
+        # Jobs stay visible (queued, running and finished) until their TTL expires
+        self.jobs = TTLCache(
+            max_entries=settings.OCR_JOB_MAX_STORED,
+            ttl=result_ttl or settings.OCR_JOB_RESULT_TTL,
+            name="ocr_jobs",
+        )
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start worker tasks (application startup)"""
+        if self._workers:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"ocr-job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        print(f"OCR job pool started with {self.worker_count} worker(s)")
+
+    async def stop(self) -> None:
+        """Cancel worker tasks and fail the jobs still queued (application shutdown)"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while self.queue is not None and not self.queue.empty():
+            job: OCRJob = self.queue.get_nowait()
+            self.queue.task_done()
+            job.discard("Job cancelled")
+            metrics.increment("ocr_jobs_total", status="failed")
+        self.queue = None
+
+    def submit(
+        self,
+        session_id: str,
+        handler: Callable[[OCRJob], Awaitable[Dict[str, Any]]],
+        cleanup: Optional[Callable[[], None]] = None,
+    ) -> OCRJob:
+        """
+        Enqueue a job. ``cleanup`` runs if the job is rejected here or
+        discarded at shutdown before a worker picks it up.
+
+        Raises:
+            QueueFullError: If the queue is at capacity or the pool is not running
+        """
+        if self.queue is None:
+            if cleanup is not None:
+                cleanup()
+            raise QueueFullError("OCR job pool is not running")
+
+        job = OCRJob(session_id, handler, cleanup)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            metrics.increment("ocr_jobs_total", status="rejected")
+            if cleanup is not None:
+                cleanup()
+            raise QueueFullError("OCR job queue is full")
+
+        self.jobs.set(job.id, job)
+        metrics.increment("ocr_jobs_total", status="queued")
+        metrics.set_gauge("ocr_job_queue_depth", self.queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        return self.jobs.get(job_id)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job: OCRJob = await self.queue.get()
+            metrics.set_gauge("ocr_job_queue_depth", self.queue.qsize())
+            metrics.observe("ocr_job_wait_seconds", time.time() - job.created_at)
+            start = time.perf_counter()
+            job.status = "running"
+            job.publish()
+            try:
+                job.result = await job.handler(job)
+                job.status = "completed"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Job cancelled"
+                job.publish()
+                raise
+            except Exception as e:
+                print(f"[JOB] OCR job {job.id} failed: {type(e).__name__}: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                self.queue.task_done()
+
+            metrics.increment("ocr_jobs_total", status=job.status)
+            metrics.observe("ocr_job_seconds", time.perf_counter() - start)
+            job.publish()
+            # Restart the TTL from completion so results stay available
+            self.jobs.set(job.id, job)
+
+
+ocr_job_manager = OCRJobManager()
@@ -2,10 +2,71 @@
 OCR Service for image processing and text extraction with async support
 """
 
+import asyncio
+import copy
+import hashlib
+import time
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional
 from app.config import settings
 from app.models.verification import ScanResult
+from app.services.http_client import CircuitOpenError, get_upstream_client
+from app.services.image_processing import (
+    ImageContent,
+    content_size,
+    copy_content,
+    normalization_available,
+    normalize_upload,
+    read_content,
+)
+from app.services.image_quality import check_image_quality, quality_check_available
+from app.services.image_store import image_store
+from app.services.image_hash import (
+    DUPLICATE_MESSAGE,
+    compute_phash,
+    find_duplicates,
+    format_hash,
+    phash_available,
+)
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+from app.utils.singleflight import SingleFlight
+
+
+# Process-wide (image_url, scan_result) cache keyed by SHA-256 of the uploaded bytes,
+# so a retried upload of the same photo skips the OCR round trip entirely
+_scan_cache = TTLCache(
+    max_entries=settings.OCR_CACHE_MAX_ENTRIES,
+    ttl=settings.OCR_CACHE_TTL,
+    name="ocr_scan",
+)
+
+# Concurrent process_image calls for the same (content hash, session)
+_process_flights = SingleFlight("ocr_process")
+
+_HASH_CHUNK_SIZE = 64 * 1024
+
+
+def extract_image_url(upload_result: Any) -> Optional[str]:
+    """Get the image URL from an OCR upload response"""
+    if isinstance(upload_result, str):
+        return upload_result
+    if isinstance(upload_result, dict):
+        return upload_result.get("url")
+    return None
+
+
+def hash_content(file_content: ImageContent) -> str:
+    """SHA-256 of image bytes or of a seekable file (read in chunks, then rewound)"""
+    if isinstance(file_content, (bytes, bytearray)):
+        return hashlib.sha256(file_content).hexdigest()
+
+    digest = hashlib.sha256()
+    file_content.seek(0)
+    for chunk in iter(lambda: file_content.read(_HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    file_content.seek(0)
+    return digest.hexdigest()
 
 
 class OCRService:
@@ -14,26 +75,41 @@ class OCRService:
     def __init__(self):
         self.upload_url = settings.OCR_UPLOAD_URL
         self.scan_url = settings.OCR_SCAN_URL
+        self.client = get_upstream_client("ocr")
 
-    async def upload_image(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    async def upload_image(self, file_content: ImageContent, filename: str) -> Dict[str, Any]:
         """
         Upload image to OCR server
 
         Args:
-            file_content: Image file bytes
+            file_content: Image file bytes, or a seekable file streamed in chunks
             filename: Original filename
 
         Returns:
             Dictionary containing upload result with URL
         """
         try:
+            if not isinstance(file_content, (bytes, bytearray)):
+                file_content.seek(0)
             files = {"file": (filename, file_content)}
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(self.upload_url, files=files)
-                response.raise_for_status()
-                return response.json()
+            # Not idempotent: only retried when the request never reached the server
+            response = await self.client.request(
+                "POST",
+                self.upload_url,
+                endpoint="upload",
+                idempotent=False,
+                timeout=settings.OCR_UPLOAD_TIMEOUT,
+                files=files,
+            )
+            response.raise_for_status()
+            return response.json()
 
+        except CircuitOpenError:
+            return {
+                "success": False,
+                "error": "OCR service is temporarily unavailable. Please try again shortly."
+            }
         except httpx.HTTPStatusError as e:
             error_detail = e.response.text if e.response else str(e)
             return {
@@ -65,18 +141,31 @@ class OCRService:
             payload = {"url": image_url}
             headers = {"Content-Type": "application/json"}
 
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(self.scan_url, json=payload, headers=headers)
-                response.raise_for_status()
+            # Scanning an uploaded URL has no side effects, so it is retried
+            response = await self.client.request(
+                "POST",
+                self.scan_url,
+                endpoint="scan",
+                idempotent=True,
+                timeout=settings.OCR_SCAN_TIMEOUT,
+                json=payload,
+                headers=headers,
+            )
+            response.raise_for_status()
 
-                result_data = response.json()
+            result_data = response.json()
 
-                # Remove img_base64 to save memory/bandwidth
-                if isinstance(result_data, dict) and "img_base64" in result_data:
-                    result_data.pop("img_base64")
+            # Remove img_base64 to save memory/bandwidth
+            if isinstance(result_data, dict) and "img_base64" in result_data:
+                result_data.pop("img_base64")
 
-                return ScanResult.from_api_response(result_data)
+            return ScanResult.from_api_response(result_data)
 
+        except CircuitOpenError:
+            return ScanResult(
+                status="error",
+                message="OCR service is temporarily unavailable. Please try again shortly."
+            )
         except httpx.HTTPStatusError as e:
             error_detail = e.response.text if e.response else str(e)
             return ScanResult(
@@ -94,30 +183,159 @@ class OCRService:
                 message=f"Unexpected error: {str(e)}"
             )
 
-    async def process_image(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    async def process_image(
+        self,
+        file_content: ImageContent,
+        filename: str,
+        content_hash: Optional[str] = None,
+        on_stage: Optional[Callable[[str], None]] = None,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Complete image processing: upload and scan
 
         Args:
-            file_content: Image file bytes
+            file_content: Image file bytes, or a seekable file (e.g. the spooled upload)
             filename: Original filename
+            content_hash: SHA-256 hex digest of the content if already computed
+            on_stage: Optional progress callback, called with "uploading" and "scanning"
+            session_id: Uploading session; enables the near-duplicate image check
 
         Returns:
             Dictionary containing both upload and scan results
         """
-        # Upload image
-        upload_result = await self.upload_image(file_content, filename)
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(hash_content, file_content)
+        cached = _scan_cache.get(content_hash)
+        if cached is not None:
+            print(f"OCR cache hit: {content_hash[:12]}")
+            # Deep copy: callers put scan_result into session context, which
+            # must not alias the entry other sessions are served from
+            result = {**copy.deepcopy(cached), "cached": True}
+            if session_id is not None and cached.get("phash"):
+                duplicates = self._check_duplicates(int(cached["phash"], 16), session_id)
+                if duplicates:
+                    if settings.PHASH_DUPLICATE_ACTION == "reject":
+                        return {"success": False, "error": DUPLICATE_MESSAGE, "duplicate_of": duplicates}
+                    result["duplicate_of"] = duplicates
+            return result
+
+        # A double-clicked upload joins the scan already running for the same bytes
+        key = (content_hash, session_id)
+        if key in _process_flights or isinstance(file_content, (bytes, bytearray)):
+            return await _process_flights.do(
+                key,
+                lambda: self._process_uncached(file_content, filename, content_hash, on_stage, session_id),
+            )
+
+        # The flight is a shared task that outlives a disconnecting caller,
+        # whose spooled upload closes with its request: give it a copy it owns
+        owned = await asyncio.to_thread(copy_content, file_content)
+        started = False
+
+        async def run() -> Dict[str, Any]:
+            nonlocal started
+            started = True
+            try:
+                return await self._process_uncached(owned, filename, content_hash, on_stage, session_id)
+            finally:
+                owned.close()
+
+        result = await _process_flights.do(key, run)
+        if not started:  # Joined a flight that started while copying
+            owned.close()
+        return result
+
+    async def _process_uncached(
+        self,
+        file_content: ImageContent,
+        filename: str,
+        content_hash: str,
+        on_stage: Optional[Callable[[str], None]],
+        session_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Quality gate, duplicate check, upload and scan for content not in the cache"""
+        quality_enabled = quality_check_available()
+        phash_enabled = session_id is not None and phash_available()
+        if (
+            (quality_enabled or phash_enabled or normalization_available())
+            and not isinstance(file_content, (bytes, bytearray))
+        ):
+            # These stages decode the whole image - read the spooled file once
+            file_content = await asyncio.to_thread(read_content, file_content)
+
+        start = time.perf_counter()
+        if on_stage:
+            on_stage("uploading")
+        upload_task = asyncio.create_task(self._normalize_and_upload(file_content, filename))
+        phash_task = asyncio.create_task(compute_phash(file_content)) if phash_enabled else None
+        try:
+            # The quality gate and duplicate check run while the upload is in
+            # flight; a rejected photo never reaches the (expensive) scan step
+            if quality_enabled:
+                rejection = await check_image_quality(file_content)
+                if rejection:
+                    reason, message = rejection
+                    metrics.increment("ocr_calls_avoided_total", reason=reason)
+                    return {"success": False, "error": message, "quality_issue": reason}
+
+            phash = await phash_task if phash_task else None
+            duplicates = self._check_duplicates(phash, session_id) if phash is not None else []
+            if duplicates and settings.PHASH_DUPLICATE_ACTION == "reject":
+                metrics.increment("ocr_calls_avoided_total", reason="duplicate")
+                return {"success": False, "error": DUPLICATE_MESSAGE, "duplicate_of": duplicates}
+
+            upload_result = await upload_task
+            if on_stage:
+                on_stage("scanning")
+            result = await self._scan_uploaded(upload_result, content_hash, phash)
+            if duplicates:
+                result = {**result, "duplicate_of": duplicates}
+            return result
+        finally:
+            for task in (upload_task, phash_task):
+                if task is not None and not task.done():
+                    task.cancel()
+            metrics.observe("ocr_process_seconds", time.perf_counter() - start)
+
+    def _check_duplicates(self, phash: int, session_id: str) -> List[Dict[str, Any]]:
+        """Look up near-duplicates from other sessions (uploads are indexed once verified)"""
+        duplicates = find_duplicates(phash, session_id)
+        if duplicates:
+            action = settings.PHASH_DUPLICATE_ACTION
+            print(f"Near-duplicate ID image ({action}): {duplicates[:3]}")
+            metrics.increment("id_image_duplicates_total", action=action)
+        return duplicates
 
+    async def _normalize_and_upload(self, file_content: ImageContent, filename: str) -> Dict[str, Any]:
+        """Normalize the image (when enabled) and upload it to the OCR server"""
+        # Downscale/re-encode before upload (bypassed when disabled or Pillow is missing,
+        # in which case a file is streamed to the OCR server as-is)
+        original_size = content_size(file_content)
+        upload_content, upload_filename = await normalize_upload(file_content, filename)
+        metrics.observe("ocr_upload_bytes", original_size, stage="original")
+        metrics.observe("ocr_upload_bytes", content_size(upload_content), stage="uploaded")
+
+        upload_result = await self.upload_image(upload_content, upload_filename)
+
+        # Keep the bytes the OCR server now serves so face verification can
+        # use them instead of downloading them back
+        image_url = extract_image_url(upload_result)
+        if image_url:
+            await image_store.put(image_url, upload_content)
+        return upload_result
+
+    async def _scan_uploaded(
+        self,
+        upload_result: Dict[str, Any],
+        content_hash: str,
+        phash: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Scan an uploaded image and cache a successful result (with its perceptual hash)"""
         if not upload_result.get("success", True):
             return upload_result
 
-        # Get image URL
-        image_url = None
-        if isinstance(upload_result, str):
-            image_url = upload_result
-        elif isinstance(upload_result, dict):
-            image_url = upload_result.get("url")
-
+        image_url = extract_image_url(upload_result)
         if not image_url:
             return {
                 "success": False,
@@ -135,8 +353,12 @@ class OCRService:
                 "scan_result": scan_result.model_dump()
             }
 
-        return {
+        result = {
             "success": True,
             "image_url": image_url,
             "scan_result": scan_result.model_dump()
         }
+        if phash is not None:
+            result["phash"] = format_hash(phash)
+        _scan_cache.set(content_hash, copy.deepcopy(result))
+        return result
@@ -0,0 +1,75 @@
+"""
+Size-bounded LRU cache with per-entry TTL
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+from app.utils.metrics import metrics
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire after ``ttl`` seconds.
+    Intended for use from the event loop (not thread-safe).
+    """
+
+    def __init__(self, max_entries: int, ttl: float, name: str = "cache"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._peek(key) is not None
+
+    def _peek(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry and mark it most recently used"""
+        entry = self._peek(key)
+        if entry is None:
+            metrics.increment("cache_misses_total", cache=self.name)
+            return default
+        self._data.move_to_end(key)
+        metrics.increment("cache_hits_total", cache=self.name)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Insert or replace an entry, evicting the least recently used if full"""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            metrics.increment("cache_evictions_total", cache=self.name)
+        metrics.set_gauge("cache_entries", len(self._data), cache=self.name)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns how many were removed"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        if expired:
+            metrics.set_gauge("cache_entries", len(self._data), cache=self.name)
+        return len(expired)
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -0,0 +1,31 @@
+"""
+Image type detection from magic bytes
+"""
+
+from typing import Optional
+
+# Bytes needed to recognise every supported format
+SNIFF_BYTES = 16
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Detect image type from the first bytes of a file
+
+    Args:
+        head: At least SNIFF_BYTES leading bytes of the file
+
+    Returns:
+        Extension-style type ("png", "jpeg", "gif", "bmp", "webp") or None
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head.startswith(b"BM"):
+        return "bmp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
@@ -0,0 +1,104 @@
+"""
+Idempotency-Key support: run a request body once, replay its response for repeats
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from fastapi import Response
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+from app.utils.serialization import json_loads
+
+T = TypeVar("T")
+
+
+def _succeeded(result: Any) -> bool:
+    """Whether a response is worth replaying: ``success: false`` bodies are not"""
+    if isinstance(result, Response):
+        if result.status_code >= 400:
+            return False
+        try:
+            body = json_loads(result.body)
+        except ValueError:
+            return True
+        return not (isinstance(body, dict) and body.get("success") is False)
+    return getattr(result, "success", None) is not False
+
+
+class IdempotencyStore:
+    """
+    Completed responses (TTL-evicted) plus the executions still in flight.
+
+    A repeat of a completed key gets the stored response; a repeat that
+    arrives while the first is still running waits for it instead of running
+    the work a second time. Executions that raise or answer
+    ``success: false`` are not stored, so the client can retry them with the
+    same key.
+
+    The work runs as its own task and may outlive the request that started
+    it, so ``func`` must not use request-scoped resources (the ``get_db``
+    session, an ``UploadFile``).
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self._completed = TTLCache(
+            max_entries=settings.IDEMPOTENCY_MAX_ENTRIES if max_entries is None else max_entries,
+            ttl=settings.IDEMPOTENCY_TTL if ttl is None else ttl,
+            name="idempotency",
+        )
+        self._in_flight: Dict[str, "asyncio.Task[Any]"] = {}
+
+    @staticmethod
+    def _scope(route: str, session_id: str, key: str) -> str:
+        return f"{session_id}:{route}:{key}"
+
+    def has(self, route: str, session_id: str, key: Optional[str]) -> bool:
+        """Whether ``run`` with this key would replay or join instead of executing"""
+        if not key:
+            return False
+        scoped_key = self._scope(route, session_id, key)
+        return scoped_key in self._in_flight or scoped_key in self._completed
+
+    async def run(
+        self,
+        route: str,
+        session_id: str,
+        key: Optional[str],
+        func: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        Execute ``func`` once per (session, route, key)
+
+        Without a key the call is not deduplicated.
+        """
+        if not key:
+            return await func()
+
+        scoped_key = self._scope(route, session_id, key)
+        completed = self._completed.get(scoped_key)
+        if completed is not None:
+            metrics.increment("idempotency_requests_total", route=route, outcome="replayed")
+            return completed
+
+        task = self._in_flight.get(scoped_key)
+        if task is not None:
+            metrics.increment("idempotency_requests_total", route=route, outcome="joined")
+            return await asyncio.shield(task)
+
+        metrics.increment("idempotency_requests_total", route=route, outcome="executed")
+        # Run as its own task so a disconnecting first caller does not cancel
+        # the work the others are waiting on
+        task = asyncio.ensure_future(func())
+        self._in_flight[scoped_key] = task
+        task.add_done_callback(lambda done: self._finish(scoped_key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, scoped_key: str, task: "asyncio.Task[Any]") -> None:
+        """Move a finished execution from in-flight to completed (unless it failed)"""
+        self._in_flight.pop(scoped_key, None)
+        if not task.cancelled() and task.exception() is None and _succeeded(task.result()):
+            self._completed.set(scoped_key, task.result())
+
+
+idempotency_store = IdempotencyStore()
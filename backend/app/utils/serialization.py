@@ -0,0 +1,61 @@
+"""
+JSON serialization helpers backed by orjson when available (stdlib fallback)
+"""
+
+import json
+from typing import Any, Union
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+HAS_ORJSON = orjson is not None
+
+
+def json_dumps(data: Any) -> str:
+    """Serialize to a JSON string (non-ASCII characters kept as-is)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass  # Types orjson does not know; let the stdlib path report/handle them
+    return json.dumps(data, ensure_ascii=False)
+
+
+def json_dumps_bytes(data: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when installed"""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps_bytes(content)
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> FastJSONResponse:
+    """
+    Return a pydantic model as a response directly, so FastAPI does not
+    re-validate it against ``response_model`` (hot paths only)
+    """
+    return FastJSONResponse(model.model_dump(mode="json"), status_code=status_code)
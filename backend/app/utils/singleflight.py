@@ -0,0 +1,42 @@
+"""
+Single-flight: concurrent callers for the same key share one in-flight call
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from app.utils.metrics import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical operations
+
+    The first caller for a key starts the operation; callers arriving before
+    it finishes await the same result (or exception). Nothing is kept after
+    completion - pair with a cache if results should outlive the call.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None:
+            metrics.increment("singleflight_calls_total", group=self.name, outcome="coalesced")
+            return await asyncio.shield(task)
+
+        metrics.increment("singleflight_calls_total", group=self.name, outcome="executed")
+        # Own task so one caller being cancelled does not cancel the others
+        task = asyncio.ensure_future(func())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
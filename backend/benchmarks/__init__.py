@@ -0,0 +1 @@
+"""Standalone performance benchmarks (run from the backend directory)"""
@@ -0,0 +1,88 @@
+"""
+Microbenchmark for building the per-turn API message list
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_conversation_api_dicts [--turns 200]
+
+Compares, for conversations of 10/100/1000 messages, the cost of one turn
+(append a message, then build the API payload) for:
+  - pydantic:  the previous pydantic Message re-rendered on every turn
+  - slotted:   slotted Message re-rendered on every turn
+  - cached:    Conversation.get_messages_for_api (renders only new messages)
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Literal
+
+os.environ.setdefault("API_KEY", "benchmark")
+
+from pydantic import BaseModel, Field  # noqa: E402
+
+from app.models.conversation import Conversation, Message  # noqa: E402
+
+
+class PydanticMessage(BaseModel):
+    """Baseline: the pydantic message model used before the slotted class"""
+    role: Literal["user", "assistant", "system", "tool"]
+    content: str
+    timestamp: datetime = Field(default_factory=datetime.now)
+    tool_calls: Optional[List[Dict[str, Any]]] = None
+    tool_call_id: Optional[str] = None
+    name: Optional[str] = None
+
+    def to_api_dict(self) -> Dict[str, Any]:
+        data = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            data["tool_calls"] = self.tool_calls
+        if self.tool_call_id:
+            data["tool_call_id"] = self.tool_call_id
+        if self.name:
+            data["name"] = self.name
+        return data
+
+
+def per_turn_us(make_message, render, size: int, turns: int) -> float:
+    """Average microseconds per turn once the conversation holds ``size`` messages"""
+    messages = [make_message("user" if i % 2 else "assistant", f"message {i}") for i in range(size)]
+    start = time.perf_counter()
+    for i in range(turns):
+        messages.append(make_message("user", f"turn {i}"))
+        render(messages)
+        messages.pop()
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def cached_per_turn_us(size: int, turns: int) -> float:
+    conversation = Conversation()
+    for i in range(size):
+        conversation.add_message(Message("user" if i % 2 else "assistant", f"message {i}"))
+    conversation.get_messages_for_api()
+
+    start = time.perf_counter()
+    for i in range(turns):
+        conversation.add_message(Message("user", f"turn {i}"))
+        conversation.get_messages_for_api()
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    def render(messages):
+        return [m.to_api_dict() for m in messages]
+
+    print(f"{'messages':>8} {'pydantic us/turn':>18} {'slotted us/turn':>17} {'cached us/turn':>16}")
+    for size in (10, 100, 1000):
+        pydantic_us = per_turn_us(lambda r, c: PydanticMessage(role=r, content=c), render, size, args.turns)
+        slotted_us = per_turn_us(Message, render, size, args.turns)
+        cached_us = cached_per_turn_us(size, args.turns)
+        print(f"{size:>8} {pydantic_us:>18.1f} {slotted_us:>17.1f} {cached_us:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark bytes forwarded and per-frame latency with and without the frame transform
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_frame_transform [--frames 100] [--uplink-mbps 20] [--latency-ms 20]
+
+A synthetic 1280x720 camera frame (JPEG quality 80, like useCamera) is sent to
+a local face-server stand-in that charges ``--latency-ms`` plus the time to
+receive the message over a ``--uplink-mbps`` link. Each mode runs the same
+path as a realtime session's send step: transform in the process pool,
+base64, send, wait for the result.
+
+Modes: ``original`` forwards the frame as captured, ``scaled`` downscales to
+FRAME_MAX_EDGE, ``cropped`` also crops to a face box as the pre-filter would
+supply it.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("API_KEY", "benchmark")
+
+import numpy as np  # noqa: E402
+import websockets  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.face_service import RealtimeFaceVerificationClient  # noqa: E402
+from app.services.frame_transform import transform_frame  # noqa: E402
+from app.utils.serialization import json_dumps  # noqa: E402
+from app.utils.workers import shutdown_process_pool  # noqa: E402
+
+FACE_BOX = [520, 180, 240, 300]
+
+
+def make_frame() -> bytes:
+    """Camera-like frame: smooth background, sensor noise and a face-sized ellipse"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, 1280)
+    y = np.linspace(0, 1, 720)[:, None]
+    base = (90 + 80 * x + 40 * y)[..., None] * np.array([1.0, 0.9, 0.8])
+    pixels = np.clip(base + rng.normal(0, 6, (720, 1280, 3)), 0, 255).astype(np.uint8)
+    img = Image.fromarray(pixels)
+    x0, y0, w, h = FACE_BOX
+    ImageDraw.Draw(img).ellipse((x0, y0, x0 + w, y0 + h), fill=(200, 160, 130))
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=80)
+    return out.getvalue()
+
+
+async def face_server(websocket, latency: float, uplink: float) -> None:
+    """Stand-in face server: one result per message after latency + transfer time"""
+    async for message in websocket:
+        await asyncio.sleep(latency + len(message) / uplink)
+        await websocket.send(json_dumps({"bbox": [0, 0, 10, 10], "same_person": False, "similarity": 0.1}))
+
+
+async def run_mode(url: str, frame: bytes, frames: int, enabled: bool, face_box) -> dict:
+    settings.FRAME_TRANSFORM_ENABLED = enabled
+    client = RealtimeFaceVerificationClient(url)
+    await client.set_id_card_image("", "ID" * 1000)
+    if not await client.connect():
+        raise RuntimeError("connect failed")
+
+    forwarded, transform_times, totals = [], [], []
+    for _ in range(frames):
+        start = time.perf_counter()
+        out = await transform_frame(frame, face_box)
+        transformed = time.perf_counter()
+        _, result = await client.verify_frame(base64.b64encode(out).decode("ascii"))
+        if result is None:
+            raise RuntimeError("no result for frame")
+        forwarded.append(len(out))
+        transform_times.append(transformed - start)
+        totals.append(time.perf_counter() - start)
+
+    await client.disconnect()
+    totals.sort()
+    return {
+        "bytes": statistics.mean(forwarded),
+        "transform_p50": statistics.median(transform_times),
+        "p50": statistics.median(totals),
+        "p95": totals[int(len(totals) * 0.95) - 1],
+    }
+
+
+async def run(frames: int, uplink_mbps: float, latency: float) -> None:
+    frame = make_frame()
+    uplink = uplink_mbps * 1_000_000 / 8
+
+    async with websockets.serve(
+        lambda ws: face_server(ws, latency, uplink), "127.0.0.1", 0, max_size=None
+    ) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        url = f"ws://127.0.0.1:{port}"
+
+        # Warm the worker pool so process start-up is not counted
+        await transform_frame(frame)
+
+        modes = [("original", False, None), ("scaled", True, None), ("cropped", True, FACE_BOX)]
+        results = {name: await run_mode(url, frame, frames, enabled, box) for name, enabled, box in modes}
+    shutdown_process_pool()
+
+    print(
+        f"frame: 1280x720 JPEG, {len(frame) / 1024:.1f} KB  frames/mode: {frames}  "
+        f"uplink: {uplink_mbps:g} Mbit/s  server latency: {latency * 1000:.0f} ms  max edge: {settings.FRAME_MAX_EDGE}"
+    )
+    print(f"{'mode':<10}{'KB forwarded':>14}{'transform p50':>16}{'e2e p50':>10}{'e2e p95':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<10}{r['bytes'] / 1024:>14.1f}{r['transform_p50'] * 1000:>13.2f} ms"
+            f"{r['p50'] * 1000:>7.1f} ms{r['p95'] * 1000:>7.1f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--uplink-mbps", type=float, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.frames, args.uplink_mbps, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
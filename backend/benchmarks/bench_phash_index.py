@@ -0,0 +1,83 @@
+"""
+Benchmark near-duplicate lookup in the perceptual-hash index vs a linear scan
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_phash_index [--size 1000000] [--queries 2000] [--distance 6]
+
+Half of the queries are indexed hashes with a few bits flipped (hits), half are
+random hashes (misses). Random 64-bit hashes spread evenly over the index
+buckets; real dHash values cluster more, so treat the numbers as a lower bound.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("API_KEY", "benchmark")
+
+from app.services.image_hash import HammingIndex, hamming_distance  # noqa: E402
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def run(size: int, queries: int, distance: int, linear_queries: int) -> None:
+    rng = random.Random(42)
+    hashes = [rng.getrandbits(64) for _ in range(size)]
+
+    index = HammingIndex()
+    start = time.perf_counter()
+    for i, value in enumerate(hashes):
+        index.add(value, str(i))
+    build_seconds = time.perf_counter() - start
+
+    probes = []
+    for i in range(queries):
+        if i % 2 == 0:
+            probes.append(flip_bits(rng.choice(hashes), rng.randint(0, distance), rng))
+        else:
+            probes.append(rng.getrandbits(64))
+
+    latencies = []
+    hits = 0
+    for probe in probes:
+        start = time.perf_counter()
+        matches = index.search(probe, distance)
+        latencies.append(time.perf_counter() - start)
+        hits += bool(matches)
+
+    linear = []
+    for probe in probes[:linear_queries]:
+        start = time.perf_counter()
+        [value for value in hashes if hamming_distance(probe, value) <= distance]
+        linear.append(time.perf_counter() - start)
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e6
+
+    print(f"hashes: {size:,}  max distance: {distance}  queries: {queries} ({hits} with matches)")
+    print(f"index build: {build_seconds:.2f}s ({size / build_seconds:,.0f} hashes/s)")
+    print(f"{'method':<14} {'p50 us':>10} {'p99 us':>10}")
+    print(f"{'multi-index':<14} {p50:>10.1f} {p99:>10.1f}")
+    if linear:
+        print(f"{'linear scan':<14} {statistics.median(linear) * 1e6:>10.1f} {'':>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--distance", type=int, default=6)
+    parser.add_argument("--linear-queries", type=int, default=5)
+    args = parser.parse_args()
+    run(args.size, args.queries, args.distance, args.linear_queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark concurrent realtime verification sessions against a local face-server stand-in
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_realtime_sessions [--sessions 200] [--frames 20] [--latency-ms 20]
+                                                 [--pool-size 0] [--arrival-ms 0] [--handshake-ms 0]
+
+Each session connects, sends the ID card, then streams frames and waits for
+each result. The stand-in answers every message after ``--latency-ms``. Reports
+connect latency, frame round trips, throughput and the OS thread count, which
+stays flat because every session runs on the one event loop.
+
+``--pool-size`` keeps that many warm connections (FaceConnectionPool) so
+sessions arriving ``--arrival-ms`` apart skip the handshake; ``--handshake-ms``
+adds server-side delay to each handshake to mimic a remote face server.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+os.environ.setdefault("API_KEY", "benchmark")
+
+import websockets  # noqa: E402
+
+from app.services import face_service  # noqa: E402
+from app.services.face_pool import FaceConnectionPool  # noqa: E402
+from app.services.face_service import RealtimeFaceVerificationClient  # noqa: E402
+from app.utils.serialization import json_dumps  # noqa: E402
+
+FRAME = "A" * 40_000  # ~30 KB JPEG as base64
+
+
+async def face_server(websocket, latency: float) -> None:
+    """Stand-in face server: one verification result per message"""
+    async for _ in websocket:
+        await asyncio.sleep(latency)
+        await websocket.send(json_dumps({"bbox": [0, 0, 10, 10], "same_person": False, "similarity": 0.1}))
+
+
+async def run_session(url: str, frames: int, connect_times: list, round_trips: list) -> None:
+    client = RealtimeFaceVerificationClient(url)
+    await client.set_id_card_image("", "ID" * 1000)
+
+    start = time.perf_counter()
+    if not await client.connect():
+        raise RuntimeError("connect failed")
+    connect_times.append(time.perf_counter() - start)
+
+    for _ in range(frames):
+        sent = time.perf_counter()
+        _, result = await client.verify_frame(FRAME)
+        if result is None:
+            raise RuntimeError("no result for frame")
+        round_trips.append(time.perf_counter() - sent)
+
+    await client.disconnect()
+
+
+async def run(
+    sessions: int,
+    frames: int,
+    latency: float,
+    pool_size: int = 0,
+    arrival: float = 0.0,
+    handshake: float = 0.0,
+) -> None:
+    async def process_request(*_):
+        # Delay the opening handshake like a remote server would
+        if handshake:
+            await asyncio.sleep(handshake)
+        return None
+
+    async with websockets.serve(
+        lambda ws: face_server(ws, latency), "127.0.0.1", 0, max_size=None, process_request=process_request
+    ) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        url = f"ws://127.0.0.1:{port}"
+
+        pool = FaceConnectionPool(size=pool_size, url=url, health_interval=30)
+        face_service.face_pool = pool
+        pool.start()
+        if pool_size:
+            while len(pool) < pool_size:
+                await asyncio.sleep(0.01)
+
+        async def staggered(index: int) -> None:
+            await asyncio.sleep(index * arrival)
+            await run_session(url, frames, connect_times, round_trips)
+
+        connect_times: list = []
+        round_trips: list = []
+        threads_before = threading.active_count()
+        peak_threads = threads_before
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while True:
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(sample_threads())
+        start = time.perf_counter()
+        await asyncio.gather(*(staggered(i) for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        await pool.stop()
+
+    round_trips.sort()
+    print(
+        f"sessions: {sessions}  frames/session: {frames}  server latency: {latency * 1000:.0f} ms  "
+        f"handshake: {handshake * 1000:.0f} ms  pool: {pool_size}"
+    )
+    print(f"wall time: {elapsed:.2f}s  throughput: {len(round_trips) / elapsed:,.0f} frames/s")
+    print(f"connect p50: {statistics.median(connect_times) * 1000:.1f} ms  max: {max(connect_times) * 1000:.1f} ms")
+    print(
+        f"frame round trip p50: {statistics.median(round_trips) * 1000:.1f} ms  "
+        f"p99: {round_trips[int(len(round_trips) * 0.99) - 1] * 1000:.1f} ms"
+    )
+    print(f"OS threads: {threads_before} before, {peak_threads} peak")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--pool-size", type=int, default=0)
+    parser.add_argument("--arrival-ms", type=float, default=0)
+    parser.add_argument("--handshake-ms", type=float, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(
+        args.sessions,
+        args.frames,
+        args.latency_ms / 1000,
+        pool_size=args.pool_size,
+        arrival=args.arrival_ms / 1000,
+        handshake=args.handshake_ms / 1000,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark CPU time per 1k streamed chunks: stdlib json vs orjson
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization [--rounds 20]
+
+Each streamed chunk costs one parse of the provider's SSE line (AIService.chat_stream)
+and one encode of the chunk we forward to the browser (chat route SSE encoder).
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("API_KEY", "benchmark")
+
+from app.utils import serialization  # noqa: E402
+
+
+def build_chunks(count: int):
+    """Provider lines and the corresponding outgoing chunk dicts"""
+    lines = []
+    outgoing = []
+    full = ""
+    for i in range(count):
+        piece = f"ສະບາຍດີ ທ່ານ {i} "
+        full += piece
+        lines.append(json.dumps({
+            "id": "gen-123",
+            "object": "chat.completion.chunk",
+            "model": "z-ai/glm-4.5",
+            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+        }))
+        outgoing.append({"type": "content", "content": piece, "full_content": full[-2000:]})
+    return lines, outgoing
+
+
+def cpu_ms_per_1k(loads, dumps, lines, outgoing, rounds: int) -> float:
+    start = time.process_time()
+    for _ in range(rounds):
+        for line in lines:
+            loads(line)
+        for chunk in outgoing:
+            dumps(chunk)
+    elapsed = time.process_time() - start
+    return elapsed / (rounds * len(lines) / 1000) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    lines, outgoing = build_chunks(1000)
+
+    stdlib_ms = cpu_ms_per_1k(
+        json.loads, lambda d: json.dumps(d, ensure_ascii=False), lines, outgoing, args.rounds
+    )
+    print(f"{'encoder':<10} {'CPU ms / 1k chunks':>20}")
+    print(f"{'stdlib':<10} {stdlib_ms:>20.2f}")
+
+    if serialization.HAS_ORJSON:
+        fast_ms = cpu_ms_per_1k(
+            serialization.json_loads, serialization.json_dumps, lines, outgoing, args.rounds
+        )
+        print(f"{'orjson':<10} {fast_ms:>20.2f}")
+    else:
+        print("orjson not installed - serialization layer is using the stdlib fallback")
+
+
+if __name__ == "__main__":
+    main()
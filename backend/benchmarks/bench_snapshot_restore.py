@@ -0,0 +1,104 @@
+"""
+Benchmark conversation restore: JSONB history vs binary snapshot
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_snapshot_restore [--sessions 200] [--messages 40]
+
+The JSONB path is measured as json.loads + Conversation.load_from_state, which is
+what asyncpg decoding plus LaosEKYCBot.restore_conversation cost per session.
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("API_KEY", "benchmark")
+
+from app.models.conversation import Conversation  # noqa: E402
+from app.services.conversation_snapshot import (  # noqa: E402
+    decode_snapshot,
+    encode_snapshot,
+    snapshots_enabled,
+)
+from app.utils.formatters import format_scan_result  # noqa: E402
+
+
+SCAN_RESULT = {
+    "document_type": "lao_cccd",
+    "fields": {
+        "id_number": "0123456789",
+        "fullname": "ສົມສັກ ພົມມະວົງ",
+        "dob": "01/01/1990",
+        "nationality": "ລາວ",
+        "ethnicity": "ລາວ",
+        "address": {
+            "address": "ບ້ານ ໂພນສະອາດ, ເມືອງ ໄຊເສດຖາ, ນະຄອນຫຼວງວຽງຈັນ",
+            "childrent": {
+                "address_village": "ໂພນສະອາດ",
+                "address_district": "ໄຊເສດຖາ",
+                "address_province": "ນະຄອນຫຼວງວຽງຈັນ",
+            },
+        },
+        "issue_date": "01/01/2020",
+        "expiry_date": "01/01/2030",
+    },
+}
+
+
+def build_history(count: int) -> list:
+    """Build a stored history resembling a real eKYC session"""
+    start = datetime(2026, 1, 1)
+    messages = []
+    for i in range(count):
+        if i % 10 == 5:
+            content = format_scan_result(SCAN_RESULT)
+        else:
+            content = "ສະບາຍດີ! ຂ້ອຍສາມາດຊ່ວຍທ່ານຢັ້ງຢືນຕົວຕົນໄດ້. " * 3
+        messages.append({
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": content,
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+        })
+    return messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=40)
+    args = parser.parse_args()
+
+    if not snapshots_enabled():
+        raise SystemExit("msgpack and zstandard are required for this benchmark")
+
+    history = build_history(args.messages)
+    context = {"scan_result": SCAN_RESULT, "id_card_url": "http://ocr/img/abc.jpg"}
+
+    jsonb_blob = json.dumps(
+        {"messages": history, "context": context, "progress": "id_scanned"},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    snapshot_blob = encode_snapshot(history, context, "id_scanned")
+
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        state = json.loads(jsonb_blob)
+        Conversation().load_from_state(state["messages"], state["context"], state["progress"])
+    jsonb_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        snapshot = decode_snapshot(snapshot_blob)
+        Conversation().load_from_snapshot(snapshot.rows, snapshot.context, snapshot.progress)
+    snapshot_seconds = time.perf_counter() - start
+
+    print(f"{args.sessions} sessions x {args.messages} messages")
+    print(f"{'path':<10} {'bytes/session':>14} {'restore ms/session':>20}")
+    print(f"{'jsonb':<10} {len(jsonb_blob):>14} {jsonb_seconds / args.sessions * 1000:>20.3f}")
+    print(f"{'snapshot':<10} {len(snapshot_blob):>14} {snapshot_seconds / args.sessions * 1000:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark peak Python memory per upload: read-all bytes vs streamed spooled file
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_upload_memory [--size-mb 10]
+
+Normalization is disabled so the OCR upload step itself is measured. The OCR
+server is replaced by a transport that drains the request stream without
+keeping it, so only our side of the upload is counted.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ["IMAGE_NORMALIZE_ENABLED"] = "False"
+
+import httpx  # noqa: E402
+
+from app.services.http_client import get_upstream_client  # noqa: E402
+from app.services.ocr_service import OCRService, hash_content  # noqa: E402
+
+
+class DrainTransport(httpx.AsyncBaseTransport):
+    """Stand-in OCR server that consumes the body chunk by chunk"""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("scan-url"):
+            return httpx.Response(200, json={"document_type": "lao_cccd", "fields": {"id": 1}})
+        async for _ in request.stream:
+            pass
+        return httpx.Response(200, json={"url": "http://ocr.local/img.jpg"})
+
+
+def make_spooled_file(size: int):
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(b"\xff\xd8\xff" + os.urandom(size - 3))
+    spooled.seek(0)
+    return spooled
+
+
+async def peak_bytes(use_stream: bool, size: int) -> int:
+    spooled = make_spooled_file(size)
+    # Distinct content per run so the dedup cache never short-circuits
+    content_hash = hash_content(spooled)
+    service = OCRService()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    if use_stream:
+        await service.process_image(spooled, "id.jpg", content_hash)
+    else:
+        data = spooled.read()
+        await service.process_image(data, "id.jpg", content_hash)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    spooled.close()
+    return peak
+
+
+async def run(size: int) -> None:
+    get_upstream_client("ocr").client = httpx.AsyncClient(transport=DrainTransport())
+
+    read_all = await peak_bytes(False, size)
+    streamed = await peak_bytes(True, size)
+
+    print(f"upload size: {size / 1024 / 1024:.1f} MB")
+    print(f"{'path':<10} {'peak MB':>10}")
+    print(f"{'read-all':<10} {read_all / 1024 / 1024:>10.2f}")
+    print(f"{'streamed':<10} {streamed / 1024 / 1024:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(int(args.size_mb * 1024 * 1024)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Shared test setup: settings need an API key before the app is imported
+"""
+
+import os
+
+os.environ.setdefault("API_KEY", "test")
@@ -0,0 +1,138 @@
+"""
+archive_partition: activity re-check, export and detach in one locked transaction
+
+Runs against a recording stand-in for the engine, so the statement order and
+file handling are checked without a database.
+"""
+
+import asyncio
+import gzip
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from app.database.partitions import MonthlyPartition
+from app.jobs import archive_partitions
+
+CUTOFF = datetime(2026, 4, 1)
+
+
+class FakeResult:
+    def __init__(self, value=None):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeStream:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield row
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.engine.statements.append(sql)
+        if sql.startswith("SELECT EXISTS"):
+            return FakeResult(self.engine.active)
+        if "DETACH PARTITION" in sql and self.engine.fail_detach:
+            raise RuntimeError("lock timeout")
+        return FakeResult()
+
+    async def stream(self, statement, execution_options=None):
+        self.engine.statements.append(str(statement))
+        return FakeStream([(f'{{"id": {i}}}',) for i in range(self.engine.rows)])
+
+
+class FakeEngine:
+    def __init__(self, active=False, rows=3, fail_detach=False):
+        self.active = active
+        self.rows = rows
+        self.fail_detach = fail_detach
+        self.statements = []
+        self.transactions = []
+
+    @asynccontextmanager
+    async def begin(self):
+        try:
+            yield FakeConnection(self)
+        except BaseException:
+            self.transactions.append("rollback")
+            raise
+        self.transactions.append("commit")
+
+
+def kinds(statements):
+    """Short label per statement, in order"""
+    labels = []
+    for sql in statements:
+        for label in ("LOCK TABLE", "SELECT EXISTS", "row_to_json", "DETACH PARTITION", "DROP TABLE"):
+            if label in sql:
+                labels.append(label)
+    return labels
+
+
+@pytest.fixture
+def partition():
+    return MonthlyPartition("chat_logs", "chat_logs_y2026m01", datetime(2026, 1, 1), datetime(2026, 2, 1))
+
+
+def run_archive(monkeypatch, tmp_path, engine, partition, **kwargs):
+    monkeypatch.setattr(archive_partitions, "engine", engine)
+    return asyncio.run(archive_partitions.archive_partition(partition, str(tmp_path), 100, **kwargs))
+
+
+def archive_files(tmp_path):
+    return sorted(p.name for p in tmp_path.rglob("*") if p.is_file())
+
+
+def test_inactive_partition_is_exported_then_detached_in_one_transaction(monkeypatch, tmp_path, partition):
+    engine = FakeEngine(active=False, rows=3)
+    stats = run_archive(monkeypatch, tmp_path, engine, partition, active_since=CUTOFF)
+
+    assert kinds(engine.statements) == ["LOCK TABLE", "SELECT EXISTS", "row_to_json", "DETACH PARTITION"]
+    assert engine.transactions == ["commit"]
+    assert stats["rows"] == 3
+    with gzip.open(stats["path"], "rt", encoding="utf-8") as fh:
+        assert fh.read().splitlines() == ['{"id": 0}', '{"id": 1}', '{"id": 2}']
+    assert archive_files(tmp_path) == ["chat_logs_y2026m01.ndjson.gz"]
+
+
+def test_partition_with_recent_activity_is_left_attached(monkeypatch, tmp_path, partition):
+    engine = FakeEngine(active=True)
+    assert run_archive(monkeypatch, tmp_path, engine, partition, active_since=CUTOFF) is None
+
+    assert kinds(engine.statements) == ["LOCK TABLE", "SELECT EXISTS"]
+    assert archive_files(tmp_path) == []
+
+
+def test_failed_detach_rolls_back_and_leaves_no_archive_file(monkeypatch, tmp_path, partition):
+    engine = FakeEngine(fail_detach=True)
+    with pytest.raises(RuntimeError):
+        run_archive(monkeypatch, tmp_path, engine, partition, active_since=CUTOFF)
+
+    assert engine.transactions == ["rollback"]
+    assert archive_files(tmp_path) == []
+
+
+def test_tables_without_an_activity_column_skip_the_check(monkeypatch, tmp_path):
+    partition = MonthlyPartition("ekyc_records", "ekyc_records_y2026m01", datetime(2026, 1, 1), datetime(2026, 2, 1))
+    engine = FakeEngine(active=True)
+    stats = run_archive(monkeypatch, tmp_path, engine, partition, drop=True, active_since=CUTOFF)
+
+    assert kinds(engine.statements) == ["LOCK TABLE", "row_to_json", "DETACH PARTITION", "DROP TABLE"]
+    assert stats["dropped"] is True
+    assert os.path.exists(stats["path"])
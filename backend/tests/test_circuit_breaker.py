@@ -0,0 +1,165 @@
+"""
+CircuitBreaker state machine and how UpstreamClient.request drives it
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.http_client import CircuitBreaker, CircuitOpenError, UpstreamClient
+
+
+def make_breaker(threshold: int = 2, reset_timeout: float = 30.0) -> CircuitBreaker:
+    return CircuitBreaker("test", failure_threshold=threshold, reset_timeout=reset_timeout)
+
+
+def open_then_expire(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == "open"
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = make_breaker()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.before_request() is False
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_success_resets_the_failure_count():
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_admits_a_single_trial():
+    breaker = make_breaker()
+    open_then_expire(breaker)
+
+    assert breaker.before_request() is True
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_trial_success_closes_and_trial_failure_reopens():
+    breaker = make_breaker()
+    open_then_expire(breaker)
+    breaker.before_request()
+    breaker.record_success(trial=True)
+    assert breaker.state == "closed"
+
+    open_then_expire(breaker)
+    breaker.before_request()
+    breaker.record_failure(trial=True)
+    assert breaker.state == "open"
+    assert breaker._trial_in_flight is False
+
+
+def test_non_trial_outcomes_do_not_free_the_trial():
+    breaker = make_breaker()
+    open_then_expire(breaker)
+    assert breaker.before_request() is True
+
+    # Requests admitted before the circuit opened finish while the trial runs
+    breaker.record_failure()
+    assert breaker._trial_in_flight is True
+    breaker.record_success()
+    assert breaker._trial_in_flight is True
+
+
+def test_release_trial_lets_the_next_request_probe():
+    breaker = make_breaker()
+    open_then_expire(breaker)
+    breaker.before_request()
+    breaker.release_trial()
+    assert breaker.before_request() is True
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """Fails the first ``failures`` requests with a connect error, then answers 200"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200)
+
+
+def make_client(transport: httpx.AsyncBaseTransport, max_retries: int) -> UpstreamClient:
+    client = UpstreamClient("test", max_retries=max_retries, backoff_base=0.0)
+    client.client = httpx.AsyncClient(transport=transport)
+    return client
+
+
+def test_retries_count_as_one_failure_per_request():
+    async def run():
+        transport = FlakyTransport(failures=10)
+        client = make_client(transport, max_retries=2)
+        with pytest.raises(httpx.ConnectError):
+            await client.request("GET", "http://upstream/", "test")
+        await client.aclose()
+        return transport.calls, client.breaker.failures
+
+    calls, failures = asyncio.run(run())
+    assert calls == 3
+    assert failures == 1
+
+
+def test_cancelled_trial_is_released():
+    async def run():
+        gate = asyncio.Event()
+
+        class HangingTransport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request):
+                await gate.wait()
+
+        client = make_client(HangingTransport(), max_retries=0)
+        open_then_expire(client.breaker)
+        task = asyncio.create_task(client.request("GET", "http://upstream/", "test"))
+        await asyncio.sleep(0)
+        assert client.breaker._trial_in_flight is True
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await client.aclose()
+        return client.breaker._trial_in_flight
+
+    assert asyncio.run(run()) is False
+
+
+def test_cancelled_non_trial_request_keeps_the_trial_held():
+    async def run():
+        gate = asyncio.Event()
+
+        class HangingTransport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request):
+                await gate.wait()
+
+        client = make_client(HangingTransport(), max_retries=0)
+        # Admitted while closed, then another request takes the half-open trial
+        task = asyncio.create_task(client.request("GET", "http://upstream/", "test"))
+        await asyncio.sleep(0)
+        open_then_expire(client.breaker)
+        assert client.breaker.before_request() is True
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await client.aclose()
+        return client.breaker._trial_in_flight
+
+    assert asyncio.run(run()) is True
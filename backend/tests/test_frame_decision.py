@@ -0,0 +1,93 @@
+"""
+FrameDecisionAggregator: accept, early reject, frame cap and retract
+"""
+
+from app.services.frame_decision import FrameDecisionAggregator
+
+
+def face(same_person: bool, similarity: float) -> dict:
+    return {"bbox": [0, 0, 10, 10], "same_person": same_person, "similarity": similarity}
+
+
+def make_aggregator(**overrides) -> FrameDecisionAggregator:
+    options = dict(window=4, accept_consecutive=2, accept_max_stddev=0.1, reject_max_mean=0.3, max_frames=20)
+    options.update(overrides)
+    return FrameDecisionAggregator(**options)
+
+
+def test_single_match_does_not_decide():
+    aggregator = make_aggregator()
+    assert aggregator.add(face(True, 0.8)) is None
+    assert aggregator.decision is None
+
+
+def test_consecutive_consistent_matches_accept():
+    aggregator = make_aggregator()
+    aggregator.add(face(True, 0.8))
+    decision = aggregator.add(face(True, 0.82))
+    assert decision.outcome == "accepted"
+    assert decision.reason == "consistent_match"
+    assert decision.frames == 2
+    assert abs(decision.similarity - 0.81) < 1e-9
+
+
+def test_a_mismatch_breaks_the_run():
+    aggregator = make_aggregator()
+    aggregator.add(face(True, 0.8))
+    aggregator.add(face(False, 0.4))
+    assert aggregator.add(face(True, 0.8)) is None
+
+
+def test_wide_similarity_spread_does_not_accept():
+    aggregator = make_aggregator()
+    aggregator.add(face(True, 0.55))
+    assert aggregator.add(face(True, 0.95)) is None
+
+
+def test_full_window_of_clear_mismatches_rejects_early():
+    aggregator = make_aggregator()
+    decisions = [aggregator.add(face(False, 0.1)) for _ in range(4)]
+    assert decisions[:3] == [None, None, None]
+    assert decisions[3].outcome == "rejected"
+    assert decisions[3].reason == "consistent_mismatch"
+
+
+def test_borderline_mismatches_keep_trying():
+    aggregator = make_aggregator()
+    assert all(aggregator.add(face(False, 0.45)) is None for _ in range(8))
+
+
+def test_frames_without_a_face_only_count_towards_the_cap():
+    aggregator = make_aggregator(max_frames=3)
+    assert aggregator.add({"error": "no face"}) is None
+    assert aggregator.add(None) is None
+    decision = aggregator.add({})
+    assert decision.outcome == "rejected"
+    assert decision.reason == "max_frames"
+    assert decision.similarity is None
+
+
+def test_results_after_the_decision_are_ignored():
+    aggregator = make_aggregator()
+    aggregator.add(face(True, 0.8))
+    aggregator.add(face(True, 0.8))
+    assert aggregator.add(face(True, 0.8)) is None
+    assert aggregator.frames == 2
+
+
+def test_retract_lets_later_frames_decide_again():
+    aggregator = make_aggregator()
+    aggregator.add(face(True, 0.8))
+    aggregator.add(face(True, 0.8))
+    aggregator.retract()
+    assert aggregator.decision is None
+
+    decision = aggregator.add(face(True, 0.8))
+    assert decision.outcome == "accepted"
+    assert decision.frames == 3
+
+
+def test_retract_without_a_decision_is_a_no_op():
+    aggregator = make_aggregator()
+    aggregator.retract()
+    assert aggregator.add(face(True, 0.8)) is None
@@ -0,0 +1,147 @@
+"""
+IdempotencyStore: replay, join, and what is (not) stored
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.requests import FrameResponse, UploadResponse
+from app.utils.idempotency import IdempotencyStore
+from app.utils.serialization import model_response
+
+
+def make_store() -> IdempotencyStore:
+    return IdempotencyStore(ttl=60, max_entries=100)
+
+
+class Counter:
+    """Work function that counts its executions and returns ``response``"""
+
+    def __init__(self, response, delay: float = 0.0):
+        self.response = response
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.response
+
+
+def test_completed_key_is_replayed():
+    async def run():
+        store = make_store()
+        work = Counter(UploadResponse(success=True, message="ok"))
+        first = await store.run("upload", "s1", "k", work)
+        second = await store.run("upload", "s1", "k", work)
+        return work.calls, first, second
+
+    calls, first, second = asyncio.run(run())
+    assert calls == 1
+    assert second is first
+
+
+def test_keys_are_scoped_by_session_and_route():
+    async def run():
+        store = make_store()
+        work = Counter(UploadResponse(success=True))
+        await store.run("upload", "s1", "k", work)
+        await store.run("upload", "s2", "k", work)
+        await store.run("verify-face", "s1", "k", work)
+        return work.calls
+
+    assert asyncio.run(run()) == 3
+
+
+def test_without_a_key_every_call_runs():
+    async def run():
+        store = make_store()
+        work = Counter(UploadResponse(success=True))
+        await store.run("upload", "s1", None, work)
+        await store.run("upload", "s1", None, work)
+        return work.calls
+
+    assert asyncio.run(run()) == 2
+
+
+def test_concurrent_repeat_joins_the_running_execution():
+    async def run():
+        store = make_store()
+        work = Counter(UploadResponse(success=True), delay=0.02)
+        first = asyncio.create_task(store.run("upload", "s1", "k", work))
+        await asyncio.sleep(0)
+        assert store.has("upload", "s1", "k")
+        results = await asyncio.gather(first, store.run("upload", "s1", "k", work))
+        return work.calls, results
+
+    calls, (first, second) = asyncio.run(run())
+    assert calls == 1
+    assert second is first
+
+
+def test_first_caller_cancelled_does_not_cancel_the_work():
+    async def run():
+        store = make_store()
+        work = Counter(UploadResponse(success=True), delay=0.02)
+        first = asyncio.create_task(store.run("upload", "s1", "k", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(store.run("upload", "s1", "k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return work.calls, await second
+
+    calls, response = asyncio.run(run())
+    assert calls == 1
+    assert response.success is True
+
+
+@pytest.mark.parametrize("response", [
+    UploadResponse(success=False, error="OCR failed"),
+    model_response(FrameResponse(success=False, error="Could not send frame")),
+    model_response(FrameResponse(success=True), status_code=503),
+])
+def test_failed_responses_are_not_stored(response):
+    async def run():
+        store = make_store()
+        work = Counter(response)
+        await store.run("send-frame", "s1", "k", work)
+        stored = store.has("send-frame", "s1", "k")
+        await store.run("send-frame", "s1", "k", work)
+        return stored, work.calls
+
+    stored, calls = asyncio.run(run())
+    assert stored is False
+    assert calls == 2
+
+
+def test_successful_model_response_is_stored():
+    async def run():
+        store = make_store()
+        work = Counter(model_response(FrameResponse(success=True, message="Frame sent")))
+        await store.run("send-frame", "s1", "k", work)
+        await store.run("send-frame", "s1", "k", work)
+        return work.calls
+
+    assert asyncio.run(run()) == 1
+
+
+def test_exceptions_are_not_stored():
+    async def run():
+        store = make_store()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            raise RuntimeError("boom")
+
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await store.run("upload", "s1", "k", work)
+        return calls, store.has("upload", "s1", "k")
+
+    calls, stored = asyncio.run(run())
+    assert calls == 2
+    assert stored is False
@@ -0,0 +1,62 @@
+"""
+HammingIndex (multi-index hashing) against a brute-force scan
+"""
+
+import random
+
+from app.services.image_hash import (
+    HASH_BITS,
+    HammingIndex,
+    from_signed64,
+    hamming_distance,
+    to_signed64,
+)
+
+
+def flip_bits(value: int, bits) -> int:
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_finds_every_hash_within_the_radius():
+    rng = random.Random(7)
+    index = HammingIndex()
+    base = rng.getrandbits(HASH_BITS)
+    near = {flip_bits(base, rng.sample(range(HASH_BITS), flips)): flips for flips in range(0, 11)}
+    for value in near:
+        index.add(value, f"near-{near[value]}")
+    for i in range(2000):
+        index.add(rng.getrandbits(HASH_BITS), f"random-{i}")
+
+    for radius in (0, 4, 8, 10):
+        found = {value for value, _, _ in index.search(base, radius)}
+        expected = {value for value in index._owners if hamming_distance(base, value) <= radius}
+        assert found == expected
+
+
+def test_results_are_sorted_by_distance_with_owners():
+    index = HammingIndex()
+    index.add(0b1111, "far")
+    index.add(0b0001, "close")
+    index.add(0b0000, "exact")
+    index.add(0b0000, "exact-again")
+
+    matches = index.search(0, 4)
+    assert [distance for _, distance, _ in matches] == [0, 1, 4]
+    assert matches[0][2] == ["exact", "exact-again"]
+
+
+def test_adding_the_same_owner_twice_is_a_no_op():
+    index = HammingIndex()
+    index.add(42, "s1")
+    index.add(42, "s1")
+    assert len(index) == 1
+    assert index.search(42, 0) == [(42, 0, ["s1"])]
+
+
+def test_signed_storage_round_trip():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        stored = to_signed64(value)
+        assert -(1 << 63) <= stored < (1 << 63)
+        assert from_signed64(stored) == value
@@ -0,0 +1,99 @@
+"""
+SessionReaper sweeps: expired sessions and idle realtime connections
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import deps
+from app.config import settings
+
+
+class FakeClient:
+    def __init__(self, idle: float):
+        self.idle = idle
+
+    def idle_seconds(self) -> float:
+        return self.idle
+
+
+class FakeBot:
+    """Just what the reaper touches: the realtime client and stopping it"""
+
+    def __init__(self, idle=None):
+        self.face_verification_service = SimpleNamespace(
+            realtime_client=FakeClient(idle) if idle is not None else None
+        )
+        self.stopped = 0
+
+    async def stop_realtime_verification(self) -> None:
+        self.stopped += 1
+        self.face_verification_service.realtime_client = None
+
+
+@pytest.fixture(autouse=True)
+def sessions(monkeypatch):
+    monkeypatch.setattr(deps, "bot_sessions", {})
+    monkeypatch.setattr(deps, "session_timestamps", {})
+    return deps.bot_sessions
+
+
+def add_session(session_id: str, bot: FakeBot, age: float = 0.0) -> FakeBot:
+    deps.bot_sessions[session_id] = bot
+    deps.session_timestamps[session_id] = time.time() - age
+    return bot
+
+
+def test_sweep_evicts_expired_sessions_and_stops_their_connections():
+    expired = add_session("old", FakeBot(idle=1.0), age=settings.SESSION_TIMEOUT + 10)
+    fresh = add_session("new", FakeBot(idle=1.0))
+
+    asyncio.run(deps.SessionReaper(interval=60, idle_timeout=120).sweep())
+
+    assert list(deps.bot_sessions) == ["new"]
+    assert "old" not in deps.session_timestamps
+    assert expired.stopped == 1
+    assert fresh.stopped == 0
+
+
+def test_idle_connections_are_closed_but_sessions_kept():
+    idle = add_session("idle", FakeBot(idle=300.0))
+    busy = add_session("busy", FakeBot(idle=5.0))
+    add_session("no-realtime", FakeBot())
+
+    closed = asyncio.run(deps.SessionReaper(interval=60, idle_timeout=120).close_idle_connections())
+
+    assert closed == 1
+    assert idle.stopped == 1
+    assert busy.stopped == 0
+    assert sorted(deps.bot_sessions) == ["busy", "idle", "no-realtime"]
+
+
+def test_zero_idle_timeout_disables_idle_closing():
+    bot = add_session("idle", FakeBot(idle=10_000.0))
+    assert asyncio.run(deps.SessionReaper(interval=60, idle_timeout=0).close_idle_connections()) == 0
+    assert bot.stopped == 0
+
+
+def test_delete_bot_session_stops_the_connection():
+    bot = add_session("done", FakeBot(idle=1.0))
+    assert asyncio.run(deps.delete_bot_session("done")) is True
+    assert asyncio.run(deps.delete_bot_session("done")) is False
+    assert bot.stopped == 1
+
+
+def test_runs_in_the_background_until_stopped():
+    async def run():
+        bot = add_session("idle", FakeBot(idle=300.0))
+        reaper = deps.SessionReaper(interval=0.01, idle_timeout=120)
+        reaper.start()
+        await asyncio.sleep(0.05)
+        await reaper.stop()
+        return bot.stopped, reaper._task
+
+    stopped, task = asyncio.run(run())
+    assert stopped >= 1
+    assert task is None
@@ -0,0 +1,87 @@
+"""
+SingleFlight coalescing of concurrent identical calls
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def run():
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": calls}
+
+        results = await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+        return calls, results, len(flights)
+
+    calls, results, in_flight = asyncio.run(run())
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert in_flight == 0
+
+
+def test_different_keys_run_separately():
+    async def run():
+        flights = SingleFlight("test")
+        seen = []
+
+        async def work(key):
+            seen.append(key)
+            await asyncio.sleep(0)
+            return key
+
+        return await asyncio.gather(flights.do("a", lambda: work("a")), flights.do("b", lambda: work("b"))), seen
+
+    results, seen = asyncio.run(run())
+    assert results == ["a", "b"]
+    assert sorted(seen) == ["a", "b"]
+
+
+def test_exception_reaches_every_caller_and_is_not_kept():
+    async def run():
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise ValueError("bad image")
+
+        results = await asyncio.gather(flights.do("key", work), flights.do("key", work), return_exceptions=True)
+        # Finished calls are forgotten: the next caller runs again
+        with pytest.raises(ValueError):
+            await flights.do("key", work)
+        return calls, results
+
+    calls, results = asyncio.run(run())
+    assert calls == 2
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def run():
+        flights = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        first = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        assert "key" in flights
+        second = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -1,9 +1,9 @@
 import axios from "axios";
 
-const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:3724/api";
+export const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:3724/api";
 
 // Generate or get session ID
-function getSessionId(): string {
+export function getSessionId(): string {
     if (typeof window === "undefined") return "";
 
     let sessionId = localStorage.getItem("session_id");
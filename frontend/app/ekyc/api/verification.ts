@@ -1,4 +1,4 @@
-import { apiClient } from "./client";
+import { API_BASE_URL, apiClient, getSessionId } from "./client";
 import type { ApiResponse, VerificationStartResponse } from "../types/api";
 
 export const verificationApi = {
@@ -18,6 +18,14 @@ export const verificationApi = {
         return response.data;
     },
 
+    // Stream frames as binary JPEG over a WebSocket; each message back is a frame result
+    openFrameSocket: () => {
+        const url = new URL(`${API_BASE_URL}/ws/verify`, window.location.href);
+        url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+        url.searchParams.set("session_id", getSessionId());
+        return new WebSocket(url.toString());
+    },
+
     stopVerification: async (sessionId?: string) => {
         const response = await apiClient.post("/stop-ws-verification");
         return response.data;
@@ -16,17 +16,28 @@ export function CameraModal() {
     const { idCardUrl, setVerificationResult, setProgress, reset: resetEKYC } = useEKYCStore();
     const { addMessage, reset: resetChat } = useChatStore();
 
-    const { videoRef, startCamera, stopCamera, captureFrame } = useCamera();
+    const { videoRef, startCamera, stopCamera, captureFrame, captureFrameBlob } = useCamera();
     const [isVerifying, setIsVerifying] = useState(false);
     const [similarity, setSimilarity] = useState(0);
+    const [frameHint, setFrameHint] = useState<string | null>(null);
     const [status, setStatus] = useState<"idle" | "capturing" | "success" | "failed">("idle");
     const intervalRef = useRef<NodeJS.Timeout | null>(null);
+    const socketRef = useRef<WebSocket | null>(null);
+
+    const closeFrameSocket = () => {
+        if (socketRef.current) {
+            socketRef.current.onclose = null;
+            socketRef.current.close();
+            socketRef.current = null;
+        }
+    };
 
     useEffect(() => {
         if (cameraModalOpen) {
             startCamera();
             setStatus("idle");
             setSimilarity(0);
+            setFrameHint(null);
         }
 
         return () => {
@@ -34,6 +45,7 @@ export function CameraModal() {
             if (intervalRef.current) {
                 clearInterval(intervalRef.current);
             }
+            closeFrameSocket();
         };
     }, [cameraModalOpen, startCamera, stopCamera]);
 
@@ -60,47 +72,125 @@ export function CameraModal() {
             let frameCount = 0;
             const maxFrames = 300; // Max 300 frames (about 60 seconds at 200ms interval)
             let lastResult: any = null;
+            let done = false;
+            // Backend suggests a slower rate (capture_interval_ms) when the face server lags
+            let captureInterval = 200;
+            let captureTick: () => void = () => {};
 
-            intervalRef.current = setInterval(async () => {
-                frameCount++;
+            const startCapturing = (tick: () => void) => {
+                captureTick = tick;
+                if (intervalRef.current) {
+                    clearInterval(intervalRef.current);
+                }
+                intervalRef.current = setInterval(tick, captureInterval);
+            };
 
-                if (frameCount > maxFrames) {
-                    // Timeout - stop verification
+            const stopFrames = () => {
+                done = true;
+                if (intervalRef.current) {
+                    clearInterval(intervalRef.current);
+                    intervalRef.current = null;
+                }
+                closeFrameSocket();
+            };
+
+            const handleFrameResult = (result: any) => {
+                console.log("Frame result:", result);
+                if (done) return;
+                if (result.capture_interval_ms && result.capture_interval_ms !== captureInterval) {
+                    captureInterval = result.capture_interval_ms;
                     if (intervalRef.current) {
-                        clearInterval(intervalRef.current);
+                        startCapturing(captureTick);
                     }
-                    handleVerificationResult(lastResult, false);
+                }
+                if (result.rejected) {
+                    // Frame filtered out before verification: tell the user why
+                    setFrameHint(result.message || null);
                     return;
                 }
+                if (!result.success || !result.result) return;
+
+                setFrameHint(null);
+
+                lastResult = result.result;
+                const sim = result.result.similarity;
+                if (sim !== undefined) {
+                    // Convert from [-1, 1] to [0, 100]
+                    const simPercent = ((sim + 1) / 2) * 100;
+                    setSimilarity(Math.round(simPercent));
+                }
 
-                const frameBase64 = captureFrame();
-                if (frameBase64) {
-                    try {
-                        const result = await verificationApi.sendFrame(frameBase64);
-                        console.log("Frame result:", result);
-
-                        if (result.success && result.result) {
-                            lastResult = result.result;
-                            const sim = result.result.similarity;
-                            if (sim !== undefined) {
-                                // Convert from [-1, 1] to [0, 100]
-                                const simPercent = ((sim + 1) / 2) * 100;
-                                setSimilarity(Math.round(simPercent));
-
-                                // Check if verification succeeded
-                                if (result.result.same_person === true) {
-                                    if (intervalRef.current) {
-                                        clearInterval(intervalRef.current);
-                                    }
-                                    handleVerificationResult(result.result, true);
-                                }
-                            }
+                // The backend decides over several frames (accepted / rejected)
+                if (result.decision) {
+                    stopFrames();
+                    handleVerificationResult(result.result, result.decision === "accepted");
+                }
+            };
+
+            const nextFrame = () => {
+                if (done) return false;
+                frameCount++;
+                if (frameCount > maxFrames) {
+                    // Timeout - stop verification
+                    stopFrames();
+                    handleVerificationResult(lastResult, false);
+                    return false;
+                }
+                return true;
+            };
+
+            // Fallback: one HTTP request per base64 frame
+            const sendFramesOverHttp = () => {
+                startCapturing(async () => {
+                    if (!nextFrame()) return;
+
+                    const frameBase64 = captureFrame();
+                    if (frameBase64) {
+                        try {
+                            handleFrameResult(await verificationApi.sendFrame(frameBase64));
+                        } catch (err) {
+                            console.error("Frame error:", err);
                         }
-                    } catch (err) {
-                        console.error("Frame error:", err);
                     }
+                });
+            };
+
+            // Preferred: binary JPEG frames over one WebSocket, results pushed back
+            const socket = verificationApi.openFrameSocket();
+            socketRef.current = socket;
+            let opened = false;
+
+            socket.onopen = () => {
+                opened = true;
+                startCapturing(async () => {
+                    // Skip this tick while the previous frame is still being uploaded
+                    if (socket.readyState !== WebSocket.OPEN || socket.bufferedAmount > 0) return;
+                    if (!nextFrame()) return;
+
+                    const frame = await captureFrameBlob();
+                    if (frame && socket.readyState === WebSocket.OPEN) {
+                        socket.send(frame);
+                    }
+                });
+            };
+            socket.onmessage = (event) => {
+                try {
+                    handleFrameResult(JSON.parse(event.data));
+                } catch (err) {
+                    console.error("Frame error:", err);
+                }
+            };
+            socket.onclose = () => {
+                if (intervalRef.current) {
+                    clearInterval(intervalRef.current);
+                    intervalRef.current = null;
                 }
-            }, 200);
+                socketRef.current = null;
+                if (done) return;
+                // Older backend or proxy without WebSocket support: use HTTP frames
+                console.warn(opened ? "Frame socket closed, continuing over HTTP" : "Frame socket unavailable, using HTTP");
+                sendFramesOverHttp();
+            };
         } catch (error: any) {
             console.error("Verification error:", error);
             setStatus("failed");
@@ -160,11 +250,13 @@ export function CameraModal() {
         if (intervalRef.current) {
             clearInterval(intervalRef.current);
         }
+        closeFrameSocket();
         verificationApi.stopVerification().catch(console.error);
         closeCameraModal();
         stopCamera();
         setStatus("idle");
         setSimilarity(0);
+        setFrameHint(null);
         setIsVerifying(false);
     };
 
@@ -203,7 +295,7 @@ export function CameraModal() {
                             {status === "idle"
                                 ? "ວາງໃບໜ້າຂອງທ່ານໃຫ້ຢູ່ກາງກ້ອງ"
                                 : status === "capturing"
-                                ? "ກຳລັງຈັບພາບໃບໜ້າ..."
+                                ? frameHint || "ກຳລັງຈັບພາບໃບໜ້າ..."
                                 : status === "success"
                                 ? "ການຢັ້ງຢືນສຳເລັດ!"
                                 : "ການຢັ້ງຢືນລົ້ມເຫລວ"}
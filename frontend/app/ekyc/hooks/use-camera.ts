@@ -51,11 +51,28 @@ export function useCamera() {
     return canvas.toDataURL("image/jpeg", 0.8)
   }, [])
 
+  // Same frame as raw JPEG bytes, for sending over the verification WebSocket
+  const captureFrameBlob = useCallback((): Promise<Blob | null> => {
+    if (!videoRef.current) return Promise.resolve(null)
+
+    const canvas = canvasRef.current || document.createElement("canvas")
+    const ctx = canvas.getContext("2d")
+
+    if (!ctx) return Promise.resolve(null)
+
+    canvas.width = videoRef.current.videoWidth
+    canvas.height = videoRef.current.videoHeight
+
+    ctx.drawImage(videoRef.current, 0, 0)
+    return new Promise((resolve) => canvas.toBlob(resolve, "image/jpeg", 0.8))
+  }, [])
+
   return {
     videoRef,
     startCamera,
     stopCamera,
     captureFrame,
+    captureFrameBlob,
     error,
   }
 }